@@ -0,0 +1,458 @@
+import asyncio
+import json
+import re
+import time
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from urllib.parse import unquote
+
+from edupulse.summarizer import extractive_summary
+
+
+# ============== LOCAL SERVICE STAND-INS ==============
+#
+# Plain asyncio servers that speak just enough IMAP and HTTP for the pollers
+# and the Agora agent. Every server listens on 127.0.0.1 with an ephemeral
+# port and can add a fixed delay per command/request to imitate a slow link.
+
+class FakeIMAPServer:
+    """IMAP mailbox holding ``size`` synthetic messages with UIDs 1..size"""
+
+    def __init__(self, size=0, latency=0.0, body_bytes=400):
+        self.latency = latency
+        self.body_bytes = body_bytes
+        self.messages = {}
+        self.server = None
+        self.port = None
+        self.add_messages(size)
+
+    def add_messages(self, count):
+        start = max(self.messages, default=0) + 1
+        for uid in range(start, start + count):
+            self.messages[uid] = self._message(uid)
+
+    def _message(self, uid):
+        body = (f"Message {uid}. " * (self.body_bytes // 12 + 1))[:self.body_bytes]
+        return (
+            f"Subject: Benchmark message {uid}\r\n"
+            f"From: teacher{uid % 7}@school.example\r\n"
+            f"Date: {format_datetime(datetime.now(timezone.utc))}\r\n"
+            "Content-Type: text/plain; charset=utf-8\r\n"
+            f"\r\n{body}\r\n"
+        ).encode()
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    def account(self, name="default"):
+        """Account dict for GmailPoller pointing at this server"""
+        return {
+            'name': name, 'imap_host': "127.0.0.1", 'imap_port': self.port,
+            'imap_ssl': False, 'username': "bench", 'password': "bench"
+        }
+
+    def _search(self, criteria):
+        match = re.search(rb'UID (\d+):\*', criteria)
+        if not match:
+            return list(self.messages)
+        low = int(match.group(1))
+        uids = [uid for uid in self.messages if uid >= low]
+        if not uids and self.messages:
+            # Like real servers, "N:*" always includes the highest UID
+            uids = [max(self.messages)]
+        return uids
+
+    async def _handle(self, reader, writer):
+        writer.write(b"* OK fake IMAP ready\r\n")
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                tag, _, command = line.rstrip(b"\r\n").partition(b" ")
+                verb = command.upper()
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+
+                if verb.startswith(b"UID SEARCH"):
+                    uids = self._search(command)
+                    writer.write(b"* SEARCH " + b" ".join(str(u).encode() for u in uids) + b"\r\n")
+                elif verb.startswith(b"UID FETCH"):
+                    for uid in command.split()[2].split(b","):
+                        data = self.messages.get(int(uid))
+                        if data is not None:
+                            writer.write(
+                                f"* {int(uid)} FETCH (RFC822 {{{len(data)}}}\r\n".encode()
+                                + data + f" UID {int(uid)})\r\n".encode())
+                elif verb.startswith(b"SELECT"):
+                    writer.write(f"* {len(self.messages)} EXISTS\r\n".encode())
+                elif verb.startswith(b"LOGOUT"):
+                    writer.write(b"* BYE\r\n" + tag + b" OK LOGOUT completed\r\n")
+                    await writer.drain()
+                    return
+                writer.write(tag + b" OK completed\r\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+class FakeHTTPServer:
+    """Minimal HTTP/1.1 server routing ``(method, path regex)`` to handlers.
+
+    A handler gets ``(match, params, body)`` and returns ``(status, json)``,
+    or ``(status, text, content_type)`` for a non-JSON response. Connections
+    are closed after each response.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.routes = []
+        self.requests = 0
+        self.server = None
+        self.port = None
+
+    def route(self, method, pattern, handler):
+        self.routes.append((method, re.compile(pattern + "$"), handler))
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    def dispatch(self, method, path, params, body):
+        """``(status, body_bytes, content_type)`` for one request"""
+        response = (404, {'error': "not found"})
+        for route_method, pattern, handler in self.routes:
+            match = pattern.match(path)
+            if route_method == method and match:
+                response = handler(match, params, body)
+                break
+        if len(response) == 3:
+            status, text, content_type = response
+            return status, text.encode(), content_type
+        status, payload = response
+        return status, json.dumps(payload).encode(), "application/json"
+
+    def _batch(self, match, params, body):
+        """Google-style multipart batch: run each inner GET through ``dispatch``"""
+        text = body.decode()
+        boundary = text.lstrip().splitlines()[0]
+        parts = []
+        for part in text.split(boundary)[1:]:
+            if part.startswith("--"):
+                break
+            head, _, request = part.strip("\r\n").partition("\r\n\r\n")
+            content_id = next(line.split(":", 1)[1].strip() for line in head.splitlines()
+                              if line.lower().startswith("content-id"))
+            method, target = request.split()[:2]
+            path, _, query = unquote(target).partition("?")
+            inner_params = dict(p.partition("=")[::2] for p in query.split("&") if p)
+            status, data, content_type = self.dispatch(method, path, inner_params, b"")
+            parts += [
+                "--batch_response",
+                "Content-Type: application/http",
+                f"Content-ID: <response-{content_id.strip('<>')}>",
+                "",
+                f"HTTP/1.1 {status} {'OK' if status < 400 else 'Error'}",
+                f"Content-Type: {content_type}",
+                "",
+                data.decode()
+            ]
+        parts.append("--batch_response--")
+        return 200, "\r\n".join(parts) + "\r\n", "multipart/mixed; boundary=batch_response"
+
+    async def _handle(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode().partition(":")
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get("content-length", 0))
+            body = await reader.readexactly(length) if length else b""
+
+            method, target = request_line.decode().split()[:2]
+            path, _, query = target.partition("?")
+            params = dict(p.partition("=")[::2] for p in query.split("&") if p)
+            self.requests += 1
+            if self.latency:
+                await asyncio.sleep(self.latency)
+
+            status, data, content_type = self.dispatch(method, path, params, body)
+            writer.write(
+                f"HTTP/1.1 {status} {'OK' if status < 400 else 'Error'}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(data)}\r\n"
+                "Connection: close\r\n\r\n".encode() + data)
+            await writer.drain()
+        except (ConnectionError, ValueError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+def _iso(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+class FakeClassroom(FakeHTTPServer):
+    """Classroom REST API with ``courses`` courses of ``per_course`` announcements.
+
+    Coursework and materials start empty. ``POST /batch`` runs the GET calls
+    of a multipart batch request against the same handlers; only the outer
+    request counts towards ``requests``. Coursework changes of registered
+    courses are published to ``subscriber`` (e.g. a LocalQueueSubscriber),
+    as Classroom publishes them to Pub/Sub.
+    """
+
+    def __init__(self, courses=10, per_course=10, latency=0.0):
+        super().__init__(latency)
+        ids = [str(c) for c in range(1, courses + 1)]
+        self.announcements = {c: [] for c in ids}
+        self.coursework = {c: [] for c in ids}
+        self.materials = {c: [] for c in ids}
+        self.subscriber = None
+        self.registered = set()
+        for course_id in self.announcements:
+            self.add_announcements(course_id, per_course)
+        self.route("GET", r"/v1/courses", self._courses)
+        self.route("GET", r"/v1/courses/(\w+)/announcements",
+                   self._lister(self.announcements, 'announcements'))
+        self.route("GET", r"/v1/courses/(\w+)/courseWork",
+                   self._lister(self.coursework, 'courseWork'))
+        self.route("GET", r"/v1/courses/(\w+)/courseWorkMaterials",
+                   self._lister(self.materials, 'courseWorkMaterial'))
+        self.route("POST", r"/v1/registrations", self._register)
+        self.route("POST", r"/batch", self._batch)
+
+    def add_announcements(self, course_id, count, ts=None):
+        items = self.announcements[course_id]
+        for _ in range(count):
+            stamp = _iso(ts if ts is not None else time.time())
+            items.append({
+                'id': f"{course_id}-{len(items) + 1}",
+                'text': f"Announcement {len(items) + 1} for course {course_id}",
+                'creationTime': stamp,
+                'updateTime': stamp
+            })
+
+    def add_coursework(self, course_id, title, due=None, ts=None):
+        """Add an assignment; ``due`` is a UTC datetime"""
+        items = self.coursework[course_id]
+        stamp = _iso(ts if ts is not None else time.time())
+        work = {'id': f"{course_id}-w{len(items) + 1}", 'title': title,
+                'creationTime': stamp, 'updateTime': stamp}
+        items.append(work)
+        self.set_due(work, due, ts, event="CREATED")
+        return work
+
+    def set_due(self, work, due, ts=None, event="MODIFIED"):
+        work['updateTime'] = _iso(ts if ts is not None else time.time())
+        work.pop('dueDate', None)
+        work.pop('dueTime', None)
+        if due is not None:
+            work['dueDate'] = {'year': due.year, 'month': due.month, 'day': due.day}
+            work['dueTime'] = {'hours': due.hour, 'minutes': due.minute}
+        course_id = work['id'].split("-")[0]
+        if self.subscriber is not None and course_id in self.registered:
+            self.subscriber.publish({
+                'collection': "courses.courseWork",
+                'eventType': event,
+                'resourceId': {'courseId': course_id, 'id': work['id']}
+            })
+
+    def add_material(self, course_id, title, ts=None):
+        items = self.materials[course_id]
+        stamp = _iso(ts if ts is not None else time.time())
+        items.append({'id': f"{course_id}-m{len(items) + 1}", 'title': title,
+                      'creationTime': stamp, 'updateTime': stamp})
+
+    def _courses(self, match, params, body):
+        return 200, {'courses': [{'id': c, 'name': f"Course {c}"} for c in self.announcements]}
+
+    def _register(self, match, params, body):
+        request = json.loads(body)
+        course_id = request['feed']['courseWorkChangesInfo']['courseId']
+        self.registered.add(course_id)
+        return 200, {
+            'registrationId': f"reg-{course_id}",
+            'feed': request['feed'],
+            'cloudPubsubTopic': request['cloudPubsubTopic'],
+            'expiryTime': _iso(time.time() + 7 * 86400)
+        }
+
+    def _lister(self, store, key):
+        def handler(match, params, body):
+            items = store.get(match.group(1))
+            if items is None:
+                return 404, {'error': "no such course"}
+            newest_first = sorted(items, key=lambda a: a['updateTime'], reverse=True)
+            return 200, {key: newest_first[:int(params.get('pageSize', 10))]}
+        return handler
+
+
+class FakeGmail(FakeHTTPServer):
+    """Gmail REST API subset: profile, history, message list and metadata, batch.
+
+    History older than ``retained`` records is answered with 404, like
+    Gmail does for expired history ids.
+    """
+
+    API_PATH = "/gmail/v1/users/me"
+
+    def __init__(self, size=100, latency=0.0, retained=10000):
+        super().__init__(latency)
+        self.messages = {}
+        self.history = []  # (history_id, message_id)
+        self.history_id = 1000
+        self.retained = retained
+        self.add_messages(size)
+        self.route("GET", self.API_PATH + r"/profile", self._profile)
+        self.route("GET", self.API_PATH + r"/history", self._history)
+        self.route("GET", self.API_PATH + r"/messages", self._list)
+        self.route("GET", self.API_PATH + r"/messages/(\w+)", self._message)
+        self.route("POST", r"/batch/gmail/v1", self._batch)
+
+    def add_messages(self, count, ts=None):
+        """Add ``count`` messages received at epoch ``ts`` (default now)"""
+        for _ in range(count):
+            self.history_id += 1
+            n = len(self.messages) + 1
+            message_id = f"m{n:08x}"
+            self.messages[message_id] = {
+                'id': message_id,
+                'internalDate': str(int((ts or time.time()) * 1000)),
+                'snippet': f"Exam hall {n % 12 + 1} opens at 9:00. Bring your ID &amp; pen.",
+                'payload': {'headers': [
+                    {'name': "Subject", 'value': f"Notice {n}"},
+                    {'name': "From", 'value': f"office{n % 5}@school.example"}
+                ]}
+            }
+            self.history.append((self.history_id, message_id))
+        del self.history[:-self.retained]
+
+    def _profile(self, match, params, body):
+        return 200, {'emailAddress': "bench@school.example", 'historyId': str(self.history_id)}
+
+    def _history(self, match, params, body):
+        start = int(params['startHistoryId'])
+        if self.history and start < self.history[0][0] - 1:
+            return 404, {'error': {'code': 404, 'message': "Requested entity was not found."}}
+        records = [{'id': str(h), 'messagesAdded': [{'message': {'id': m}}]}
+                   for h, m in self.history if h > start]
+        page = {'historyId': str(self.history_id)}
+        if records:
+            page['history'] = records
+        return 200, page
+
+    def _list(self, match, params, body):
+        # Only the "after:<epoch>" query is understood; newest first, like Gmail
+        query = unquote(params.get('q', ""))
+        after = int(query[6:]) if query.startswith("after:") else 0
+        ids = [m['id'] for m in reversed(self.messages.values())
+               if int(m['internalDate']) // 1000 > after]
+        start = int(params.get('pageToken', 0))
+        end = start + int(params.get('maxResults', 100))
+        page = {'messages': [{'id': i} for i in ids[start:end]]}
+        if end < len(ids):
+            page['nextPageToken'] = str(end)
+        return 200, page
+
+    def _message(self, match, params, body):
+        message = self.messages.get(match.group(1))
+        if message is None:
+            return 404, {'error': {'code': 404}}
+        return 200, message
+
+
+class FakeAgora(FakeHTTPServer):
+    """Agora conversational agent REST endpoints: join, speak and leave"""
+
+    def __init__(self, latency=0.0):
+        super().__init__(latency)
+        self.spoken = []
+        self.agents = set()
+        self.route("POST", r"/projects/(\w+)/join", self._join)
+        self.route("POST", r"/projects/(\w+)/agents/(\w+)/speak", self._speak)
+        self.route("POST", r"/projects/(\w+)/agents/(\w+)/leave", self._leave)
+
+    @property
+    def api_base(self):
+        return f"{self.base_url}/projects"
+
+    def _join(self, match, params, body):
+        agent_id = f"agent{len(self.agents) + 1}"
+        self.agents.add(agent_id)
+        return 200, {'agent_id': agent_id, 'status': "RUNNING"}
+
+    def _speak(self, match, params, body):
+        if match.group(2) not in self.agents:
+            return 404, {'error': "unknown agent"}
+        self.spoken.append(json.loads(body or b"{}").get('text', ""))
+        return 200, {}
+
+    def _leave(self, match, params, body):
+        self.agents.discard(match.group(2))
+        return 200, {}
+
+
+# ============== SAMPLE BODIES ==============
+
+_NEWSLETTER_BLOCK = (
+    '<tr><td class="content" style="padding:12px;font-family:Arial">'
+    '<h2>Week {n}: reminders</h2>'
+    '<p>Dear parents &amp; students,<br>Reports are due on Friday, e.g. the lab '
+    'write-up from Rm. 21. Details: <a href="https://school.example/notices/{n}?'
+    'utm_source=mail">https://school.example/notices/{n}</a></p>'
+    '<ul><li>Prof. Adams: bring calculators</li><li>FYI the library closes '
+    'at 5&nbsp;pm</li></ul></td></tr>\r\n'
+)
+
+
+def html_newsletter(size):
+    """A school-newsletter style HTML mail body of about ``size`` bytes,
+    with the styling, quoted reply and footer a real one carries"""
+    head = ('<html><head><style>td{padding:0} .content{color:#333}</style>'
+            '<title>Newsletter</title></head><body><table>\r\n')
+    tail = ('</table><div class="gmail_quote">On Mon, Jan 1, 2024, Office '
+            '&lt;office@school.example&gt; wrote:<blockquote>Earlier '
+            'issue</blockquote></div><p>To unsubscribe click here</p></body></html>')
+    blocks = []
+    length = len(head) + len(tail)
+    while length < size:
+        blocks.append(_NEWSLETTER_BLOCK.format(n=len(blocks) + 1))
+        length += len(blocks[-1])
+    return head + "".join(blocks) + tail
+
+
+class FakeLLMBackend:
+    """Summary backend standing in for a remote model: a fixed delay, then
+    the extractive summary"""
+
+    name = "fake_llm"
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def summarize(self, text, target_words):
+        time.sleep(self.latency)
+        return extractive_summary(text, target_words)
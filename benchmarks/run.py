@@ -0,0 +1,786 @@
+"""Offline benchmarks for EduPulse.
+
+Runs the real pollers, pipeline, feed and Agora agent against the local
+stand-ins in ``benchmarks.fakes`` and writes comparable JSON results:
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --compare results.json
+
+``--compare`` exits with status 1 when any timing or throughput figure is
+worse than the baseline by more than ``--threshold`` percent.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.fakes import (FakeAgora, FakeClassroom, FakeGmail, FakeIMAPServer,
+                              FakeLLMBackend, html_newsletter)
+from edupulse.agora import AgoraAgent
+from edupulse.api import ApiServer, read_frame
+from edupulse.catchup import CatchUp
+from edupulse.cluster import Cluster
+from edupulse.coalesce import BURST_THRESHOLD, AnnouncementBuffer
+from edupulse.httpclient import HTTPClient
+from edupulse.ingest import IngestCore
+from edupulse.outbox import ACK_INTERVAL, Outbox
+from edupulse.parsing import CHUNK_SIZE, ParsePool
+from edupulse.pipeline import Announcement
+from edupulse.pollers import ClassroomPoller, GmailAPIPoller, GmailPoller
+from edupulse.scheduler import Scheduler
+from edupulse.push import ClassroomPushPoller, LocalQueueSubscriber
+from edupulse.summarizer import Summarizer, extractive_summary
+from edupulse.textnorm import normalize
+from edupulse.tracing import percentile
+
+RESULTS_VERSION = 1
+
+DEFAULT_PARAMS = {
+    'latency': 0.002,          # seconds added to every fake IMAP command / HTTP request
+    'mailbox_size': 2000,      # messages already in the mailbox for poll cycles
+    'new_per_cycle': 3,        # messages / announcements arriving between polls
+    'cycles': 20,              # poll cycles timed per source
+    'courses': 20,
+    'backlog': 1000,           # unseen messages for the catch-up run
+    'fresh_share': 0.1,        # share of a catch-up backlog still fresh enough to speak
+    'feed_cards': 500,
+    'speak_requests': 200,
+    'html_bytes': 20000,       # size of each HTML mail for the normalizer
+    'normalize_runs': 200,
+    'summary_items': 40,       # long announcements summarized as one backlog
+    'summary_latency': 0.05,   # seconds per call of the stand-in LLM backend
+    'summary_workers': 4,
+    'schedules': 5000,         # recurring rules loaded into the scheduler
+    'schedule_fires': 20,      # one-off items fired to measure timing
+    'api_posts': 500,          # notices posted to the local API
+    'outbox_items': 200,       # items fetched before the simulated crash
+    'parse_items': 1000,       # backlog parsed on the loop and on worker threads
+    'parse_body_bytes': 8000,
+    'parse_workers': 4
+}
+
+QUICK_PARAMS = {
+    'mailbox_size': 200, 'cycles': 5, 'courses': 5, 'backlog': 200,
+    'feed_cards': 100, 'speak_requests': 50, 'normalize_runs': 50, 'summary_items': 12,
+    'schedules': 1000, 'api_posts': 100, 'outbox_items': 50,
+    'parse_items': 200
+}
+
+
+def _timings(durations):
+    values = sorted(durations)
+    return {
+        'count': len(values),
+        'mean_s': sum(values) / len(values),
+        'p50_s': percentile(values, 50),
+        'p95_s': percentile(values, 95)
+    }
+
+
+def _rss_bytes():
+    """Current resident set size, or the peak where /proc is unavailable"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+# ============== BENCHMARKS ==============
+
+async def bench_email_poll(params):
+    """Steady-state IMAP poll cycle on a large mailbox with a few new messages"""
+    server = await FakeIMAPServer(params['mailbox_size'], params['latency']).start()
+    try:
+        poller = GmailPoller(server.account())
+        await poller.poll(lambda item: None)  # first run only stores the watermark
+        received = []
+        durations = []
+        for _ in range(params['cycles']):
+            server.add_messages(params['new_per_cycle'])
+            started = time.perf_counter()
+            await poller.poll(received.append)
+            durations.append(time.perf_counter() - started)
+        result = _timings(durations)
+        result['items'] = len(received)
+        return result
+    finally:
+        await server.close()
+
+
+async def bench_gmail_api_poll(params):
+    """Steady-state Gmail API cycle: history delta plus batched metadata"""
+    server = await FakeGmail(params['mailbox_size'], params['latency']).start()
+    http = HTTPClient()
+    try:
+        poller = GmailAPIPoller(http, {'name': "bench"})
+        poller.API_ROOT = server.base_url
+        poller.creds = SimpleNamespace(valid=True, token="bench", expiry=None)
+        await poller.poll(lambda item: None)  # first run only stores the history id
+        setup_requests = server.requests
+        received = []
+        durations = []
+        for _ in range(params['cycles']):
+            server.add_messages(params['new_per_cycle'])
+            started = time.perf_counter()
+            await poller.poll(received.append)
+            durations.append(time.perf_counter() - started)
+        result = _timings(durations)
+        result['items'] = len(received)
+        result['requests'] = server.requests - setup_requests
+        return result
+    finally:
+        await http.close()
+        await server.close()
+
+
+async def bench_classroom_poll(params):
+    """Classroom poll cycle over every course with a few new announcements"""
+    server = await FakeClassroom(params['courses'], 10, params['latency']).start()
+    http = HTTPClient()
+    try:
+        poller = ClassroomPoller(http)
+        poller.API_BASE = f"{server.base_url}/v1"
+        poller.creds = SimpleNamespace(valid=True, token="bench", expiry=None)
+        await poller.poll(lambda item: None)  # sets the timestamp watermark
+        received = []
+        durations = []
+        for cycle in range(params['cycles']):
+            course_ids = list(server.announcements)
+            for i in range(params['new_per_cycle']):
+                server.add_announcements(course_ids[(cycle + i) % len(course_ids)], 1,
+                                         ts=time.time() + 1)
+            started = time.perf_counter()
+            await poller.poll(received.append)
+            durations.append(time.perf_counter() - started)
+        result = _timings(durations)
+        result['items'] = len(received)
+        result['requests'] = server.requests
+        return result
+    finally:
+        await http.close()
+        await server.close()
+
+
+async def bench_classroom_push(params):
+    """Push-driven Classroom cycles: new coursework announced via notifications"""
+    server = await FakeClassroom(params['courses'], 10, params['latency']).start()
+    server.subscriber = LocalQueueSubscriber()
+    http = HTTPClient()
+    try:
+        poller = ClassroomPushPoller(http, subscriber=server.subscriber, topic="bench")
+        poller.API_BASE = f"{server.base_url}/v1"
+        poller.creds = SimpleNamespace(valid=True, token="bench", expiry=None)
+        await poller.poll(lambda item: None)  # full sweep and registration
+        setup_requests = server.requests
+        received = []
+        durations = []
+        for cycle in range(params['cycles']):
+            course_ids = list(server.coursework)
+            for i in range(params['new_per_cycle']):
+                server.add_coursework(course_ids[(cycle + i) % len(course_ids)],
+                                      f"Assignment {cycle}.{i}", ts=time.time() + 1)
+            started = time.perf_counter()
+            await poller.poll(received.append)
+            durations.append(time.perf_counter() - started)
+        result = _timings(durations)
+        result['items'] = len(received)
+        result['requests'] = server.requests - setup_requests
+        return result
+    finally:
+        await http.close()
+        await server.close()
+
+
+async def bench_catch_up(params):
+    """One poll draining a backlog of unseen mail into the GUI buffer"""
+    server = await FakeIMAPServer(params['backlog'], params['latency']).start()
+    try:
+        poller = GmailPoller(server.account())
+        poller.last_uid = 0
+        buffer = AnnouncementBuffer(capacity=params['backlog'])
+        started = time.perf_counter()
+        await poller.poll(buffer.put)
+        elapsed = time.perf_counter() - started
+        items, dropped = buffer.drain()
+        return {
+            'items': len(items),
+            'dropped': dropped,
+            'elapsed_s': elapsed,
+            'items_per_s': len(items) / elapsed
+        }
+    finally:
+        await server.close()
+
+
+async def bench_catch_up_digest(params):
+    """First-run catch-up of an IMAP and a Gmail API mailbox through one CatchUp"""
+    imap = await FakeIMAPServer(params['backlog'], params['latency']).start()
+    gmail = FakeGmail(0, params['latency'])
+    fresh = int(params['backlog'] * params['fresh_share'])
+    gmail.add_messages(params['backlog'] - fresh, ts=time.time() - 6 * 3600)
+    gmail.add_messages(fresh)
+    await gmail.start()
+    http = HTTPClient()
+    try:
+        api_poller = GmailAPIPoller(http, {'name': "bench"})
+        api_poller.API_ROOT = gmail.base_url
+        api_poller.creds = SimpleNamespace(valid=True, token="bench", expiry=None)
+        api_poller.history_id = None
+        imap_poller = GmailPoller(imap.account())
+        imap_poller.last_uid = None
+        pollers = [imap_poller, api_poller]
+        digests = []
+        catch_up = CatchUp({'enabled': True, 'lookback_hours': 24, 'fresh_minutes': 15},
+                           digests.append)
+        announced = []
+        started = time.perf_counter()
+        await asyncio.gather(*(poller.poll(announced.append, catch_up) for poller in pollers))
+        elapsed = time.perf_counter() - started
+        total = params['backlog'] * len(pollers)
+        return {
+            'items': total,
+            'announced': len(announced),
+            'digest_cards': len(digests),
+            'elapsed_s': elapsed,
+            'items_per_s': total / elapsed
+        }
+    finally:
+        await http.close()
+        await gmail.close()
+        await imap.close()
+
+
+async def bench_cluster_failover(params):
+    """Two stations on one cluster store; the leader stops dead mid-stream"""
+    server = await FakeIMAPServer(params['mailbox_size'], params['latency']).start()
+    directory = tempfile.mkdtemp(prefix="edupulse-cluster-")
+    stations = {}
+    try:
+        for name in ("a", "b"):
+            received = []
+            core = IngestCore()
+            core.start_thread()
+            core.join_cluster(Cluster(
+                {'store': os.path.join(directory, "cluster.db"), 'station': name,
+                 'lease_seconds': 3}, {}, received.append))
+            core.add_source(GmailPoller(server.account()), 0.25, received.append)
+            stations[name] = (core, received)
+            while name == "a" and not core.cluster.leads("Email:default"):
+                await asyncio.sleep(0.01)
+
+        leader, _ = stations["a"]
+        follower, received = stations["b"]
+        await asyncio.sleep(0.5)  # first poll only stores the watermark
+        posted = len(server.messages)
+        for _ in range(params['new_per_cycle']):
+            server.add_messages(1)
+            await asyncio.sleep(0.3)
+        # A crash: the loop stops without releasing its lease
+        leader.loop.call_soon_threadsafe(leader.loop.stop)
+        stopped = time.perf_counter()
+        while not follower.cluster.leads("Email:default"):
+            await asyncio.sleep(0.01)
+        failover_s = time.perf_counter() - stopped
+        for _ in range(params['new_per_cycle']):
+            server.add_messages(1)
+        expected = len(server.messages) - posted
+        deadline = time.perf_counter() + 5
+        while len({a.title for a in received}) < expected and time.perf_counter() < deadline:
+            await asyncio.sleep(0.01)
+        titles = [a.title for a in received]
+        return {
+            'items': len(titles),
+            'duplicates': len(titles) - len(set(titles)),
+            'missed': expected - len(set(titles)),
+            'failover_s': failover_s
+        }
+    finally:
+        for core, _ in stations.values():
+            # Also cancels what was left on the crashed leader's loop
+            await asyncio.to_thread(core.stop_thread)
+        await server.close()
+
+
+async def bench_outbox_restart(params):
+    """Crash with half the fetched items unshown, then restart from the outbox"""
+    server = await FakeIMAPServer(params['mailbox_size'], params['latency']).start()
+    path = os.path.join(tempfile.mkdtemp(prefix="edupulse-outbox-"), "outbox.db")
+    count = params['outbox_items']
+    if os.path.exists(GmailPoller.STATE_FILE):
+        os.remove(GmailPoller.STATE_FILE)
+
+    async def wait_for(condition):
+        while not condition():
+            await asyncio.sleep(0.005)
+
+    cores = []
+    try:
+        shown = []
+        core = IngestCore()
+        core.start_thread()
+        cores.append(core)
+        outbox = Outbox(path)
+        core.use_outbox(outbox, shown.append, shown.append)
+        core.add_source(GmailPoller(server.account()), 0.1, shown.append)
+        await wait_for(lambda: os.path.exists(GmailPoller.STATE_FILE))
+        with open(GmailPoller.STATE_FILE) as f:
+            before = f.read()
+        server.add_messages(count)
+        await wait_for(lambda: len(shown) >= count)
+        for announcement in shown[:count // 2]:
+            outbox.ack(announcement)
+        await asyncio.sleep(ACK_INTERVAL * 1.5)
+        # Crash: the loop stops dead, and the watermark file never got written
+        core.loop.call_soon_threadsafe(core.loop.stop)
+        with open(GmailPoller.STATE_FILE, "w") as f:
+            f.write(before)
+
+        shown_again = []
+        started = time.perf_counter()
+        core = IngestCore()
+        core.start_thread()
+        cores.append(core)
+        outbox = Outbox(path)
+        core.use_outbox(outbox, shown_again.append, shown_again.append)
+        core.add_source(GmailPoller(server.account()), 0.1, shown_again.append)
+        await wait_for(lambda: len(shown_again) >= count - count // 2)
+        restart_s = time.perf_counter() - started
+        await asyncio.sleep(0.5)  # a few polls, to catch anything fetched again
+    finally:
+        for core in reversed(cores):
+            # Also cancels what was left on the crashed core's loop
+            await asyncio.to_thread(core.stop_thread)
+        await server.close()
+
+    first = {a.title for a in shown}
+    redelivered = [a for a in shown_again if a.trace is None]
+    return {
+        'redelivered': len(redelivered),
+        'refetched': sum(1 for a in shown_again if a.trace and a.title in first),
+        'lost': len(first - {a.title for a in shown[:count // 2] + redelivered}),
+        'restart_s': restart_s
+    }
+
+
+async def bench_parse_pool(params):
+    """One large IMAP backlog parsed on the loop and on worker threads"""
+    server = await FakeIMAPServer(0, params['latency'], params['parse_body_bytes']).start()
+    if os.path.exists(GmailPoller.STATE_FILE):
+        os.remove(GmailPoller.STATE_FILE)
+    lag = []
+
+    async def watch_loop():
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lag.append(time.perf_counter() - started - 0.001)
+
+    result = {}
+    try:
+        poller = GmailPoller(server.account())
+        await poller.poll(lambda item: None)  # first run only stores the watermark
+        for mode in ("inline", "thread"):
+            if mode == "thread":
+                poller.parse_pool = ParsePool(params['parse_workers'])
+            # Warm-up, so that starting the workers is not timed
+            server.add_messages(params['parse_workers'] * CHUNK_SIZE)
+            await poller.poll(lambda item: None)
+            server.add_messages(params['parse_items'])
+            received = []
+            lag.clear()
+            watcher = asyncio.ensure_future(watch_loop())
+            started = time.perf_counter()
+            await poller.poll(received.append)
+            for announcement in received:
+                announcement.text  # inline, the feed or speak queue does this
+            elapsed = time.perf_counter() - started
+            await asyncio.sleep(0.005)  # let the watcher see the last stall
+            watcher.cancel()
+            if poller.parse_pool is not None:
+                poller.parse_pool.close()
+            uids = [int(a.title.rsplit(" ", 1)[1]) for a in received]
+            result[f'{mode}_items_per_s'] = len(received) / elapsed
+            result[f'{mode}_max_loop_lag_s'] = max(lag, default=elapsed)
+            result[f'{mode}_in_order'] = len(uids) == params['parse_items'] and uids == sorted(uids)
+        return result
+    finally:
+        await server.close()
+        if os.path.exists(GmailPoller.STATE_FILE):
+            os.remove(GmailPoller.STATE_FILE)
+
+
+def bench_textnorm(params):
+    """HTML mail bodies through the display/speech normalizer"""
+    body = html_newsletter(params['html_bytes'])
+    size = len(body.encode())
+    durations = []
+    for _ in range(params['normalize_runs']):
+        started = time.perf_counter()
+        display, speech = normalize(body, markup=True)
+        durations.append(time.perf_counter() - started)
+    result = _timings(durations)
+    result['mb_per_s'] = size * len(durations) / sum(durations) / 1e6
+    result['display_ratio'] = len(display) / len(body)
+    result['speech_ratio'] = len(speech) / len(body)
+    assert len(speech) <= len(display), "speech text longer than the display text"
+    return result
+
+
+def bench_summarize(params):
+    """A backlog of long announcements through the summary worker pool"""
+    paragraph = ("The science fair on {n} March moves to the main hall. Projects must be "
+                 "set up by 8 am and labelled with the class name. Parents may visit "
+                 "from 10 am. Judges will announce the winners at noon in the hall. "
+                 "Bring an extension cord if your project needs power. ")
+    texts = [(paragraph.format(n=n % 28 + 1) * 3) + f"Reference {n}." for n in
+             range(params['summary_items'])]
+
+    started = time.perf_counter()
+    for text in texts:
+        extractive_summary(text, 40)
+    extractive_s = (time.perf_counter() - started) / len(texts)
+
+    summarizer = Summarizer(FakeLLMBackend(params['summary_latency']),
+                            workers=params['summary_workers'])
+    try:
+        backlog = [Announcement("Classroom", "Classroom: Benchmark", text, 0, "Benchmark")
+                   for text in texts]
+        started = time.perf_counter()
+        for announcement in backlog:
+            summarizer.submit(announcement)
+        backlog[0].brief_job.result()
+        first_s = time.perf_counter() - started
+        for announcement in backlog:
+            announcement.brief_job.result()
+        elapsed = time.perf_counter() - started
+
+        repeats = [Announcement("Classroom", "Classroom: Benchmark", text, 0, "Benchmark")
+                   for text in texts]
+        cache_started = time.perf_counter()
+        for announcement in repeats:
+            summarizer.submit(announcement)
+        cached_s = (time.perf_counter() - cache_started) / len(repeats)
+    finally:
+        summarizer.close()
+
+    return {
+        'items': len(backlog),
+        'extractive_mean_s': extractive_s,
+        'first_ready_s': first_s,
+        'elapsed_s': elapsed,
+        'items_per_s': len(backlog) / elapsed,
+        'cached_mean_s': cached_s,
+        'cache_hits': sum(a.brief is not None and a.brief_job is None for a in repeats),
+        'words_before': len(backlog[0].speech.split()),
+        'words_after': len(backlog[0].brief.split())
+    }
+
+
+async def bench_scheduler(params):
+    """Fire timing of one-off items with thousands of recurring rules pending"""
+    fires = params['schedule_fires']
+    now = time.time()
+    items = [{'name': f"Rule {i}", 'cron': f"{i % 60} {i // 60 % 24} * * *", 'text': "Bell"}
+             for i in range(params['schedules'])]
+    items += [{'name': f"Once {i}", 'text': "Please proceed to the main hall.",
+               'at': datetime.fromtimestamp(now + 0.5 + i * 0.05).isoformat()}
+              for i in range(fires)]
+
+    lateness = []
+    started = time.perf_counter()
+    scheduler = Scheduler({'enabled': True, 'lead_seconds': 0.2, 'items': items},
+                          lambda a: lateness.append(time.time() - a.ts))
+    configure_s = time.perf_counter() - started
+    task = asyncio.create_task(scheduler.run())
+    try:
+        await asyncio.sleep(0.7 + fires * 0.05)
+    finally:
+        task.cancel()
+    lateness.sort()
+    return {
+        'pending': scheduler.pending,
+        'configure_s': configure_s,
+        'fired': len(lateness),
+        'late_p50_s': percentile(lateness, 50),
+        'late_p95_s': percentile(lateness, 95)
+    }
+
+
+async def _api_request(port, method, path, body=None, token="bench"):
+    """One request to the local API; ``(status, decoded body)``"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    payload = json.dumps(body).encode() if body is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n"
+                 f"Authorization: Bearer {token}\r\n"
+                 f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload)
+    response = await reader.read()
+    writer.close()
+    head, _, data = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(data)
+
+
+async def bench_api(params):
+    """Notices posted to the local API, followed by a WebSocket client"""
+    api = ApiServer({'host': "127.0.0.1", 'port': 0, 'token': "bench"}, None, None)
+    api.emit = api.emit_urgent = api.publish  # straight to the feed
+    await api.start()
+
+    reader, writer = await asyncio.open_connection("127.0.0.1", api.port)
+    writer.write(b"GET /api/stream?token=bench HTTP/1.1\r\nHost: localhost\r\n"
+                 b"Upgrade: websocket\r\nConnection: Upgrade\r\n"
+                 b"Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\n"
+                 b"Sec-WebSocket-Version: 13\r\n\r\n")
+    await reader.readuntil(b"\r\n\r\n")
+    arrived = {}
+
+    async def follow():
+        while True:
+            _, payload = await read_frame(reader)
+            message = json.loads(payload)
+            if message['type'] == "item":
+                arrived[message['item']['title']] = time.perf_counter()
+
+    following = asyncio.create_task(follow())
+    posts, delivery = [], []
+    try:
+        for i in range(params['api_posts']):
+            title = f"Notice {i}"
+            started = time.perf_counter()
+            status, _ = await _api_request(
+                api.port, "POST", "/api/announcements",
+                {'title': title, 'text': "Buses leave at 3:15 today.", 'urgent': i % 10 == 0})
+            assert status == 202
+            posts.append(time.perf_counter() - started)
+            while title not in arrived:
+                await asyncio.sleep(0)
+            delivery.append(arrived[title] - started)
+
+        started = time.perf_counter()
+        pages, cursor = 0, None
+        while True:
+            query = f"?limit=50&before={cursor}" if cursor else "?limit=50"
+            _, page = await _api_request(api.port, "GET", f"/api/feed{query}")
+            pages += 1
+            cursor = page['next']
+            if cursor is None:
+                break
+        paging_s = time.perf_counter() - started
+    finally:
+        following.cancel()
+        writer.close()
+        await api.close()
+    result = {f"post_{k}": v for k, v in _timings(posts).items()}
+    delivery.sort()
+    result.update({
+        'stream_p50_s': percentile(delivery, 50),
+        'stream_p95_s': percentile(delivery, 95),
+        'feed_pages': pages,
+        'feed_page_s': paging_s / pages
+    })
+    return result
+
+
+def bench_feed_memory(params):
+    """Memory and time per card as the feed grows; needs PyQt6"""
+    try:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        from PyQt6.QtWidgets import QApplication
+    except ImportError:
+        return {'skipped': "PyQt6 is not installed"}
+
+    import main
+
+    app = QApplication.instance() or QApplication([])
+    feed = main.FeedPage()
+    text = "Lorem ipsum dolor sit amet. " * 10
+    batch = [Announcement("Classroom", "Classroom: Benchmark", text, 1704096000, "Benchmark")
+             for _ in range(BURST_THRESHOLD)]
+
+    app.processEvents()
+    rss_before = _rss_bytes()
+    started = time.perf_counter()
+    added = 0
+    while added < params['feed_cards']:
+        feed.add_batch(batch)
+        added += len(batch)
+        app.processEvents()
+    elapsed = time.perf_counter() - started
+    growth = _rss_bytes() - rss_before
+
+    feed.deleteLater()
+    app.processEvents()
+    return {
+        'cards': added,
+        'per_card_s': elapsed / added,
+        'rss_growth_bytes': growth,
+        'per_card_bytes': growth / added
+    }
+
+
+async def bench_speak(params):
+    """Sequential speak requests, as the daemon's speaker sends them"""
+    server = await FakeAgora(params['latency']).start()
+    http = HTTPClient()
+    try:
+        app_id = "bench"
+        joined = await http.post(f"{server.api_base}/{app_id}/join", json={})
+        agent = AgoraAgent({'APP_ID': app_id, 'AUTHORIZATION': "YmVuY2g="})
+        agent.api_base = server.api_base
+        agent.agent_id = joined['agent_id']
+        agent.is_initialized = True
+
+        durations = []
+        started = time.perf_counter()
+        for i in range(params['speak_requests']):
+            request_started = time.perf_counter()
+            await agent.speak_async(f"Announcement number {i}", http)
+            durations.append(time.perf_counter() - request_started)
+        elapsed = time.perf_counter() - started
+        await asyncio.to_thread(agent.cleanup)
+
+        result = _timings(durations)
+        result['requests_per_s'] = len(durations) / elapsed
+        result['spoken'] = len(server.spoken)
+        result['left'] = not server.agents
+        return result
+    finally:
+        await http.close()
+        await server.close()
+
+
+BENCHMARKS = {
+    'email_poll': bench_email_poll,
+    'gmail_api_poll': bench_gmail_api_poll,
+    'classroom_poll': bench_classroom_poll,
+    'classroom_push': bench_classroom_push,
+    'catch_up': bench_catch_up,
+    'catch_up_digest': bench_catch_up_digest,
+    'cluster_failover': bench_cluster_failover,
+    'outbox_restart': bench_outbox_restart,
+    'parse_pool': bench_parse_pool,
+    'textnorm': bench_textnorm,
+    'summarize': bench_summarize,
+    'scheduler': bench_scheduler,
+    'api': bench_api,
+    'feed_memory': bench_feed_memory,
+    'speak': bench_speak
+}
+
+
+def run_benchmarks(names, params):
+    results = {}
+    # Pollers keep their watermark files in the working directory
+    original_cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="edupulse-bench-") as workdir:
+        os.chdir(workdir)
+        try:
+            for name in names:
+                print(f"Running {name}...", file=sys.stderr)
+                bench = BENCHMARKS[name]
+                if asyncio.iscoroutinefunction(bench):
+                    results[name] = asyncio.run(bench(params))
+                else:
+                    results[name] = bench(params)
+        finally:
+            os.chdir(original_cwd)
+    return {
+        'version': RESULTS_VERSION,
+        'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'params': params,
+        'results': results
+    }
+
+
+# ============== COMPARISON ==============
+
+def _direction(key):
+    """+1 if higher is better, -1 if lower is better, 0 if not comparable"""
+    if key.endswith("_per_s"):
+        return 1
+    if key.endswith(("_s", "_bytes")):
+        return -1
+    return 0
+
+
+def compare(baseline, current, threshold):
+    """Lines describing every comparable figure and the regressions among them"""
+    lines = []
+    regressions = []
+    if baseline.get('params') != current.get('params'):
+        lines.append("Warning: benchmark parameters differ from the baseline")
+    for name, figures in current['results'].items():
+        old = baseline.get('results', {}).get(name, {})
+        for key, value in figures.items():
+            direction = _direction(key)
+            before = old.get(key)
+            if not direction or not isinstance(value, (int, float)) or not before:
+                continue
+            change = (value - before) / before * 100
+            worse = -change * direction > threshold
+            flag = "  REGRESSION" if worse else ""
+            lines.append(f"{name + '.' + key:<32} {before:>12.4g} -> {value:>12.4g} "
+                         f"({change:+.1f}%){flag}")
+            if worse:
+                regressions.append(f"{name}.{key}")
+    return lines, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.run", description="Offline EduPulse benchmarks")
+    parser.add_argument("names", nargs="*", metavar="NAME",
+                        help=f"benchmarks to run (default: all of {', '.join(BENCHMARKS)})")
+    parser.add_argument("--output", metavar="FILE", help="write JSON results to FILE")
+    parser.add_argument("--compare", metavar="FILE", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=20.0,
+                        help="regression threshold in percent (default 20)")
+    parser.add_argument("--quick", action="store_true", help="smaller sizes for a smoke run")
+    parser.add_argument("--latency", type=float, help="per-request latency of the fakes")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    params = dict(DEFAULT_PARAMS)
+    if args.quick:
+        params.update(QUICK_PARAMS)
+    if args.latency is not None:
+        params['latency'] = args.latency
+
+    results = run_benchmarks(args.names or list(BENCHMARKS), params)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        lines, regressions = compare(baseline, results, args.threshold)
+        print("\n".join(lines), file=sys.stderr)
+        if regressions:
+            print(f"{len(regressions)} regression(s): {', '.join(regressions)}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,5 @@
+"""EduPulse core: Qt-free ingestion, translation and broadcast pipeline.
+
+The desktop app in ``main.py`` and the headless daemon
+(``python -m edupulse daemon``) are both built on the modules in this package.
+"""
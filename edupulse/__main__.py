@@ -0,0 +1,122 @@
+import argparse
+import sys
+
+from .replay import (
+    RECORD_FILE, SHAPES, Replay, parse_speed, save_stream, synthetic_stream,
+    recorder as stream_recorder
+)
+from .settings import SettingsManager, SettingsService
+from .startup import startup
+from .tracing import TRACE_FILE, TraceRecorder, format_summary, latency_summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m edupulse",
+        description="EduPulse announcement system"
+    )
+    subparsers = parser.add_subparsers(dest="command")
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        "--startup-report", action="store_true",
+        help="print per-import and per-phase start-up timings")
+    common.add_argument(
+        "--startup-target", type=float, metavar="MS",
+        help="flag the start-up report when cold start exceeds MS")
+    common.add_argument(
+        "--record", nargs="?", const=RECORD_FILE, metavar="FILE",
+        help="append every ingested item to FILE (default: %(const)s)")
+    common.add_argument(
+        "--replay", metavar="FILE",
+        help="replay a recorded stream instead of polling the real accounts")
+    common.add_argument(
+        "--speed", default="1x",
+        help="replay speed: 1x, 10x, max or any multiplier (default: %(default)s)")
+
+    daemon_parser = subparsers.add_parser(
+        "daemon", parents=[common],
+        help="run pollers and broadcasts without the Qt GUI")
+    daemon_parser.add_argument(
+        "--settings", default=SettingsManager.SETTINGS_FILE,
+        help="path to settings.json (default: %(default)s)")
+    broadcast = daemon_parser.add_mutually_exclusive_group()
+    broadcast.add_argument(
+        "--broadcast", dest="broadcast", action="store_true", default=None,
+        help="speak every new announcement (overrides audio.auto_broadcast)")
+    broadcast.add_argument(
+        "--no-broadcast", dest="broadcast", action="store_false",
+        help="only log new announcements")
+    daemon_parser.add_argument(
+        "--metrics-port", type=int, metavar="PORT",
+        help="serve /metrics on PORT, 0 to disable (default: metrics.port setting)")
+
+    subparsers.add_parser(
+        "gui", parents=[common], help="start the desktop app (default)")
+
+    traces_parser = subparsers.add_parser(
+        "traces", help="print p50/p95/p99 announcement latency per source")
+    traces_parser.add_argument(
+        "--file", default=TRACE_FILE,
+        help="trace log to read (default: %(default)s)")
+
+    generate_parser = subparsers.add_parser(
+        "generate", help="write a synthetic announcement stream for --replay")
+    generate_parser.add_argument(
+        "--shape", choices=sorted(SHAPES), default="storm",
+        help="arrival pattern (default: %(default)s)")
+    generate_parser.add_argument(
+        "--count", type=int, default=500, help="number of items (default: %(default)s)")
+    generate_parser.add_argument(
+        "--duration", type=float, default=600, metavar="SECONDS",
+        help="time span of the stream at 1x (default: %(default)s)")
+    generate_parser.add_argument("--seed", type=int, default=0)
+    generate_parser.add_argument(
+        "--output", default=RECORD_FILE, help="file to write (default: %(default)s)")
+
+    args = parser.parse_args(argv)
+
+    if getattr(args, 'startup_report', False):
+        startup.enable(args.startup_target)
+
+    if args.command == "traces":
+        recorder = TraceRecorder(args.file)
+        print(format_summary(latency_summary(recorder.load())))
+        return 0
+
+    if args.command == "generate":
+        events = synthetic_stream(args.count, args.duration, args.shape, seed=args.seed)
+        save_stream(events, args.output)
+        print(f"Wrote {len(events)} {args.shape} item(s) to {args.output}")
+        return 0
+
+    if getattr(args, 'record', None):
+        stream_recorder.start(args.record)
+    replay = None
+    if getattr(args, 'replay', None):
+        try:
+            replay = Replay.from_file(args.replay, parse_speed(args.speed))
+        except (OSError, ValueError) as e:
+            parser.error(f"cannot replay {args.replay}: {e}")
+
+    if args.command == "daemon":
+        with startup.phase("import daemon"):
+            from . import daemon
+
+        SettingsManager.SETTINGS_FILE = args.settings
+        with startup.phase("load settings"):
+            service = SettingsService()
+        settings = service.settings
+        if args.metrics_port is not None:
+            settings['metrics']['port'] = args.metrics_port
+        daemon.run(settings, broadcast=args.broadcast, replay=replay, service=service)
+        return 0
+
+    with startup.phase("import GUI"):
+        from main import main as gui_main
+    gui_main(replay=replay)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+import time
+
+from .httpclient import DEFAULT_TIMEOUT
+from .metrics import AGENT_JOINS, API_ERRORS, SPEAK_LATENCY
+
+
+# ============== AGORA INTEGRATION ==============
+
+API_BASE = "https://api.agora.io/api/conversational-ai-agent/v2/projects"
+
+REQUIRED_FIELDS = ['APP_ID', 'CHANNEL', 'TOKEN', 'OPENAI_KEY', 'AUTHORIZATION']
+
+# Longer texts are cut before being sent to the agent
+MAX_SPOKEN_WORDS = 60
+
+
+class AgoraError(Exception):
+    """Raised when the Agora agent cannot be started."""
+
+
+def agora_config(settings):
+    """Build the flat Agora config dict from the nested settings"""
+    return {
+        'APP_ID': settings['agora']['app_id'],
+        'CHANNEL': settings['agora']['channel'],
+        'TOKEN': settings['agora']['token'],
+        'OPENAI_KEY': settings['agora']['openai_key'],
+        'AUTHORIZATION': settings['agora']['authorization'],
+        'HEADLESS': settings['agora']['headless']
+    }
+
+
+class AgoraAgent:
+    """Conversational AI agent plus the browser voice client that plays it.
+
+    ``start`` blocks for several seconds (REST join, then a Selenium-driven
+    browser), so callers run it off their event loop or GUI thread.
+    """
+
+    # Instance override points the agent at a local stand-in (benchmarks)
+    api_base = API_BASE
+
+    def __init__(self, config):
+        self.config = config
+        self.agent_id = None
+        self.client = None
+        self.is_initialized = False
+
+    def start(self, on_status=None):
+        """Join the agent to the channel and start the voice client.
+
+        Returns the raw Agora join response. Raises ``AgoraError`` with a
+        user-facing message when the agent could not be started.
+        """
+        try:
+            agent_response = self._start(on_status)
+        except AgoraError:
+            API_ERRORS.inc(source="Agora", code="join")
+            raise
+        AGENT_JOINS.inc()
+        return agent_response
+
+    def _start(self, on_status):
+        # selenium is only needed once an agent actually starts
+        import requests
+        from agora2 import AgoraSeleniumVoiceClient, start_ai_agent
+
+        status = on_status or (lambda message: None)
+        status("Starting Agora agent...")
+
+        missing = [f for f in REQUIRED_FIELDS if not self.config.get(f)]
+        if missing:
+            raise AgoraError(f"Missing required settings: {', '.join(missing)}")
+
+        status("Connecting to Agora API...")
+        try:
+            agent_response = start_ai_agent(
+                self.config['APP_ID'],
+                "",  # customer_id - not used
+                "",  # customer_secret - not used
+                self.config['CHANNEL'],
+                self.config['TOKEN'],
+                "1001",  # agent_uid - fixed
+                "1002",  # user_uid - fixed
+                self.config['OPENAI_KEY'],
+                "",  # azure_key - not used
+                "eastus",  # azure_region - not used
+                self.config['AUTHORIZATION']
+            )
+        except requests.exceptions.RequestException as e:
+            print(f"Network error details: {e}")
+            raise AgoraError(f"Network error: {str(e)}")
+
+        if not agent_response:
+            raise AgoraError("No response from Agora API")
+
+        if "code" in agent_response and agent_response["code"] != 0:
+            error_msg = agent_response.get("message", "Unknown error")
+            reason = agent_response.get("reason", "")
+            full_error = f"{error_msg}" + (f": {reason}" if reason else "")
+            print(f"Full Agora response: {agent_response}")
+            raise AgoraError(f"Agora API error - {full_error}")
+
+        agent_status = agent_response.get("status")
+        if agent_status not in ["STARTING", "RUNNING"]:
+            reason = agent_response.get("reason", "Unknown reason")
+            print(f"Full Agora response: {agent_response}")
+            raise AgoraError(f"Agent failed to start. Status: {agent_status}, Reason: {reason}")
+
+        agent_id = agent_response.get("agent_id")
+        if not agent_id:
+            print(f"Full Agora response: {agent_response}")
+            raise AgoraError("No agent_id in response")
+
+        status(f"Agent started (ID: {agent_id}), initializing voice client...")
+        time.sleep(5)
+
+        status("Starting voice client...")
+        client = AgoraSeleniumVoiceClient(
+            app_id=self.config['APP_ID'],
+            channel=self.config['CHANNEL'],
+            token=self.config['TOKEN'],
+            uid="1002",
+            agent_uid="1001",
+            headless=self.config.get('HEADLESS', True)
+        )
+        client.start()
+
+        self.agent_id = agent_id
+        self.client = client
+        self.is_initialized = True
+        status("Connected successfully!")
+        agent_response['_client'] = client
+        return agent_response
+
+    def _speak_request(self, text):
+        if not self.is_initialized or not self.agent_id:
+            raise Exception("Agora not initialized")
+
+        words = text.split()
+        if len(words) > MAX_SPOKEN_WORDS:
+            text = ' '.join(words[:MAX_SPOKEN_WORDS])
+
+        url = f"{self.api_base}/{self.config['APP_ID']}/agents/{self.agent_id}/speak"
+
+        payload = {
+            "text": text,
+            "priority": "INTERRUPT",
+            "interruptable": False
+        }
+        headers = {
+            "Authorization": "Basic " + self.config['AUTHORIZATION']
+        }
+        return url, payload, headers
+
+    def speak(self, text):
+        import requests
+
+        url, payload, headers = self._speak_request(text)
+        with SPEAK_LATENCY.time():
+            response = requests.post(url, json=payload, headers=headers,
+                                     timeout=DEFAULT_TIMEOUT)
+        return response.json()
+
+    async def speak_async(self, text, http):
+        """``speak`` over a shared HTTPClient, for callers on an event loop"""
+        url, payload, headers = self._speak_request(text)
+        with SPEAK_LATENCY.time():
+            return await http.post(url, json=payload, headers=headers, source="Agora")
+
+    def cleanup(self):
+        if not self.agent_id:
+            return
+
+        try:
+            import requests
+
+            url = f"{self.api_base}/{self.config['APP_ID']}/agents/{self.agent_id}/leave"
+
+            headers = {
+                "Authorization": "Basic " + self.config['AUTHORIZATION']
+            }
+
+            requests.post(url, headers=headers)
+
+            if self.client:
+                self.client.stop()
+
+        except Exception as e:
+            print(f"Error during cleanup: {e}")
@@ -0,0 +1,417 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import time
+from collections import deque
+from urllib.parse import parse_qs, urlsplit
+
+from .metrics import API_REQUESTS
+from .pipeline import Announcement
+from .tracing import Trace
+
+
+# ============== LOCAL HTTP API ==============
+#
+# Lets other school systems inject notices and dashboards follow the feed,
+# on a small asyncio server like the /metrics endpoint (no web framework):
+#
+#   POST /api/announcements  {"title", "text", "sender", "urgent"}; urgent
+#                            notices are spoken next, like a bell
+#   GET  /api/feed           recent items, newest first; ?before=<id> pages
+#                            back, ?after=<id> returns only what is newer
+#   GET  /api/stream         WebSocket of {"type": "item"} for every new item
+#                            and {"type": "playback"} when speaking starts
+#                            or stops; ?after=<id> first sends what was missed
+#
+# Feed items get increasing ids as they reach the feed; the ids are the
+# cursors. With ``api.token`` set every request needs it, as
+# ``Authorization: Bearer <token>`` or, for browser WebSockets, ``?token=``.
+
+DEFAULT_PORT = 8765
+
+# Items kept for /api/feed and stream catch-up
+FEED_SIZE = 1000
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+MAX_BODY_BYTES = 64 * 1024
+
+# Seconds a client gets to send its request
+REQUEST_TIMEOUT = 5
+
+# Messages a stream client may fall behind by before it is disconnected
+CLIENT_BACKLOG = 256
+
+# Seconds ``close`` lets open requests and streams finish before cancelling
+CLOSE_TIMEOUT = 1.0
+
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+_WS_TEXT, _WS_CLOSE, _WS_PING, _WS_PONG = 0x1, 0x8, 0x9, 0xA
+
+_ROUTES = ("/api/announcements", "/api/feed", "/api/stream")
+
+_REASONS = {200: "OK", 202: "Accepted", 400: "Bad Request", 401: "Unauthorized",
+            404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large"}
+
+
+class _RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def feed_item(item_id, announcement):
+    """JSON form of a feed item"""
+    return {
+        'id': item_id,
+        'kind': announcement.kind,
+        'source': announcement.source,
+        'title': announcement.title,
+        'sender': announcement.sender,
+        'ts': announcement.ts,
+        'timestamp': announcement.timestamp,
+        'text': announcement.text,
+        'broadcast': announcement.broadcast
+    }
+
+
+class FeedLog:
+    """The last FEED_SIZE feed items, with consecutive ids from 1"""
+
+    def __init__(self, size=FEED_SIZE):
+        self._items = deque(maxlen=size)
+        self.last_id = 0
+
+    def add(self, announcement):
+        self.last_id += 1
+        item = feed_item(self.last_id, announcement)
+        self._items.append(item)
+        return item
+
+    def _index(self, item_id):
+        """Position of ``item_id`` in the log, clamped to it"""
+        first = self.last_id - len(self._items) + 1
+        return min(max(item_id - first, 0), len(self._items))
+
+    def page(self, before=None, after=None, limit=PAGE_SIZE):
+        """``(items, next cursor)``.
+
+        Newest first, older than ``before`` if given; with ``after``, the
+        oldest items newer than it, oldest first. The cursor is None at the end.
+        """
+        items = self._items
+        if after is not None:
+            start = self._index(after + 1)
+            page = [items[i] for i in range(start, min(start + limit, len(items)))]
+            return page, page[-1]['id'] if start + limit < len(items) else None
+        end = self._index(before) if before is not None else len(items)
+        page = [items[i] for i in range(end - 1, max(end - limit, 0) - 1, -1)]
+        return page, page[-1]['id'] if end - limit > 0 else None
+
+
+def _frame(opcode, payload):
+    """Unmasked, unfragmented WebSocket frame"""
+    length = len(payload)
+    if length < 126:
+        header = bytes((0x80 | opcode, length))
+    elif length < 65536:
+        header = bytes((0x80 | opcode, 126)) + length.to_bytes(2, "big")
+    else:
+        header = bytes((0x80 | opcode, 127)) + length.to_bytes(8, "big")
+    return header + payload
+
+
+async def read_frame(reader):
+    """``(opcode, payload)`` of the next WebSocket frame, masked or not"""
+    head = await reader.readexactly(2)
+    length = head[1] & 0x7F
+    if length == 126:
+        length = int.from_bytes(await reader.readexactly(2), "big")
+    elif length == 127:
+        length = int.from_bytes(await reader.readexactly(8), "big")
+    if length > MAX_BODY_BYTES:
+        raise _RequestError(413, "frame too large")
+    mask = await reader.readexactly(4) if head[1] & 0x80 else None
+    payload = await reader.readexactly(length)
+    if mask:
+        payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+    return head[0] & 0x0F, payload
+
+
+class ApiServer:
+    """The local API; lives on one asyncio loop.
+
+    Posted notices go to ``emit``, urgent ones to ``emit_urgent``, on the
+    loop. ``publish`` and ``playback`` report what reaches the feed and the
+    speaker, and may be called from any thread once ``start`` has run.
+    """
+
+    def __init__(self, settings, emit, emit_urgent):
+        self.host = settings['host']
+        self.port = settings['port']
+        self.token = settings['token']
+        self.emit = emit
+        self.emit_urgent = emit_urgent
+        self.feed = FeedLog()
+        # One queue of encoded messages per stream client
+        self._clients = set()
+        # Connection handler tasks still running
+        self._handlers = set()
+        self._server = None
+        self._loop = None
+
+    async def start(self):
+        """Listen on ``host``:``port``; False if that is not possible"""
+        self._loop = asyncio.get_running_loop()
+        try:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        except OSError as e:
+            print(f"API unavailable: {e}")
+            return False
+        self.port = self._server.sockets[0].getsockname()[1]  # if 0 was given
+        print(f"API at http://{self.host}:{self.port}/api/")
+        return True
+
+    async def close(self):
+        """Stop listening, disconnect stream clients and wait for every handler"""
+        if self._server is not None:
+            self._server.close()
+        for queue in list(self._clients):
+            self._disconnect(queue)
+        if self._handlers:
+            _, pending = await asyncio.wait(self._handlers, timeout=CLOSE_TIMEOUT)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        if self._server is not None:
+            await self._server.wait_closed()
+            self._server = None
+
+    def publish(self, announcement):
+        """An item reached the feed"""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._publish, announcement)
+
+    def playback(self, announcement=None):
+        """Speaking ``announcement`` started; None when speaking stopped"""
+        if self._loop is None:
+            return
+        message = {'type': "playback", 'state': "speaking" if announcement else "idle"}
+        if announcement is not None:
+            message.update(source=announcement.source, title=announcement.title,
+                           ts=announcement.ts)
+        self._loop.call_soon_threadsafe(self._broadcast, message)
+
+    def _publish(self, announcement):
+        self._broadcast({'type': "item", 'item': self.feed.add(announcement)})
+
+    def _broadcast(self, message):
+        if not self._clients:
+            return
+        frame = _frame(_WS_TEXT, json.dumps(message).encode())
+        for queue in list(self._clients):
+            try:
+                queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                # Too slow to keep up; it can reconnect with ?after=
+                self._disconnect(queue)
+
+    def _disconnect(self, queue):
+        """End a stream client's connection once it has sent what is queued"""
+        self._clients.discard(queue)
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+    # ---------- HTTP ----------
+
+    async def _handle(self, reader, writer):
+        task = asyncio.current_task()
+        self._handlers.add(task)
+        try:
+            await self._serve(reader, writer)
+        except asyncio.CancelledError:
+            # Cut off by ``close``; the streams module would report a
+            # cancelled handler as an unhandled error
+            writer.close()
+        finally:
+            self._handlers.discard(task)
+
+    async def _serve(self, reader, writer):
+        route = "other"
+        try:
+            method, target, headers, body = await asyncio.wait_for(
+                self._read_request(reader), REQUEST_TIMEOUT)
+            url = urlsplit(target)
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            route = url.path if url.path in _ROUTES else "other"
+            self._authorize(headers, query)
+            if route == "/api/stream":
+                await self._stream(reader, writer, headers, query)
+                return
+            if route == "/api/announcements":
+                if method != "POST":
+                    raise _RequestError(405, "use POST")
+                status, response = 202, self._post(body)
+            elif route == "/api/feed":
+                if method != "GET":
+                    raise _RequestError(405, "use GET")
+                status, response = 200, self._get_feed(query)
+            else:
+                raise _RequestError(404, "no such endpoint")
+        except _RequestError as e:
+            status, response = e.status, {'error': str(e)}
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+            return
+        API_REQUESTS.inc(route=route, status=str(status))
+        self._respond(writer, status, response)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_request(reader):
+        request_line = (await reader.readline()).decode("latin-1").split()
+        if len(request_line) < 2:
+            raise asyncio.IncompleteReadError(b"", None)
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            raise _RequestError(400, "bad Content-Length") from None
+        if length > MAX_BODY_BYTES:
+            raise _RequestError(413, f"body over {MAX_BODY_BYTES} bytes")
+        body = await reader.readexactly(length) if length else b""
+        return request_line[0], request_line[1], headers, body
+
+    def _authorize(self, headers, query):
+        if not self.token:
+            return
+        scheme, _, supplied = headers.get('authorization', "").partition(" ")
+        if scheme.lower() != "bearer":
+            supplied = query.get('token', "")
+        if not hmac.compare_digest(supplied.encode(), self.token.encode()):
+            raise _RequestError(401, "missing or wrong token")
+
+    @staticmethod
+    def _respond(writer, status, response):
+        body = json.dumps(response).encode()
+        writer.write(
+            f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n".encode() + body)
+
+    def _post(self, body):
+        try:
+            notice = json.loads(body)
+        except ValueError:
+            raise _RequestError(400, "body is not JSON") from None
+        if not isinstance(notice, dict) or not isinstance(notice.get('text'), str) \
+                or not notice['text'].strip():
+            raise _RequestError(400, "'text' is required")
+        title = notice.get('title') or notice['text'][:60]
+        sender = notice.get('sender') or ""
+        if not isinstance(title, str) or not isinstance(sender, str):
+            raise _RequestError(400, "'title' and 'sender' must be strings")
+
+        now = time.time()
+        announcement = Announcement("Notice", title, notice['text'], now, sender,
+                                    trace=Trace("Notice").mark("source", now))
+        if notice.get('urgent'):
+            self.emit_urgent(announcement)
+        else:
+            self.emit(announcement)
+        return {'accepted': True, 'urgent': bool(notice.get('urgent'))}
+
+    def _get_feed(self, query):
+        try:
+            limit = min(max(int(query.get('limit', PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+            before = int(query['before']) if 'before' in query else None
+            after = int(query['after']) if 'after' in query else None
+        except ValueError:
+            raise _RequestError(400, "limit, before and after must be integers") from None
+        items, cursor = self.feed.page(before, after, limit)
+        return {'items': items, 'next': cursor, 'last_id': self.feed.last_id}
+
+    # ---------- WebSocket ----------
+
+    async def _stream(self, reader, writer, headers, query):
+        key = headers.get('sec-websocket-key')
+        if headers.get('upgrade', "").lower() != "websocket" or not key:
+            raise _RequestError(400, "WebSocket upgrade required")
+        accept = base64.b64encode(hashlib.sha1((key + _WS_GUID).encode()).digest()).decode()
+        writer.write(
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n".encode())
+        API_REQUESTS.inc(route="/api/stream", status="101")
+
+        queue = asyncio.Queue(CLIENT_BACKLOG)
+        if 'after' in query:
+            try:
+                after = int(query['after'])
+            except ValueError:
+                after = self.feed.last_id
+            missed, _ = self.feed.page(after=after, limit=CLIENT_BACKLOG - 1)
+            for item in missed:
+                queue.put_nowait(_frame(_WS_TEXT, json.dumps(
+                    {'type': "item", 'item': item}).encode()))
+        self._clients.add(queue)
+
+        sending = asyncio.ensure_future(self._send_frames(writer, queue))
+        receiving = asyncio.ensure_future(self._receive_frames(reader, writer))
+        try:
+            await asyncio.wait((sending, receiving), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            self._clients.discard(queue)
+            sending.cancel()
+            receiving.cancel()
+            await asyncio.gather(sending, receiving, return_exceptions=True)
+            if not writer.is_closing():
+                # Flushed by close(), without waiting on a stalled client
+                writer.write(_frame(_WS_CLOSE, b""))
+            writer.close()
+
+    @staticmethod
+    async def _send_frames(writer, queue):
+        while True:
+            frame = await queue.get()
+            if frame is None:
+                return
+            writer.write(frame)
+            await writer.drain()
+
+    @staticmethod
+    async def _receive_frames(reader, writer):
+        """Answer pings until the client closes; its messages are ignored"""
+        try:
+            while True:
+                opcode, payload = await read_frame(reader)
+                if opcode == _WS_CLOSE:
+                    return
+                if opcode == _WS_PING:
+                    writer.write(_frame(_WS_PONG, payload))
+        except (asyncio.IncompleteReadError, ConnectionError, _RequestError):
+            return
+
+
+def api_from_settings(settings, emit, emit_urgent):
+    """ApiServer for the ``api`` settings, or None when it is off"""
+    if not settings['enabled']:
+        return None
+    return ApiServer(settings, emit, emit_urgent)
@@ -0,0 +1,137 @@
+import asyncio
+import time
+from collections import Counter
+
+from .pipeline import Announcement
+
+
+# ============== CATCH-UP AFTER DOWNTIME ==============
+#
+# A source's first poll after it has gone without a successful poll for
+# longer than CATCH_UP_GAP reads everything it missed within
+# ``lookback_hours`` in bulk (``Source.fetch_backlog``) instead of skipping
+# it or trickling it in. Across a restart the gap is measured from the time
+# the outbox saved the source's state; a source that has never polled
+# successfully has no gap, so a first run only records where to start. The backlog is parsed off the event loop, items seen through more than
+# one account are dropped, and items changed within ``fresh_minutes`` are
+# emitted as usual. Everything older goes on one digest card, shown but not
+# spoken, once every source that is catching up has finished.
+
+DEFAULT_LOOKBACK_HOURS = 24
+DEFAULT_FRESH_MINUTES = 15
+
+# A source without a successful poll for this long (or two intervals, if
+# longer) catches up on its next one
+CATCH_UP_GAP = 600
+
+# Titles listed on the digest card
+DIGEST_TITLES = 15
+
+
+def changed_at(announcement):
+    """When the item last changed at its source, e.g. a moved due date"""
+    trace = announcement.trace
+    return trace.marks.get("source", announcement.ts) if trace else announcement.ts
+
+
+def digest(items, duplicates=0):
+    """Display-only card listing missed items, newest last"""
+    items = sorted(items, key=changed_at)
+    counts = Counter(a.source for a in items)
+    lines = [", ".join(f"{source}: {count}" for source, count in sorted(counts.items()))]
+    lines += [f"{a.timestamp[:16]} {a.source}: {a.title}" for a in items[-DIGEST_TITLES:]]
+    hidden = len(items) - DIGEST_TITLES
+    if hidden > 0:
+        lines.append(f"... and {hidden} more")
+    if duplicates:
+        lines.append(f"{duplicates} duplicate(s) from other accounts left out")
+
+    card = Announcement("Digest", f"Missed while offline: {len(items)} item(s)",
+                        "\n".join(lines), changed_at(items[-1]), source="Catch-up")
+    card.broadcast = False
+    return card
+
+
+class CatchUp:
+    """Catch-up policy and the digest shared by every source of an IngestCore.
+
+    ``emit_digest`` gets the digest card; it is called on the core's loop.
+    """
+
+    def __init__(self, settings, emit_digest):
+        self.emit_digest = emit_digest
+        self.configure(settings)
+        self._running = 0
+        self._seen = set()
+        self._stale = []
+        self._fresh = 0
+        self._duplicates = 0
+
+    def configure(self, settings):
+        """Apply the ``catch_up`` settings section"""
+        self.enabled = settings['enabled']
+        self.lookback = settings['lookback_hours'] * 3600
+        self.fresh = settings['fresh_minutes'] * 60
+
+    def due(self, last_success, interval):
+        """Whether a source last polled successfully at ``last_success``
+        (``time.monotonic``, None if never) should catch up"""
+        if not self.enabled or last_success is None:
+            return False
+        return time.monotonic() - last_success > max(CATCH_UP_GAP, 2 * interval)
+
+    async def run(self, source, emit):
+        """Catch ``source`` up; fetch errors propagate to ``Source.poll``"""
+        self._running += 1
+        try:
+            delta = await source.fetch_backlog(time.time() - self.lookback)
+            if delta is None:
+                return
+            if source.parse_pool is None:
+                announcements = await asyncio.to_thread(self._prepare, source, delta)
+            else:
+                announcements = [a for a in await source.parse(delta)
+                                 if changed_at(a) >= delta.since]
+
+            fresh_since = time.time() - self.fresh
+            for announcement in announcements:
+                key = (announcement.kind, announcement.title, announcement.sender,
+                       int(announcement.ts), announcement.text)
+                if key in self._seen:
+                    self._duplicates += 1
+                    continue
+                self._seen.add(key)
+                if changed_at(announcement) >= fresh_since:
+                    self._fresh += 1
+                    emit(announcement)
+                else:
+                    self._stale.append(announcement)
+            source.commit(delta.watermark)
+        finally:
+            self._running -= 1
+            if not self._running:
+                self._finish()
+
+    @staticmethod
+    def _prepare(source, delta):
+        """Parse a backlog on a worker thread, keeping what is in the window"""
+        announcements = []
+        for raw in delta.items:
+            announcement = source.normalize(raw, delta)
+            if announcement is None or changed_at(announcement) < delta.since:
+                continue
+            # Decoded and cleaned up here, not on the loop or the GUI thread
+            announcements.append(announcement.prepare())
+        return announcements
+
+    def _finish(self):
+        stale, self._stale = self._stale, []
+        fresh, self._fresh = self._fresh, 0
+        duplicates, self._duplicates = self._duplicates, 0
+        self._seen.clear()
+        if not stale and not fresh:
+            return
+        print(f"Caught up on {len(stale) + fresh} missed item(s): {fresh} announced, "
+              f"{len(stale)} in the digest, {duplicates} duplicate(s) dropped")
+        if stale:
+            self.emit_digest(digest(stale, duplicates))
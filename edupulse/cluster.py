@@ -0,0 +1,360 @@
+import asyncio
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+from .catchup import DEFAULT_FRESH_MINUTES, changed_at, digest
+from .pipeline import Announcement
+from .tracing import Trace
+
+
+# ============== CLUSTER MODE ==============
+#
+# Several stations can run for one school and share its sources. They
+# coordinate through one SQLite file, on a network share or on local disk
+# for several processes on one machine. Every source, and the PA broadcast
+# itself, has a lease in that file: only the station holding a source's
+# lease polls it, and only the holder of the SPEAKER lease speaks. Leases
+# last ``lease_seconds`` and are renewed every third of that, so a station
+# that stops is replaced within one lease period. The leader writes each
+# poll's new items and the source's polling state in one transaction; the
+# other stations read the items back from the store to show them, and a new
+# leader continues from the saved state. Items already in the store (e.g.
+# fetched again after a failover) are dropped. Lease expiry is compared on
+# wall clocks, so stations on different machines need synchronized time.
+# A station with a fixed ``station`` name saves how far it has read and
+# continues from there after a restart; others start at the catch-up
+# lookback window, or at the end of the log with catch-up off. Items
+# logged while a station was down and older than ``fresh_minutes`` go on a
+# digest card rather than being spoken late.
+
+SPEAKER = "speaker"
+
+DEFAULT_LEASE_SECONDS = 15
+
+# How often followers read new items from the store
+REPLICATE_INTERVAL = 1.0
+
+# Items are kept, and deduplicated, for this long
+LOG_RETENTION = 7 * 86400
+PRUNE_INTERVAL = 3600
+
+# Seconds to wait for another station's write lock
+BUSY_TIMEOUT = 10
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY, holder TEXT NOT NULL, expires REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS state (
+    name TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS items (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT NOT NULL UNIQUE,
+    station TEXT NOT NULL, created REAL NOT NULL, record TEXT NOT NULL);
+"""
+
+
+def item_key(announcement):
+    """Identity of an item across stations"""
+    parts = (announcement.kind, announcement.account, announcement.title,
+             announcement.sender, str(int(announcement.ts)), announcement.text)
+    return hashlib.sha256("\0".join(parts).encode()).hexdigest()
+
+
+class ClusterStore:
+    """Leases, polling state and the item log in one SQLite file.
+
+    Methods block; the cluster calls them on worker threads, one at a time.
+    The default rollback journal is used since WAL does not work over
+    network file systems.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._db = sqlite3.connect(path, timeout=BUSY_TIMEOUT, isolation_level=None,
+                                   check_same_thread=False)
+        self._lock = threading.Lock()
+        self._db.executescript(_SCHEMA)
+
+    def _transaction(self, work):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                result = work(self._db)
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+            return result
+
+    def acquire(self, names, holder, lease_seconds):
+        """Take or renew the free or own leases among ``names``; the set now held"""
+        def work(db):
+            now = time.time()
+            for name in names:
+                db.execute(
+                    "INSERT INTO leases (name, holder, expires) VALUES (?, ?, ?) "
+                    "ON CONFLICT (name) DO UPDATE SET holder = excluded.holder, "
+                    "expires = excluded.expires "
+                    "WHERE leases.holder = excluded.holder OR leases.expires < ?",
+                    (name, holder, now + lease_seconds, now))
+            rows = db.execute("SELECT name FROM leases WHERE holder = ?", (holder,))
+            return {name for (name,) in rows} & set(names)
+        return self._transaction(work)
+
+    def release(self, names, holder):
+        self._transaction(lambda db: db.executemany(
+            "DELETE FROM leases WHERE name = ? AND holder = ?",
+            [(name, holder) for name in names]))
+
+    def commit(self, name, station, announcements, state=None):
+        """Log the items not logged yet and, unless None, save ``state``.
+
+        Returns the newly logged items, in order.
+        """
+        rows = [(item_key(a), station, time.time(), json.dumps(_to_record(a)))
+                for a in announcements]
+
+        def work(db):
+            new = []
+            for announcement, row in zip(announcements, rows):
+                cursor = db.execute(
+                    "INSERT OR IGNORE INTO items (key, station, created, record) "
+                    "VALUES (?, ?, ?, ?)", row)
+                if cursor.rowcount:
+                    new.append(announcement)
+            if state is not None:
+                db.execute("INSERT OR REPLACE INTO state (name, value) VALUES (?, ?)",
+                           (name, json.dumps(state)))
+            return new
+        return self._transaction(work)
+
+    def load_state(self, name):
+        with self._lock:
+            row = self._db.execute("SELECT value FROM state WHERE name = ?", (name,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_state(self, name, state):
+        self._transaction(lambda db: db.execute(
+            "INSERT OR REPLACE INTO state (name, value) VALUES (?, ?)",
+            (name, json.dumps(state))))
+
+    def start_seq(self, cursor=None, since=None):
+        """Where a station starts reading: the position saved as ``cursor``,
+        else just before the items logged from ``since`` on, else the end"""
+        if cursor is not None:
+            saved = self.load_state(cursor)
+            if saved is not None:
+                return saved
+        with self._lock:
+            if since is None:
+                row = self._db.execute("SELECT COALESCE(MAX(seq), 0) FROM items").fetchone()
+            else:
+                row = self._db.execute(
+                    "SELECT COALESCE(MAX(seq), 0) FROM items WHERE created < ?",
+                    (since,)).fetchone()
+        return row[0]
+
+    def read_since(self, seq):
+        """``[(seq, station, record)]`` logged after ``seq``"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT seq, station, record FROM items WHERE seq > ? ORDER BY seq",
+                (seq,)).fetchall()
+        return [(seq, station, json.loads(record)) for seq, station, record in rows]
+
+    def prune(self, before):
+        self._transaction(lambda db: db.execute(
+            "DELETE FROM items WHERE created < ?", (before,)))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def _to_record(announcement):
+    record = announcement.to_record()
+    if announcement.trace:
+        record['marks'] = announcement.trace.marks
+    return record
+
+
+def _from_record(record):
+    announcement = Announcement.from_record(record)
+    marks = record.get('marks')
+    if marks:
+        announcement.trace = Trace(announcement.kind, marks=marks).mark("replicated")
+    return announcement
+
+
+class Cluster:
+    """This station's view of the cluster; runs on the IngestCore loop.
+
+    ``emitters`` maps an item kind to the callback for items other stations
+    logged, with ``default`` for other kinds and the digest card. Without a
+    saved position, reading starts ``lookback`` seconds back, or at the end
+    of the log if None; items of that backlog older than ``fresh`` seconds
+    go on the digest.
+    """
+
+    def __init__(self, settings, emitters, default, lookback=None,
+                 fresh=DEFAULT_FRESH_MINUTES * 60):
+        self.station = settings['station'] or f"{socket.gethostname()}-{os.getpid()}"
+        self.lease_seconds = settings['lease_seconds']
+        self.store = ClusterStore(settings['store'])
+        self.emitters = emitters
+        self.default = default
+        self.lookback = lookback
+        self.fresh = fresh
+        # Read position saved under this name; generated names change each run
+        self._cursor = f"cursor:{settings['station']}" if settings['station'] else None
+        # Leases wanted: name -> called when this station gains it
+        self._wanted = {}
+        # Leases held: name -> time.monotonic() they run out here
+        self._held = {}
+        self._seq = None
+        self._renew_now = None
+
+    def want(self, name, on_acquired=None):
+        """Contend for lease ``name`` from the next renewal on"""
+        self._wanted[name] = on_acquired
+        if self._renew_now is not None:
+            self._renew_now.set()
+
+    def drop(self, name):
+        """Stop contending for ``name`` and release it if held; call on the loop"""
+        self._wanted.pop(name, None)
+        if self._held.pop(name, None) is not None:
+            # Off the loop: a busy store may block for BUSY_TIMEOUT
+            asyncio.get_running_loop().run_in_executor(None, self._release, [name])
+
+    def leads(self, name):
+        """Whether this station holds lease ``name``; callable from any thread"""
+        expires = self._held.get(name)
+        return expires is not None and time.monotonic() < expires
+
+    async def load_state(self, name):
+        """Polling state the last leader of ``name`` saved, or None"""
+        try:
+            return await asyncio.to_thread(self.store.load_state, name)
+        except sqlite3.Error as e:
+            print(f"Cluster store unavailable, continuing from local state: {e}")
+            return None
+
+    async def commit(self, name, announcements, state=None):
+        """Log a poll's items and state; returns the items not logged before.
+
+        While the store is unreachable every item is returned, so that it is
+        at least shown here.
+        """
+        try:
+            return await asyncio.to_thread(
+                self.store.commit, name, self.station, announcements, state)
+        except sqlite3.Error as e:
+            print(f"Cluster store unavailable, {len(announcements)} item(s) not shared: {e}")
+            return announcements
+
+    async def run(self):
+        self._renew_now = asyncio.Event()
+        since = time.time() - self.lookback if self.lookback else None
+        self._seq = await asyncio.to_thread(self.store.start_seq, self._cursor, since)
+        print(f"Cluster station {self.station} using {self.store.path}")
+        next_renew = next_prune = 0
+        backlog = True
+        try:
+            while True:
+                now = time.monotonic()
+                if now >= next_renew or self._renew_now.is_set():
+                    self._renew_now.clear()
+                    await self._renew()
+                    next_renew = now + self.lease_seconds / 3
+                if now >= next_prune:
+                    await asyncio.to_thread(self.store.prune, time.time() - LOG_RETENTION)
+                    next_prune = now + PRUNE_INTERVAL
+                if await self._replicate(backlog):
+                    backlog = False
+                try:
+                    await asyncio.wait_for(self._renew_now.wait(), REPLICATE_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            # Let another station take over at once rather than after expiry
+            held = list(self._held)
+            self._held.clear()
+            await asyncio.to_thread(self._release, held)
+
+    async def _renew(self):
+        started = time.monotonic()
+        try:
+            held = await asyncio.to_thread(
+                self.store.acquire, list(self._wanted), self.station, self.lease_seconds)
+        except sqlite3.Error as e:
+            # Leadership lapses here once the local expiry passes
+            print(f"Cluster store unavailable: {e}")
+            return
+        gained = {name for name in held if not self.leads(name)}
+        for name in set(self._held) - held:
+            print(f"Station {self.station} no longer leads {name}")
+        self._held = {name: started + self.lease_seconds for name in held}
+        for name in gained:
+            print(f"Station {self.station} now leads {name}")
+            callback = self._wanted.get(name)
+            if callback is not None:
+                callback()
+
+    async def _replicate(self, backlog=False):
+        """Emit what other stations logged; False if the store was unreachable"""
+        try:
+            rows = await asyncio.to_thread(self.store.read_since, self._seq)
+        except sqlite3.Error as e:
+            print(f"Cluster store unavailable: {e}")
+            return False
+        fresh_since = time.time() - self.fresh
+        missed = []
+        for seq, station, record in rows:
+            self._seq = seq
+            if station == self.station:
+                continue  # emitted here when it was polled
+            announcement = _from_record(record)
+            if backlog and changed_at(announcement) < fresh_since:
+                missed.append(announcement)
+            else:
+                self.emitters.get(announcement.kind, self.default)(announcement)
+        if missed:
+            print(f"{len(missed)} item(s) logged by other stations while this one "
+                  "was down, listed on a digest")
+            self.default(digest(missed))
+        if self._cursor is not None and (rows or backlog):
+            try:
+                await asyncio.to_thread(self.store.save_state, self._cursor, self._seq)
+            except sqlite3.Error as e:
+                print(f"Cluster read position not saved: {e}")
+        return True
+
+    def _release(self, names):
+        if not names:
+            return
+        try:
+            self.store.release(names, self.station)
+        except sqlite3.Error as e:
+            print(f"Could not release cluster leases: {e}")
+
+
+def cluster_from_settings(settings, emitters, default):
+    """Cluster for the ``cluster`` settings, or None when standalone"""
+    cluster = settings['cluster']
+    if not cluster['enabled']:
+        return None
+    if not cluster['store']:
+        print("Cluster mode needs cluster.store; running standalone")
+        return None
+    catch_up = settings['catch_up']
+    lookback = catch_up['lookback_hours'] * 3600 if catch_up['enabled'] else None
+    try:
+        return Cluster(cluster, emitters, default, lookback, catch_up['fresh_minutes'] * 60)
+    except sqlite3.Error as e:
+        print(f"Cluster store {cluster['store']} unavailable, running standalone: {e}")
+        return None
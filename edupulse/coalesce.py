@@ -0,0 +1,90 @@
+import threading
+from collections import deque
+
+from .metrics import QUEUE_DEPTH
+from .pipeline import Announcement
+
+
+# ============== INGESTION BUFFER ==============
+#
+# Sits between the ingestion thread and the GUI. Producers put announcements
+# from any thread; the GUI drains everything pending once per frame, so a
+# catch-up backlog costs one GUI update instead of one Qt event per item.
+
+BUFFER_CAPACITY = 500
+
+# Batches larger than this are shown as a single summary card
+BURST_THRESHOLD = 5
+
+# Titles listed in a burst summary
+SUMMARY_TITLES = 10
+
+
+class AnnouncementBuffer:
+    """Bounded, thread-safe buffer of announcements waiting for the GUI.
+
+    When full, the oldest pending announcement is dropped and counted, so a
+    stalled GUI never grows memory without bound. ``on_drop`` is called with
+    each dropped announcement, on the producer's thread.
+    """
+
+    def __init__(self, capacity=BUFFER_CAPACITY, on_drop=None):
+        self._items = deque()
+        self._capacity = capacity
+        self._dropped = 0
+        self._on_drop = on_drop
+        self._lock = threading.Lock()
+
+    def put(self, announcement):
+        """Add an announcement; True if the buffer was empty before.
+
+        Callers use the return value to wake the consumer once per batch
+        rather than once per item.
+        """
+        dropped = None
+        with self._lock:
+            was_empty = not self._items and not self._dropped
+            if len(self._items) >= self._capacity:
+                dropped = self._items.popleft()
+                self._dropped += 1
+            self._items.append(announcement)
+            QUEUE_DEPTH.set(len(self._items), queue="gui")
+        if dropped is not None and self._on_drop is not None:
+            self._on_drop(dropped)
+        return was_empty
+
+    def drain(self):
+        """Take everything pending: ``(announcements, dropped_count)``"""
+        with self._lock:
+            items = list(self._items)
+            dropped = self._dropped
+            self._items.clear()
+            self._dropped = 0
+            QUEUE_DEPTH.set(0, queue="gui")
+            return items, dropped
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+
+def summarize(announcements, dropped=0, language="English"):
+    """One summary announcement standing in for a burst, e.g. "37 new emails"."""
+    total = len(announcements) + dropped
+    kinds = {a.kind for a in announcements}
+    if kinds == {"Email"}:
+        noun = "emails"
+    elif kinds == {"Classroom"}:
+        noun = "Classroom announcements"
+    else:
+        noun = "announcements"
+
+    title = f"{total} new {noun}"
+    lines = [a.title for a in announcements[-SUMMARY_TITLES:]]
+    hidden = total - len(lines)
+    if hidden:
+        lines.append(f"... and {hidden} more")
+
+    return Announcement.summary(
+        title, ", ".join(sorted(kinds)), lines,
+        announcements[-1].ts if announcements else 0, language)
@@ -0,0 +1,279 @@
+import asyncio
+import itertools
+import signal
+
+from .agora import MAX_SPOKEN_WORDS, AgoraAgent, AgoraError, agora_config
+from .api import api_from_settings
+from .cluster import SPEAKER
+from .ingest import IngestCore
+from .metrics import QUEUE_DEPTH, serve_metrics
+from .scheduler import Scheduler
+from .startup import startup
+from .summarizer import SUMMARY_WAIT, summarizer_from_settings
+from .tracing import tracer
+
+
+# Rough speaking rate used to keep queued announcements from interrupting
+# each other (``speak`` is sent with INTERRUPT priority).
+WORDS_PER_SECOND = 2.5
+
+# A failed speak request is sent once more after this long; if that fails
+# too the item is dropped, rather than spoken hours late after a restart
+SPEAK_RETRY_DELAY = 2.0
+
+# Speak queue order: scheduled items go before anything already waiting
+PRIORITY_SCHEDULED = 0
+PRIORITY_NORMAL = 1
+
+
+class Daemon:
+    """Headless EduPulse: pollers, pipeline and speak queue on one event loop.
+
+    Sources run as coroutines on an IngestCore sharing this loop; only the
+    Agora agent start-up (selenium) and OAuth refreshes use worker threads.
+    """
+
+    def __init__(self, settings, broadcast=None, replay=None, service=None):
+        self.settings = settings
+        self.replay = replay
+        self.service = service
+        if broadcast is None:
+            broadcast = settings['audio']['auto_broadcast']
+        self.broadcast = broadcast
+        self.language = settings['audio']['default_language']
+        self.agent = AgoraAgent(agora_config(settings))
+        self.summarizer = None
+        self.scheduler = None
+        self.api = None
+        self.core = None
+        self.speak_queue = None
+        self._queued = itertools.count()
+        # Set when a scheduled item is queued, to cut the speaker's pause short
+        self._due = None
+        self._stopping = None
+        self._loop = None
+
+    async def run(self):
+        self._loop = asyncio.get_running_loop()
+        self.core = IngestCore(self._loop)
+        self.speak_queue = asyncio.PriorityQueue()
+        self._due = asyncio.Event()
+        self._stopping = asyncio.Event()
+        tracer.configure(self.settings['tracing'])
+
+        if self.broadcast:
+            with startup.phase("start Agora agent"):
+                await self._start_agent()
+            self.summarizer = summarizer_from_settings(self.settings)
+        else:
+            print("Auto broadcast disabled, announcements will only be logged")
+
+        speaker = asyncio.create_task(self._speaker())
+        metrics_server = await self._start_metrics()
+        self.api = api_from_settings(
+            self.settings['api'], self._on_announcement, self._on_urgent)
+        if self.api:
+            await self.api.start()
+
+        if self.replay is not None:
+            self.core.add_replay(
+                self.replay, self._on_announcement, self._on_announcement)
+            print(f"EduPulse daemon replaying {len(self.replay.events)} item(s)")
+            replaying = asyncio.create_task(self._finish_replay())
+            scheduling = None
+        else:
+            mailboxes, google_accounts = self.core.add_configured_sources(
+                self.settings, self._on_announcement, self._on_announcement)
+            print(f"EduPulse daemon running: {mailboxes} mailbox(es), "
+                  f"{google_accounts} Classroom account(s)")
+            if self.core.cluster is not None and self.broadcast and self.agent.is_initialized:
+                self.core.cluster.want(SPEAKER)
+            replaying = None
+            self.scheduler = Scheduler(self.settings['schedule'], self._on_scheduled,
+                                       self.language)
+            scheduling = asyncio.create_task(self.scheduler.run())
+            if self.scheduler.pending:
+                print(f"{self.scheduler.pending} scheduled announcement(s) pending")
+        if self.service is not None:
+            self.service.subscribe(self._settings_changed)
+            self.service.watch()
+        startup.finish("Daemon startup")
+        await self._stopping.wait()
+
+        print("Stopping EduPulse daemon...")
+        if self.service is not None:
+            self.service.close()
+        for task in (replaying, scheduling):
+            if task:
+                task.cancel()
+        if metrics_server:
+            metrics_server.close()
+        if self.api:
+            await self.api.close()
+        speaker.cancel()
+        await asyncio.gather(speaker, return_exceptions=True)
+        await self.core.shutdown()
+        if self.summarizer:
+            self.summarizer.close()
+        await asyncio.to_thread(self.agent.cleanup)
+        tracer.close()
+
+    def stop(self):
+        """Ask the daemon to shut down; safe to call from any thread."""
+        if self._loop and self._stopping:
+            self._loop.call_soon_threadsafe(self._stopping.set)
+
+    def _settings_changed(self, new, old):
+        # Called on the settings watcher thread
+        self._loop.call_soon_threadsafe(self._apply_settings, new, old)
+
+    def _apply_settings(self, new, old):
+        self.settings = new
+        self.language = new['audio']['default_language']
+        tracer.configure(new['tracing'])
+        if self.replay is None:
+            self.core.reconfigure(new)
+            self.scheduler.configure(new['schedule'], self.language)
+        for section in ('agora', 'metrics', 'push', 'summary', 'cluster', 'api', 'outbox',
+                        'parsing'):
+            if new[section] != old[section]:
+                print(f"{section} settings changed; they apply after a restart")
+
+    async def _finish_replay(self):
+        """Stop once the replay has been emitted and spoken"""
+        started = asyncio.get_running_loop().time()
+        await self.replay.finished.wait()
+        elapsed = asyncio.get_running_loop().time() - started
+        print(f"Replayed {self.replay.emitted} item(s) in {elapsed:.1f}s")
+        await self.speak_queue.join()
+        self._stopping.set()
+
+    async def _start_metrics(self):
+        host = self.settings['metrics']['host']
+        port = self.settings['metrics']['port']
+        if not port:
+            return None
+        try:
+            server = await serve_metrics(host, port)
+        except OSError as e:
+            print(f"Metrics endpoint unavailable: {e}")
+            return None
+        print(f"Metrics at http://{host}:{port}/metrics")
+        return server
+
+    async def _start_agent(self):
+        try:
+            agent_response = await asyncio.to_thread(self.agent.start, print)
+            print(f"Connected • Agent ID: {agent_response.get('agent_id')}")
+        except AgoraError as e:
+            print(f"Agora error: {e}")
+        except Exception as e:
+            print(f"Initialization error: {e}")
+
+    def _on_announcement(self, announcement):
+        announcement.localize(self.language)
+        print(f"[{announcement.source}] {announcement.timestamp} {announcement.title}")
+        if self.api:
+            self.api.publish(announcement)
+        trace = announcement.trace
+        if trace:
+            trace.mark("queued")
+        if self.broadcast and announcement.broadcast and self._speaks():
+            if self.summarizer:
+                self.summarizer.submit(announcement)
+            self._queue(announcement, PRIORITY_NORMAL)
+        else:
+            tracer.record(trace)
+            self._delivered(announcement)
+
+    def _on_urgent(self, announcement):
+        """API callback for urgent notices: speak next, like a scheduled item"""
+        self._on_scheduled(announcement.localize(self.language))
+
+    def _on_scheduled(self, announcement):
+        """Scheduler callback: already translated, speak it now"""
+        print(f"[{announcement.source}] {announcement.timestamp} {announcement.title}")
+        if self.api:
+            self.api.publish(announcement)
+        announcement.trace.mark("queued")
+        if self.broadcast and self._speaks():
+            self._queue(announcement, PRIORITY_SCHEDULED)
+            self._due.set()
+        else:
+            tracer.record(announcement.trace)
+
+    def _speaks(self):
+        """Agent up and, in a cluster, this station holds the speaker lease"""
+        cluster = self.core.cluster
+        return self.agent.is_initialized and (cluster is None or cluster.leads(SPEAKER))
+
+    def _delivered(self, announcement):
+        """Acknowledge an item to the outbox once logged, spoken or given up on"""
+        if self.core.outbox is not None:
+            self.core.outbox.ack(announcement)
+
+    def _queue(self, announcement, priority):
+        self.speak_queue.put_nowait((priority, next(self._queued), announcement))
+        QUEUE_DEPTH.set(self.speak_queue.qsize(), queue="speak")
+
+    async def _speaker(self):
+        while True:
+            _, _, announcement = await self.speak_queue.get()
+            self._due.clear()
+            QUEUE_DEPTH.set(self.speak_queue.qsize(), queue="speak")
+            try:
+                if announcement.brief_job:
+                    # Later items keep being summarized meanwhile
+                    await asyncio.wait(
+                        [asyncio.wrap_future(announcement.brief_job)], timeout=SUMMARY_WAIT)
+                text, trace = announcement.translated, announcement.trace
+                if trace:
+                    trace.mark("speak_sent")
+                if self.api:
+                    self.api.playback(announcement)
+                try:
+                    await self.agent.speak_async(text, self.core.http)
+                except Exception as e:
+                    print(f"Failed to play audio, retrying: {e}")
+                    await asyncio.sleep(SPEAK_RETRY_DELAY)
+                    await self.agent.speak_async(text, self.core.http)
+                self._delivered(announcement)
+                if trace:
+                    trace.mark("speak_acked")
+                    tracer.record(trace)
+                words = min(len(text.split()), MAX_SPOKEN_WORDS)
+                # Speak requests interrupt, so a due bell need not wait
+                try:
+                    await asyncio.wait_for(self._due.wait(), words / WORDS_PER_SECOND)
+                except asyncio.TimeoutError:
+                    pass
+            except Exception as e:
+                print(f"Failed to play audio, dropping \"{announcement.title}\": {e}")
+                self._delivered(announcement)
+            finally:
+                if self.api and self.speak_queue.empty():
+                    self.api.playback(None)
+                self.speak_queue.task_done()
+
+
+def run(settings, broadcast=None, replay=None, service=None):
+    """Run the daemon until SIGINT/SIGTERM, or until ``replay`` is done.
+
+    With a SettingsService, edits to the settings file are applied live.
+    """
+    daemon = Daemon(settings, broadcast, replay, service)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, daemon.stop)
+            except NotImplementedError:
+                # Windows: Ctrl+C still raises KeyboardInterrupt
+                pass
+        await daemon.run()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,84 @@
+import json
+import uuid
+from urllib.parse import urlencode
+
+
+# ============== GOOGLE BATCH REQUESTS ==============
+#
+# Google APIs accept many calls in one multipart/mixed HTTP request on their
+# batch endpoint; each part is a plain HTTP request and the response has one
+# HTTP response part per call. The outer request's Authorization header
+# applies to every part.
+
+# Calls per batch request; Google caps this at 1000, Classroom recommends 50
+BATCH_SIZE = 50
+
+
+def encode_batch(calls, boundary):
+    """Multipart body for ``[(path, params)]`` GET calls"""
+    lines = []
+    for index, (path, params) in enumerate(calls):
+        target = f"{path}?{urlencode(params, doseq=True)}" if params else path
+        lines += [
+            f"--{boundary}",
+            "Content-Type: application/http",
+            f"Content-ID: <item-{index}>",
+            "",
+            f"GET {target} HTTP/1.1",
+            ""
+        ]
+    lines.append(f"--{boundary}--")
+    return "\r\n".join(lines) + "\r\n"
+
+
+def _split_head(text):
+    """``(head_lines, body)`` split at the first blank line"""
+    for separator in ("\r\n\r\n", "\n\n"):
+        head, found, body = text.partition(separator)
+        if found:
+            return head.splitlines(), body
+    return text.splitlines(), ""
+
+
+def decode_batch(text):
+    """``{index: (status, json_or_text)}`` from a multipart batch response"""
+    text = text.lstrip()
+    boundary = text.splitlines()[0] if text else ""
+    results = {}
+    for part in text.split(boundary)[1:]:
+        if part.startswith("--"):
+            break  # closing delimiter
+        outer_headers, response = _split_head(part.strip("\r\n"))
+        index = None
+        for header in outer_headers:
+            name, _, value = header.partition(":")
+            if name.strip().lower() == "content-id":
+                index = int(value.strip().strip("<>").rsplit("-", 1)[-1])
+        inner_head, body = _split_head(response)
+        if index is None or not inner_head:
+            continue
+        status = int(inner_head[0].split()[1])
+        try:
+            results[index] = (status, json.loads(body) if body.strip() else {})
+        except ValueError:
+            results[index] = (status, body)
+    return results
+
+
+async def batch_get(http, batch_url, calls, headers, source="http"):
+    """Run GET ``calls`` through ``batch_url`` in as few requests as possible.
+
+    Returns one ``(status, body)`` per call, in order. Calls missing from a
+    response come back as ``(0, {})``.
+    """
+    results = []
+    for start in range(0, len(calls), BATCH_SIZE):
+        chunk = calls[start:start + BATCH_SIZE]
+        boundary = f"batch_{uuid.uuid4().hex}"
+        text = await http.post(
+            batch_url, data=encode_batch(chunk, boundary).encode(),
+            headers={**headers, 'Content-Type': f"multipart/mixed; boundary={boundary}"},
+            source=source, raw=True)
+        decoded = decode_batch(text)
+        results += [decoded.get(index, (0, {})) for index in range(len(chunk))]
+    return results
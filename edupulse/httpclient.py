@@ -0,0 +1,106 @@
+import asyncio
+import importlib.util
+import json
+
+from .metrics import API_ERRORS, BYTES_DOWNLOADED
+
+# aiohttp is optional and imported on first request; without it requests go
+# through ``requests`` on a worker thread.
+HAVE_AIOHTTP = importlib.util.find_spec("aiohttp") is not None
+
+
+# ============== ASYNC HTTP CLIENT ==============
+
+DEFAULT_TIMEOUT = 30
+
+# Requests in flight at once, shared by every source on the loop
+MAX_CONCURRENT_REQUESTS = 16
+
+
+class HTTPError(Exception):
+    """Non-2xx response from an HTTP API"""
+
+    def __init__(self, status, body):
+        super().__init__(f"HTTP {status}: {body[:200]}")
+        self.status = status
+        self.body = body
+
+
+class HTTPClient:
+    """One shared HTTP session for all sources on an asyncio loop.
+
+    Uses aiohttp when it is installed. Without it each request runs through
+    ``requests`` in the default executor, which is slower but keeps the
+    daemon and GUI working on a bare install.
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, max_concurrency=MAX_CONCURRENT_REQUESTS):
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self._session = None
+        self._semaphore = None
+
+    async def request(self, method, url, params=None, json=None, headers=None, source="http",
+                      data=None, raw=False):
+        """Send a request and return the decoded JSON body ({} if empty).
+
+        ``source`` labels the request in the bytes and error metrics. With
+        ``raw`` the body text is returned undecoded; ``data`` sends a
+        pre-encoded body instead of ``json``.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async with self._semaphore:
+            try:
+                if not HAVE_AIOHTTP:
+                    status, body = await asyncio.to_thread(
+                        self._blocking_request, method, url, params, json, headers, data)
+                else:
+                    status, body = await self._aiohttp_request(
+                        method, url, params, json, headers, data)
+            except Exception as e:
+                API_ERRORS.inc(source=source, code=type(e).__name__)
+                raise
+
+        BYTES_DOWNLOADED.inc(len(body), source=source)
+        if status >= 400:
+            API_ERRORS.inc(source=source, code=str(status))
+            raise HTTPError(status, body)
+        return body if raw else _decode(body)
+
+    async def _aiohttp_request(self, method, url, params, json, headers, data):
+        import aiohttp
+
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=self.timeout))
+
+        async with self._session.request(
+                method, url, params=params, json=json, headers=headers,
+                data=data) as response:
+            return response.status, await response.text()
+
+    def _blocking_request(self, method, url, params, json, headers, data):
+        import requests
+
+        response = requests.request(
+            method, url, params=params, json=json, headers=headers, data=data,
+            timeout=self.timeout)
+        return response.status_code, response.text
+
+    async def get(self, url, params=None, headers=None, source="http"):
+        return await self.request("GET", url, params=params, headers=headers, source=source)
+
+    async def post(self, url, json=None, headers=None, source="http", data=None, raw=False):
+        return await self.request("POST", url, json=json, headers=headers, source=source,
+                                  data=data, raw=raw)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+def _decode(body):
+    return json.loads(body) if body.strip() else {}
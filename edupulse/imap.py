@@ -0,0 +1,134 @@
+import asyncio
+import re
+import ssl
+from datetime import datetime
+
+
+# ============== ASYNC IMAP CLIENT ==============
+#
+# Just enough IMAP4rev1 over asyncio streams for the Gmail poller: LOGIN,
+# SELECT, UID SEARCH, UID FETCH and LOGOUT. Unlike imaplib it never blocks the
+# event loop, so every mailbox can be watched from the ingestion thread.
+
+IMAP_SSL_PORT = 993
+
+_LITERAL = re.compile(rb'\{(\d+)\}\r\n$')
+_UID = re.compile(rb'UID (\d+)')
+
+
+class IMAPError(Exception):
+    """The server answered a command with NO or BAD"""
+
+
+def _quote(value):
+    return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+_MONTHS = "Jan Feb Mar Apr May Jun Jul Aug Sep Oct Nov Dec".split()
+
+
+def imap_date(ts):
+    """Local date of epoch ``ts`` as SEARCH SINCE/BEFORE expect, e.g. 01-Jan-2024"""
+    day = datetime.fromtimestamp(ts)
+    return f"{day.day:02d}-{_MONTHS[day.month - 1]}-{day.year}"
+
+
+class AsyncIMAPClient:
+    def __init__(self, host, port=IMAP_SSL_PORT, use_ssl=True, timeout=30):
+        self.host = host
+        self.port = port
+        self.use_ssl = use_ssl
+        self.timeout = timeout
+        self.reader = None
+        self.writer = None
+        self._tag = 0
+
+    async def connect(self):
+        context = ssl.create_default_context() if self.use_ssl else None
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port, ssl=context),
+            self.timeout)
+        greeting = await self._read_response()
+        if not greeting[0].startswith(b'* OK'):
+            raise IMAPError(f"Unexpected greeting: {greeting[0]!r}")
+
+    async def _read_response(self):
+        """Read one response line plus any literals it announces.
+
+        Returns a list of chunks: text lines and literal payloads, in order.
+        """
+        chunks = []
+        while True:
+            line = await asyncio.wait_for(self.reader.readline(), self.timeout)
+            if not line:
+                raise IMAPError("Connection closed by server")
+            chunks.append(line)
+            match = _LITERAL.search(line)
+            if not match:
+                return chunks
+            size = int(match.group(1))
+            chunks.append(await asyncio.wait_for(
+                self.reader.readexactly(size), self.timeout))
+
+    async def command(self, *args):
+        """Send a command; return the untagged responses or raise IMAPError"""
+        self._tag += 1
+        tag = f"A{self._tag:04d}".encode()
+        self.writer.write(tag + b' ' + ' '.join(args).encode() + b'\r\n')
+        await self.writer.drain()
+
+        untagged = []
+        while True:
+            response = await self._read_response()
+            if response[0].startswith(tag + b' '):
+                status = response[0][len(tag) + 1:].split(b' ', 1)[0]
+                if status != b'OK':
+                    raise IMAPError(response[0].decode(errors="ignore").strip())
+                return untagged
+            untagged.append(response)
+
+    async def login(self, username, password):
+        await self.command("LOGIN", _quote(username), _quote(password))
+
+    async def select(self, mailbox="INBOX"):
+        await self.command("SELECT", _quote(mailbox))
+
+    async def uid_search(self, criteria):
+        uids = []
+        for response in await self.command("UID SEARCH", criteria):
+            line = response[0]
+            if line.startswith(b'* SEARCH'):
+                uids.extend(int(uid) for uid in line[len(b'* SEARCH'):].split())
+        return uids
+
+    async def uid_fetch(self, uids, item="RFC822"):
+        """Fetch ``item`` for several UIDs in one round trip.
+
+        Returns ``[(uid, payload_bytes), ...]`` in server order.
+        """
+        uid_set = ",".join(str(uid) for uid in uids)
+        results = []
+        for response in await self.command("UID FETCH", uid_set, f"(UID {item})"):
+            if b' FETCH ' not in response[0]:
+                continue
+            text = b''.join(response[0::2])
+            literals = response[1::2]
+            match = _UID.search(text)
+            if match and literals:
+                results.append((int(match.group(1)), literals[0]))
+        return results
+
+    async def logout(self):
+        if self.writer is None:
+            return
+        try:
+            await self.command("LOGOUT")
+        except (IMAPError, OSError, asyncio.TimeoutError):
+            pass
+        finally:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+            self.writer = None
@@ -0,0 +1,363 @@
+import asyncio
+import threading
+import time
+
+from .catchup import CatchUp
+from .cluster import cluster_from_settings
+from .httpclient import HTTPClient
+from .metrics import ITEMS_FETCHED, POLL_DURATION
+from .outbox import outbox_from_settings
+from .parsing import parse_pool_from_settings
+from .pollers import ClassroomPoller, GmailAPIPoller, GmailPoller, mail_poller
+from .push import ClassroomPushPoller, push_subscriber
+from .replay import REPLAY_IDLE_INTERVAL, ReplaySource, recorder
+from .settings import classroom_accounts, email_accounts
+from .sources import Source
+
+
+# ============== INGESTION CORE ==============
+
+class _SourceEntry:
+    """A running source, its poll interval and the task polling it"""
+
+    __slots__ = ('source', 'interval', 'emit', 'task', 'wake', 'last_success', 'key', 'lease')
+
+    def __init__(self, source, interval, emit, key=None, lease=None):
+        self.source = source
+        self.interval = interval
+        self.emit = emit
+        # "kind:account" of a Source, naming its saved state
+        self.key = key
+        # Cluster lease needed to poll, None when standalone
+        self.lease = lease
+        self.task = None
+        # Set to cut the current sleep short, e.g. after an interval change
+        self.wake = asyncio.Event()
+        # time.monotonic() of the last successful poll, None before the first
+        self.last_success = None
+
+
+class IngestCore:
+    """Hosts every ingestion source as a coroutine on one asyncio loop.
+
+    A source is any object with an ``async poll(emit)`` method, usually a
+    ``sources.Source`` subclass. The daemon
+    runs the core on its own loop; the GUI calls ``start_thread`` to get a
+    single background thread for all sources, and passes thread-safe Qt
+    signal emitters as ``emit``. In cluster mode a Source is only polled
+    while this station holds its lease, see ``cluster``. With an outbox a
+    poll's items are stored before they are emitted, see ``outbox``.
+    """
+
+    def __init__(self, loop=None):
+        self.loop = loop
+        self.http = HTTPClient()
+        self._thread = None
+        self._entries = []
+        self._imap_slots = None
+        self._emitters = None
+        self._push = None
+        self._catch_up = None
+        self.cluster = None
+        self._cluster_task = None
+        self.outbox = None
+        self._outbox_task = None
+        self.parse_pool = None
+        # Outbox states not yet handed to their source: key -> (state, saved)
+        self._resume = {}
+
+    def start_thread(self):
+        """Run the core's loop on a dedicated background thread"""
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self.loop.run_forever, name="edupulse-ingest", daemon=True)
+        self._thread.start()
+
+    def submit(self, coro):
+        """Schedule a coroutine on the core loop from any thread.
+
+        Returns a ``concurrent.futures.Future``.
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def add_source(self, source, interval, emit):
+        """Poll ``source`` every ``interval`` seconds; callable from any thread"""
+        self.loop.call_soon_threadsafe(self._spawn, source, interval, emit)
+
+    def add_configured_sources(self, settings, on_email, on_announcement):
+        """Add a poller for every configured mailbox and Classroom account.
+
+        All IMAP mailboxes share one budget of ``polling.max_imap_connections``
+        open sessions; Gmail API and Classroom requests share the HTTPClient's
+        limit. Fetched items are parsed on the ``parsing`` pool. After
+        start-up or downtime they catch up through one CatchUp, whose digest
+        card goes to ``on_announcement``. With ``cluster.enabled`` the
+        station joins the cluster first. With ``outbox.enabled`` sources
+        continue from their stored state, after the items not acknowledged
+        last time have been emitted again.
+        Returns ``(mailbox_count, classroom_account_count)``.
+        """
+        polling = settings['polling']
+        self._imap_slots = asyncio.Semaphore(polling['max_imap_connections'])
+        self._emitters = (on_email, on_announcement)
+        self._push = (settings['push'], push_subscriber(self.http, settings['push']))
+        self._catch_up = CatchUp(settings['catch_up'], on_announcement)
+        self.parse_pool = parse_pool_from_settings(settings)
+        cluster = cluster_from_settings(
+            settings, {'Email': on_email, 'Classroom': on_announcement}, on_announcement)
+        if cluster is not None:
+            self.join_cluster(cluster)
+        outbox = outbox_from_settings(settings)
+        if outbox is not None:
+            self.use_outbox(outbox, on_email, on_announcement)
+
+        mailboxes = email_accounts(settings)
+        for account in mailboxes:
+            self.add_source(self._mail_poller(account), polling['email_interval'], on_email)
+
+        google_accounts = classroom_accounts(settings)
+        for account in google_accounts:
+            self.add_source(
+                self._classroom_poller(account), polling['classroom_interval'],
+                on_announcement)
+
+        return len(mailboxes), len(google_accounts)
+
+    def reconfigure(self, settings):
+        """Apply changed settings to the running pollers; callable from any thread.
+
+        Intervals and credentials change in place, added accounts get a poller
+        and removed ones are stopped. Nothing else is restarted.
+        """
+        self.loop.call_soon_threadsafe(self._reconfigure, settings)
+
+    def _reconfigure(self, settings):
+        if self._emitters is None:
+            return  # no configured sources, e.g. during a replay
+        on_email, on_announcement = self._emitters
+        polling = settings['polling']
+        mailboxes = {a['name']: a for a in email_accounts(settings)}
+        google_accounts = {a['name']: a for a in classroom_accounts(settings)}
+
+        # Sessions already holding a slot finish on the old semaphore
+        self._imap_slots = asyncio.Semaphore(polling['max_imap_connections'])
+        self._catch_up.configure(settings['catch_up'])
+
+        for entry in list(self._entries):
+            source = entry.source
+            if isinstance(source, (GmailPoller, GmailAPIPoller)):
+                account = mailboxes.get(source.account)
+                if account is not None and account['backend'] != source.backend:
+                    account = None  # replaced by a poller for the new backend
+                else:
+                    mailboxes.pop(source.account, None)
+                if account is not None:
+                    source.configure(account)
+                    if source.backend == "imap":
+                        source.slots = self._imap_slots
+                interval = polling['email_interval']
+            elif isinstance(source, ClassroomPoller):
+                account = google_accounts.pop(source.account, None)
+                interval = polling['classroom_interval']
+            else:
+                continue
+
+            if account is None:
+                print(f"Stopped polling {source.kind} ({source.account})")
+                entry.task.cancel()
+                if entry.lease:
+                    self.cluster.drop(entry.lease)
+                self._entries.remove(entry)
+                if hasattr(source, 'close'):
+                    self.loop.create_task(source.close())
+            elif entry.interval != interval:
+                entry.interval = interval
+                entry.wake.set()
+
+        for account in mailboxes.values():
+            print(f"Started polling Email ({account['name']})")
+            self._spawn(self._mail_poller(account), polling['email_interval'], on_email)
+        for account in google_accounts.values():
+            print(f"Started polling Classroom ({account['name']})")
+            self._spawn(self._classroom_poller(account),
+                        polling['classroom_interval'], on_announcement)
+
+    def _mail_poller(self, account):
+        return mail_poller(account, self.http, self._imap_slots)
+
+    def _classroom_poller(self, account):
+        """Push-driven poller when push is configured, a plain poller otherwise.
+
+        Push settings are read at start-up; changing them needs a restart.
+        """
+        push_settings, subscriber = self._push
+        if subscriber is None:
+            return ClassroomPoller(self.http, account)
+        return ClassroomPushPoller(
+            self.http, account, subscriber, push_settings['topic'],
+            push_settings['sweep_interval'])
+
+    def add_replay(self, replay, on_email, on_announcement):
+        """Feed a Replay through the same callbacks as the real pollers"""
+        emitters = {'Email': on_email, 'Classroom': on_announcement}
+        for source in replay.sources():
+            emit = emitters.get(source.kind)
+            if emit is None:
+                print(f"Skipping replayed items of unknown kind {source.kind!r}")
+                continue
+            self.add_source(source, REPLAY_IDLE_INTERVAL, emit)
+
+    def join_cluster(self, cluster):
+        """Poll sources added from now on only while leading them in ``cluster``"""
+        self.cluster = cluster
+        self.loop.call_soon_threadsafe(self._start_cluster)
+
+    def _start_cluster(self):
+        self._cluster_task = self.loop.create_task(self.cluster.run())
+
+    def use_outbox(self, outbox, on_email, on_announcement):
+        """Store each poll in ``outbox`` before emitting it; call before adding sources.
+
+        Sources added later continue from the state stored for them. Items
+        not acknowledged last time go to ``on_email`` or ``on_announcement``
+        first.
+        """
+        self.outbox = outbox
+        self._resume = outbox.states()
+        self.loop.call_soon_threadsafe(
+            self._start_outbox, outbox.pending(), on_email, on_announcement)
+
+    def _start_outbox(self, pending, on_email, on_announcement):
+        if pending:
+            print(f"Delivering {len(pending)} item(s) not acknowledged last time")
+        for announcement in pending:
+            (on_email if announcement.kind == "Email" else on_announcement)(announcement)
+        self._outbox_task = self.loop.create_task(self.outbox.run())
+
+    def _spawn(self, source, interval, emit):
+        key = lease = None
+        if isinstance(source, Source):
+            source.parse_pool = self.parse_pool
+            key = f"{source.kind}:{source.account}"
+            if self.cluster is not None:
+                lease = key
+        entry = _SourceEntry(source, interval, emit, key, lease)
+        resume = self._resume.pop(key, None)
+        if resume is not None:
+            state, saved = resume
+            source.restore(state)
+            # Polled successfully when the state was saved; catch up only after a gap
+            entry.last_success = time.monotonic() - max(time.time() - saved, 0)
+        if lease:
+            self.cluster.want(lease, entry.wake.set)
+        entry.task = self.loop.create_task(self._run_source(entry))
+        self._entries.append(entry)
+
+    async def _run_source(self, entry):
+        source, emit = entry.source, entry.emit
+        kind = getattr(source, 'kind', type(source).__name__)
+        record = not isinstance(source, ReplaySource)
+        # Emitted only once the poll is in the cluster store or the outbox
+        batch = [] if entry.lease or (entry.key and self.outbox) else None
+        leading = False
+
+        def counted_emit(item):
+            ITEMS_FETCHED.inc(source=kind)
+            if record:
+                recorder.record(kind, item)
+            if batch is None:
+                emit(item)
+            else:
+                batch.append(item)
+
+        while True:
+            if entry.lease and not self.cluster.leads(entry.lease):
+                leading = False
+            else:
+                if entry.lease and not leading:
+                    # Continue from where the previous leader stopped
+                    leading = True
+                    state = await self.cluster.load_state(entry.lease)
+                    if state is not None:
+                        source.restore(state)
+                await self._poll(entry, counted_emit, batch)
+            entry.wake.clear()
+            try:
+                await asyncio.wait_for(entry.wake.wait(), entry.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _poll(self, entry, counted_emit, batch):
+        source = entry.source
+        catch_up = self._catch_up
+        if (catch_up is None or not isinstance(source, Source) or
+                not catch_up.due(entry.last_success, entry.interval)):
+            catch_up = None
+        with POLL_DURATION.time(source=getattr(source, 'kind', type(source).__name__)):
+            if catch_up is None:
+                ok = await source.poll(counted_emit)
+            else:
+                ok = await source.poll(counted_emit, catch_up)
+        if ok is not False:
+            entry.last_success = time.monotonic()
+        if batch is not None:
+            items = batch[:]
+            batch.clear()
+            state = source.state() if ok is not False else None
+            if entry.lease:
+                items = await self.cluster.commit(entry.lease, items, state)
+            if self.outbox is not None:
+                await self.outbox.commit(entry.key, items, state)
+            for item in items:
+                entry.emit(item)
+
+    async def shutdown(self):
+        if self._cluster_task is not None:
+            self._cluster_task.cancel()
+            await asyncio.gather(self._cluster_task, return_exceptions=True)
+            self._cluster_task = None
+        tasks = [entry.task for entry in self._entries]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.gather(*(entry.source.close() for entry in self._entries
+                               if hasattr(entry.source, 'close')), return_exceptions=True)
+        self._entries.clear()
+        if self.parse_pool is not None:
+            self.parse_pool.close()
+        if self._outbox_task is not None:
+            # Writes the last acknowledgements on the way out
+            self._outbox_task.cancel()
+            await asyncio.gather(self._outbox_task, return_exceptions=True)
+            self._outbox_task = None
+            self.outbox.close()
+        await self.http.close()
+
+    async def _stop_loop(self):
+        await self.shutdown()
+        # Anything else left on the core's own loop, e.g. API connections
+        others = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in others:
+            task.cancel()
+        await asyncio.gather(*others, return_exceptions=True)
+
+    def stop_thread(self, timeout=5):
+        """Cancel every task and stop the background thread.
+
+        If the loop has already stopped (e.g. a crash simulated in a
+        benchmark) its tasks are cancelled by running it once more here.
+        """
+        if self._thread is None:
+            return
+        if not self.loop.is_running():
+            self._thread.join(timeout)
+            self.loop.run_until_complete(self._stop_loop())
+            self._thread = None
+            return
+        try:
+            self.submit(self._stop_loop()).result(timeout)
+        except Exception as e:
+            print(f"Error stopping ingestion: {e}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+        self._thread = None
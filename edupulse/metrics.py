@@ -0,0 +1,221 @@
+import asyncio
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+
+# ============== METRICS ==============
+#
+# A small Prometheus-compatible registry: counters, gauges and histograms
+# with labels, rendered in the text exposition format. Updates take one
+# uncontended lock and a dict lookup, so they are cheap enough for every
+# poll and every item.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _label_text(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(labels.get(name, "") for name in self.label_names)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_label_text(self.label_names, key)} {value:g}")
+        return lines
+
+    def summary_lines(self):
+        """Human-readable values for the GUI diagnostics panel"""
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_label_text(self.label_names, key)}  {value:g}"
+                for key, value in items]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted((key, ([*state[0]], state[1], state[2]))
+                           for key, state in self._values.items())
+        names = self.label_names + ("le",)
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += bucket_count
+                le = bound if bound == "+Inf" else f"{bound:g}"
+                lines.append(f"{self.name}_bucket{_label_text(names, (*key, le))} {cumulative}")
+            labels = _label_text(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {total:g}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+    def summary_lines(self):
+        with self._lock:
+            items = sorted((key, state[1], state[2]) for key, state in self._values.items())
+        return [f"{self.name}{_label_text(self.label_names, key)}  "
+                f"count={count} avg={total / count:.3f}s"
+                for key, total, count in items]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self._add(Counter(name, help_text, labels))
+
+    def gauge(self, name, help_text, labels=()):
+        return self._add(Gauge(name, help_text, labels))
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, help_text, labels, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.summary_lines())
+        return "\n".join(lines) if lines else "No metrics recorded yet"
+
+
+registry = Registry()
+
+POLL_DURATION = registry.histogram(
+    "edupulse_poll_duration_seconds", "Time spent in one poll cycle", ("source",))
+ITEMS_FETCHED = registry.counter(
+    "edupulse_items_fetched_total", "New items produced by pollers", ("source",))
+BYTES_DOWNLOADED = registry.counter(
+    "edupulse_bytes_downloaded_total", "Response bytes received", ("source",))
+API_ERRORS = registry.counter(
+    "edupulse_api_errors_total", "Failed API calls by error code", ("source", "code"))
+SPEAK_LATENCY = registry.histogram(
+    "edupulse_speak_latency_seconds", "Agora speak request round trip")
+QUEUE_DEPTH = registry.gauge(
+    "edupulse_queue_depth", "Items waiting in an internal queue", ("queue",))
+AGENT_JOINS = registry.counter(
+    "edupulse_agent_joins_total", "Successful Agora agent (re-)joins")
+SUMMARY_DURATION = registry.histogram(
+    "edupulse_summary_duration_seconds", "Time to summarize one announcement", ("backend",))
+SUMMARY_CACHE = registry.counter(
+    "edupulse_summary_cache_total", "Summary cache lookups", ("result",))
+SCHEDULE_FIRES = registry.counter(
+    "edupulse_schedule_fires_total", "Scheduled announcements fired or missed", ("result",))
+PARSED_ITEMS = registry.counter(
+    "edupulse_parsed_items_total", "Raw items parsed and enriched by the parse pool",
+    ("source",))
+PARSE_DURATION = registry.histogram(
+    "edupulse_parse_duration_seconds", "Time from submitting raw items to the pool "
+    "to their announcements", ("source",))
+API_REQUESTS = registry.counter(
+    "edupulse_api_requests_total", "Local API requests by route and status", ("route", "status"))
+
+
+# ============== /metrics ENDPOINT ==============
+
+async def serve_metrics(host, port):
+    """Serve ``GET /metrics`` on an asyncio server; returns the server"""
+    async def handle(reader, writer):
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), 5)
+            # Drain headers; we only care about the request line
+            while (await asyncio.wait_for(reader.readline(), 5)) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request_line.decode(errors="ignore").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+                status, body = "200 OK", registry.render().encode()
+            else:
+                status, body = "404 Not Found", b"Not Found\n"
+            writer.write(
+                f"HTTP/1.1 {status}\r\n"
+                "Content-Type: text/plain; version=0.0.4\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n".encode() + body)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
@@ -0,0 +1,176 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+
+from .metrics import QUEUE_DEPTH
+from .pipeline import Announcement
+from .settings import data_file
+
+
+# ============== DELIVERY OUTBOX ==============
+#
+# Makes ingestion crash-safe. After each poll the new items and the source's
+# polling state (``Source.state``) are committed to a local SQLite file in
+# one transaction, and only then emitted. The feed or speak queue
+# acknowledges each item once it has been shown or spoken; acknowledgements
+# are written in batches. On start-up every source continues from the state
+# saved with its last committed items, and items never acknowledged are
+# delivered again first. A crash therefore neither loses items nor makes
+# the pollers fetch them twice, though an item delivered just before the
+# crash may be shown or spoken again (at-least-once). A source whose state
+# was saved recently also skips the start-up catch-up.
+
+DEFAULT_PATH = "outbox.db"
+
+# How often acknowledgements are written
+ACK_INTERVAL = 1.0
+
+# Unchanged state is saved again after this long, to record that the source
+# is still polled successfully
+STATE_REFRESH = 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pending (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT, source TEXT NOT NULL,
+    created REAL NOT NULL, record TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS state (
+    name TEXT PRIMARY KEY, value TEXT NOT NULL, saved REAL NOT NULL);
+"""
+
+
+class Outbox:
+    """Undelivered items and per-source polling state in one SQLite file.
+
+    The blocking methods are called at start-up or on worker threads;
+    ``ack`` may be called from any thread.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._acked = []
+        # Last state written per source and when, so unchanged state costs nothing
+        self._saved = {}
+        self._depth = self._db.execute("SELECT COUNT(*) FROM pending").fetchone()[0]
+        QUEUE_DEPTH.set(self._depth, queue="outbox")
+
+    def states(self):
+        """``{name: (state, saved epoch seconds)}`` of every source"""
+        with self._lock:
+            rows = self._db.execute("SELECT name, value, saved FROM state").fetchall()
+        self._saved = {name: (value, saved) for name, value, saved in rows}
+        return {name: (json.loads(value), saved) for name, value, saved in rows}
+
+    def pending(self):
+        """Items never acknowledged, oldest first, ready to deliver again"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT seq, record FROM pending ORDER BY seq").fetchall()
+        announcements = []
+        for seq, record in rows:
+            announcement = Announcement.from_record(json.loads(record))
+            announcement.delivery = seq
+            announcements.append(announcement)
+        return announcements
+
+    def _commit(self, name, announcements, state):
+        now = time.time()
+        value = json.dumps(state) if state is not None else None
+        last_value, last_saved = self._saved.get(name, (None, 0))
+        if value == last_value and now - last_saved < STATE_REFRESH:
+            value = None
+        if not announcements and value is None:
+            return
+        rows = [(name, now, json.dumps(a.to_record())) for a in announcements]
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                for announcement, row in zip(announcements, rows):
+                    announcement.delivery = self._db.execute(
+                        "INSERT INTO pending (source, created, record) VALUES (?, ?, ?)",
+                        row).lastrowid
+                if value is not None:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO state (name, value, saved) VALUES (?, ?, ?)",
+                        (name, value, now))
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+            self._depth += len(rows)
+        if value is not None:
+            self._saved[name] = (value, now)
+        QUEUE_DEPTH.set(self._depth, queue="outbox")
+
+    async def commit(self, name, announcements, state=None):
+        """Store a poll's items and, unless None, the source's state.
+
+        Returns False, with nothing stored, if the file cannot be written;
+        the items should then be delivered anyway.
+        """
+        try:
+            await asyncio.to_thread(self._commit, name, announcements, state)
+        except sqlite3.Error as e:
+            print(f"Outbox unavailable, {len(announcements)} item(s) not kept: {e}")
+            return False
+        return True
+
+    def ack(self, announcement):
+        """``announcement`` was shown or spoken and need not be delivered again"""
+        seq = announcement.delivery
+        if seq is not None:
+            announcement.delivery = None
+            with self._lock:
+                self._acked.append(seq)
+
+    def flush(self):
+        """Write the acknowledgements collected so far"""
+        with self._lock:
+            acked, self._acked = self._acked, []
+            if not acked:
+                return
+            try:
+                # One transaction, so one sync to disk for the whole batch
+                with self._db:
+                    self._db.execute("BEGIN")
+                    self._db.executemany("DELETE FROM pending WHERE seq = ?",
+                                         [(seq,) for seq in acked])
+            except sqlite3.Error as e:
+                print(f"Outbox acknowledgements not written: {e}")
+                return
+            self._depth = max(self._depth - len(acked), 0)
+        QUEUE_DEPTH.set(self._depth, queue="outbox")
+
+    async def run(self):
+        try:
+            while True:
+                await asyncio.sleep(ACK_INTERVAL)
+                await asyncio.to_thread(self.flush)
+        finally:
+            self.flush()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def outbox_from_settings(settings):
+    """Outbox for the ``outbox`` settings, or None when it is off.
+
+    A relative path is taken from the directory of settings.json, not from
+    wherever the app was started.
+    """
+    outbox = settings['outbox']
+    if not outbox['enabled']:
+        return None
+    path = data_file(outbox['path'] or DEFAULT_PATH)
+    try:
+        return Outbox(path)
+    except sqlite3.Error as e:
+        print(f"Outbox {path} unavailable, delivering without it: {e}")
+        return None
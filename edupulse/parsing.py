@@ -0,0 +1,105 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from .metrics import PARSE_DURATION, PARSED_ITEMS, QUEUE_DEPTH
+from .sources import Delta
+
+
+# ============== PARSE POOL ==============
+#
+# Turning raw fetched items into Announcements (MIME parsing, header and
+# body decoding, text clean-up) is CPU work. Without a pool it runs on the
+# ingestion loop, between the network waits of every source. With one,
+# each delta is cut into chunks that worker threads parse, and the loop
+# keeps fetching meanwhile; IMAP mailboxes hand over each downloaded batch
+# while the next one is still arriving. Results come back in fetch order,
+# so each source's items are emitted in order.
+#
+# Sources opt in through ``Source.parser``. Sources whose ``normalize``
+# keeps state (Classroom diffs each item against the previous version) are
+# parsed in order as one job on a worker thread instead.
+
+DEFAULT_WORKERS = 2
+
+# Raw items per job
+CHUNK_SIZE = 25
+
+
+def parse_chunk(parse, raws, delta):
+    """Parsed announcements of ``raws``, in order, None results dropped"""
+    announcements = []
+    for raw in raws:
+        announcement = parse(raw, delta)
+        if announcement is not None:
+            # Decoded and cleaned up here on the worker; otherwise the
+            # first reader of ``text`` pays for it, on the loop or the GUI
+            announcements.append(announcement.prepare())
+    return announcements
+
+
+class ParsePool:
+    """Worker threads parsing the items of every Source of an IngestCore.
+
+    ``submit`` and ``parse`` are called on the core's loop. The threads
+    are started on first use.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS):
+        self.workers = workers
+        self._executor = None
+        # Raw items submitted and not parsed yet
+        self._queued = 0
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                self.workers, thread_name_prefix="edupulse-parse")
+        return self._executor
+
+    def submit(self, source, raws, delta):
+        """Start parsing ``raws`` of ``delta``; a task resolving to their announcements"""
+        return asyncio.ensure_future(self._run(source, list(raws), delta))
+
+    async def parse(self, source, delta):
+        """Announcements of ``delta``, in order, using jobs already started for it"""
+        jobs = delta.parsed if delta.parsed is not None else [
+            self.submit(source, delta.items, delta)]
+        announcements = []
+        for job in jobs:
+            announcements += await job
+        return announcements
+
+    async def _run(self, source, raws, delta):
+        if not raws:
+            return []
+        loop = asyncio.get_running_loop()
+        parse = source.parser()
+        self._queued += len(raws)
+        QUEUE_DEPTH.set(self._queued, queue="parse")
+        try:
+            with PARSE_DURATION.time(source=source.kind):
+                if parse is None:
+                    chunks = [await asyncio.to_thread(
+                        parse_chunk, source.normalize, raws, delta)]
+                else:
+                    # Workers need only the delta's times, not its items
+                    meta = Delta(None, None, delta.detected, delta.since)
+                    chunks = await asyncio.gather(*(
+                        loop.run_in_executor(self._get_executor(), parse_chunk, parse,
+                                             raws[start:start + CHUNK_SIZE], meta)
+                        for start in range(0, len(raws), CHUNK_SIZE)))
+        finally:
+            self._queued -= len(raws)
+            QUEUE_DEPTH.set(self._queued, queue="parse")
+        PARSED_ITEMS.inc(len(raws), source=source.kind)
+        return [a for chunk in chunks for a in chunk]
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def parse_pool_from_settings(settings):
+    """ParsePool for the ``parsing`` settings, or None to parse on the loop"""
+    workers = settings['parsing']['workers']
+    return ParsePool(workers) if workers else None
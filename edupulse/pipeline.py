@@ -0,0 +1,188 @@
+# ============== ANNOUNCEMENT PIPELINE ==============
+#
+# Every poller emits Announcement records, which travel unchanged through
+# the ingestion buffer to the feed and the speak queue. Both the GUI and the
+# daemon go through here so the two never disagree on what gets displayed
+# or broadcast.
+
+import sys
+from datetime import datetime
+
+from .settings import DEFAULT_ACCOUNT
+from .textnorm import normalize
+
+MAX_TEXT_LENGTH = 500
+
+# Raw body kept until first display: worst case UTF-8 for MAX_TEXT_LENGTH
+# characters, or more for HTML, which is mostly markup
+_MAX_BODY_BYTES = MAX_TEXT_LENGTH * 4
+_MAX_MARKUP_BYTES = 64 * 1024
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def translate(text, language="English"):
+    """Translate announcement text for broadcast.
+
+    No translation backend is wired up yet, so this returns the text as-is.
+    """
+    return text
+
+
+def source_label(kind, account):
+    """Feed label for a source, e.g. Email or Email (principal)"""
+    if not account or account == DEFAULT_ACCOUNT:
+        return kind
+    return f"{kind} ({account})"
+
+
+class Announcement:
+    """One feed item, from any source.
+
+    Source, account and sender strings are interned, since a handful of
+    values repeat across thousands of items. A body stays raw (for mail, the
+    bytes of its text part, cut to what can ever be shown) until ``text`` or
+    ``speech`` is first read; it is then decoded and normalized once, see
+    ``textnorm``. ``translated`` is likewise computed on first use, from the
+    ``brief`` spoken version once a Summarizer has set one. ``ts`` is the
+    single timestamp, in epoch seconds.
+    """
+
+    __slots__ = ('kind', 'account', 'source', 'title', 'sender', 'ts',
+                 '_body', '_charset', '_markup', '_speech', 'brief', 'brief_job',
+                 'language', '_translated', 'trace', 'broadcast', 'delivery')
+
+    def __init__(self, kind, title, body, ts, sender="", account=DEFAULT_ACCOUNT,
+                 charset=None, trace=None, source=None, markup=False):
+        account = account or DEFAULT_ACCOUNT
+        self.kind = sys.intern(kind)
+        self.account = sys.intern(account)
+        self.source = sys.intern(source or source_label(kind, account))
+        self.title = title
+        self.sender = sys.intern(sender or "")
+        self.ts = ts
+        if isinstance(body, bytes):
+            body = body[:_MAX_MARKUP_BYTES if markup else _MAX_BODY_BYTES]
+        self._body = body
+        self._charset = charset
+        self._markup = markup
+        self._speech = None
+        self.brief = None
+        # Future completed once ``brief`` is set, while a summary is pending
+        self.brief_job = None
+        self.language = "English"
+        self._translated = None
+        self.trace = trace
+        # False for cards that are shown but never spoken, e.g. digests
+        self.broadcast = True
+        # Outbox sequence number until delivery is acknowledged, see ``outbox``
+        self.delivery = None
+
+    @classmethod
+    def summary(cls, title, source, lines, ts, language="English"):
+        """Stand-in for a burst; speaks its title rather than its lines"""
+        summary = cls("Summary", title, "\n".join(lines), ts, source=source)
+        summary.language = language
+        summary._translated = translate(title, language)
+        return summary
+
+    def _prepare(self):
+        body = self._body
+        if isinstance(body, bytes):
+            try:
+                body = body.decode(self._charset or "utf-8", errors="ignore")
+            except LookupError:  # unknown charset name
+                body = body.decode("utf-8", errors="ignore")
+        display, speech = normalize(body, self._markup)
+        self._body = display[:MAX_TEXT_LENGTH]
+        self._speech = speech
+        self._charset = None
+
+    def prepare(self):
+        """Decode and normalize the body now rather than on first use; returns self"""
+        if self._speech is None:
+            self._prepare()
+        return self
+
+    @property
+    def text(self):
+        """Display text: decoded and normalized on first use"""
+        if self._speech is None:
+            self._prepare()
+        return self._body
+
+    @property
+    def speech(self):
+        """Text for the agent to read: no links, abbreviations spelled out"""
+        if self._speech is None:
+            self._prepare()
+        return self._speech
+
+    @property
+    def translated(self):
+        if self._translated is None:
+            self._translated = translate(self.brief or self.speech, self.language)
+        return self._translated
+
+    def set_brief(self, text):
+        """Speak ``text`` instead of the full speech text; callable from any thread"""
+        self.brief = text
+        self._translated = None
+
+    @property
+    def timestamp(self):
+        """Local display time"""
+        return datetime.fromtimestamp(self.ts).strftime(TIMESTAMP_FORMAT)
+
+    def localize(self, language):
+        """Set the broadcast language; returns self"""
+        if language != self.language:
+            self.language = language
+            self._translated = None
+        return self
+
+    # ---------- recording ----------
+
+    def to_record(self):
+        return {
+            'kind': self.kind,
+            'account': self.account,
+            'title': self.title,
+            'sender': self.sender,
+            'ts': self.ts,
+            'text': self.text,
+            'speech': self.speech
+        }
+
+    @classmethod
+    def from_record(cls, record, kind=None):
+        """Announcement from ``to_record`` output or an older raw poller item"""
+        if 'title' in record:
+            announcement = cls(record['kind'], record['title'], record['text'], record['ts'],
+                               record.get('sender', ""), record.get('account'))
+            if 'speech' in record:
+                # Already normalized where it was recorded
+                announcement._speech = record['speech']
+            return announcement
+        # Recordings made before Announcement existed hold the raw dicts
+        if 'subject' in record:
+            return cls("Email", record['subject'], record['body'],
+                       _parse_time(record.get('timestamp')), record.get('from', ""),
+                       record.get('account'))
+        return cls(kind or "Classroom", f"Classroom: {record['course_name']}", record['text'],
+                   _parse_time(record.get('creation_time')), record['course_name'],
+                   record.get('account'))
+
+
+def _parse_time(value):
+    """Epoch seconds from a display or ISO 8601 time; 0 if unparseable"""
+    if not value:
+        return 0
+    try:
+        return datetime.strptime(value, TIMESTAMP_FORMAT).timestamp()
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return 0
@@ -0,0 +1,743 @@
+import asyncio
+import email
+import functools
+import html
+import json
+import os
+import pickle
+import time
+from datetime import datetime, timezone
+from email.header import decode_header
+from email.utils import parsedate_to_datetime
+
+from .googlebatch import batch_get
+from .httpclient import HTTPError
+from .imap import IMAP_SSL_PORT, AsyncIMAPClient, imap_date
+from .metrics import API_ERRORS, BYTES_DOWNLOADED
+from .pipeline import Announcement
+from .settings import DEFAULT_ACCOUNT, account_file
+from .sources import Delta, Source
+from .tracing import Trace
+from .vault import vault
+
+# ============== GMAIL POLLER ==============
+
+class GmailPoller(Source):
+    """Fetches messages newer than the last seen IMAP UID of one mailbox.
+
+    Each poll opens one IMAP session and hands every new message to the
+    ``emit`` callback as an ``Announcement`` of kind "Email", whose text
+    part stays undecoded until it is first read. ``slots`` is an optional
+    semaphore shared by all mailboxes that caps how many IMAP sessions are
+    open at once.
+    """
+
+    kind = "Email"
+
+    error_label = "Gmail"
+
+    backend = "imap"
+
+    STATE_FILE = "last_uid.txt"
+
+    # Messages requested per UID FETCH round trip
+    FETCH_BATCH = 50
+
+    def __init__(self, account, slots=None):
+        self.account = account.get('name', DEFAULT_ACCOUNT)
+        self.slots = slots
+        self.state_file = account_file(self.STATE_FILE, self.account)
+        self.last_uid = self.load_last_uid()
+        self.imap_host = self.username = None
+        self.configure(account)
+
+    def configure(self, account):
+        """Apply (possibly changed) connection settings; takes effect next poll"""
+        mailbox = (account['imap_host'], account['username'])
+        if self.username is not None and mailbox != (self.imap_host, self.username):
+            # UIDs of another mailbox mean nothing here; start from its newest
+            self.last_uid = None
+        self.imap_host, self.username = mailbox
+        self.imap_port = account.get('imap_port', IMAP_SSL_PORT)
+        self.imap_ssl = account.get('imap_ssl', True)
+        self.password = account['password']
+
+    def load_last_uid(self):
+        if not os.path.exists(self.state_file):
+            return None
+        with open(self.state_file, "r") as f:
+            value = f.read().strip()
+            return int(value) if value else None
+
+    def save_last_uid(self, uid):
+        with open(self.state_file, "w") as f:
+            f.write(str(uid))
+
+    @staticmethod
+    def parse_email(msg):
+        """``(subject, from, body_bytes, charset, is_html)``; decoded on display"""
+        subject, encoding = decode_header(msg["Subject"])[0]
+        if isinstance(subject, bytes):
+            subject = subject.decode(encoding or "utf-8", errors="ignore")
+
+        from_, enc = decode_header(msg.get("From"))[0]
+        if isinstance(from_, bytes):
+            from_ = from_.decode(enc or "utf-8", errors="ignore")
+
+        body_part = None
+        if msg.is_multipart():
+            for part in msg.walk():
+                content_type = part.get_content_type()
+                disposition = str(part.get("Content-Disposition"))
+                if content_type == "text/plain" and "attachment" not in disposition:
+                    body_part = part
+                    break
+                elif content_type == "text/html" and "attachment" not in disposition:
+                    body_part = part
+        else:
+            body_part = msg
+
+        if body_part is None:
+            return subject, from_, b"", None, False
+        return (subject, from_, body_part.get_payload(decode=True) or b"",
+                body_part.get_content_charset(), body_part.get_content_type() == "text/html")
+
+    @staticmethod
+    def message_time(msg):
+        """Epoch seconds from the Date header, or now if it is missing/bad"""
+        try:
+            return parsedate_to_datetime(msg["Date"]).timestamp()
+        except (TypeError, ValueError):
+            return time.time()
+
+    async def fetch_delta(self):
+        return await self.fetch_backlog(None)
+
+    async def fetch_backlog(self, since):
+        if not self.username or not self.password:
+            print("Gmail credentials not configured")
+            return None
+
+        if self.slots is None:
+            return await self._fetch(since)
+        async with self.slots:
+            return await self._fetch(since)
+
+    async def _fetch(self, since=None):
+        """Raw ``(uid, message)`` pairs above the last UID, in one IMAP session.
+
+        Without ``since`` a first run only records the newest UID; with it,
+        messages from that day on are read, on a first run too.
+        """
+        client = AsyncIMAPClient(self.imap_host, self.imap_port, self.imap_ssl)
+        try:
+            await client.connect()
+            await client.login(self.username, self.password)
+            await client.select("INBOX")
+
+            if self.last_uid is None:
+                newer = "ALL"
+                uids = await client.uid_search(newer)
+                if since is None:
+                    return Delta([], max(uids)) if uids else None
+            else:
+                # "N:*" always matches the newest message, even if it is below N
+                newer = f"UID {self.last_uid + 1}:*"
+                uids = [uid for uid in await client.uid_search(newer) if uid > self.last_uid]
+            watermark = max(uids + [self.last_uid or 0]) or None
+            if since is not None and uids:
+                # SINCE compares dates in the server's time zone, so ask for a
+                # day more; the catch-up drops the rest by message time
+                recent = set(await client.uid_search(
+                    f"{newer} SINCE {imap_date(since - 86400)}"))
+                uids = [uid for uid in uids if uid in recent]
+            if watermark is None:
+                return None
+            delta = Delta([], watermark, time.time(), since)
+            if self.parse_pool is not None:
+                delta.parsed = []
+            try:
+                for start in range(0, len(uids), self.FETCH_BATCH):
+                    batch = await client.uid_fetch(
+                        uids[start:start + self.FETCH_BATCH], "RFC822")
+                    BYTES_DOWNLOADED.inc(sum(len(m) for _, m in batch), source=self.kind)
+                    delta.items += batch
+                    if delta.parsed is not None:
+                        # Parsed while the next batch downloads
+                        delta.parsed.append(self.parse_pool.submit(self, batch, delta))
+            except BaseException:
+                for job in delta.parsed or ():
+                    job.cancel()
+                raise
+            return delta
+        finally:
+            await client.logout()
+
+    def normalize(self, raw, delta):
+        return parse_imap_message(self.account, raw, delta)
+
+    def parser(self):
+        return functools.partial(parse_imap_message, self.account)
+
+    def commit(self, watermark):
+        self.save_last_uid(watermark)
+        self.last_uid = watermark
+
+    def state(self):
+        return self.last_uid
+
+    def restore(self, state):
+        self.commit(state)
+
+    def on_error(self, error):
+        API_ERRORS.inc(source=self.kind, code=type(error).__name__)
+        super().on_error(error)
+
+
+# ============== GOOGLE OAUTH ==============
+
+class GoogleAPISource:
+    """OAuth credentials of one Google account for a REST API source.
+
+    The token is kept in the credential vault and refreshed in the background
+    before it expires, so polls never block on authentication. The Google
+    auth libraries are imported on first authentication so that importing
+    this module stays cheap. Subclasses set ``SCOPES`` and ``kind``. A stored
+    token that was granted fewer scopes than ``SCOPES`` (e.g. from before
+    Classroom push was turned on) is replaced by signing in again.
+    """
+
+    SCOPES = []
+
+    # Token file and vault entry of the default account (before suffixing)
+    TOKEN_FILE = 'token.pickle'
+    TOKEN_KEY = 'oauth'
+
+    # Refresh the access token this many seconds before it expires
+    REFRESH_MARGIN = 300
+
+    def __init__(self, http, account=None):
+        self.http = http
+        self.account = (account or {}).get('name', DEFAULT_ACCOUNT)
+        self.token_file = account_file(self.TOKEN_FILE, self.account)
+        self.credentials_file = 'credentials.json'
+        self.token_key = f"{self.TOKEN_KEY}.{self.account}"
+        self.creds = None
+        self._refresher = None
+
+    def authenticate(self):
+        """Load, refresh or create OAuth credentials (blocking)"""
+        from google.auth.transport.requests import Request
+        from google_auth_oauthlib.flow import InstalledAppFlow
+
+        creds = self.creds or self.load_token()
+
+        missing = self.missing_scopes(creds)
+        if missing:
+            print(f"The stored {self.kind} sign-in for {self.account} does not allow "
+                  f"{', '.join(missing)}; sign in again in the browser to grant it")
+            creds = None
+
+        if not creds or not creds.valid:
+            if creds and creds.expired and creds.refresh_token:
+                creds.refresh(Request())
+            else:
+                flow = InstalledAppFlow.from_client_secrets_file(
+                    self.credentials_file, self.SCOPES)
+                creds = flow.run_local_server(port=0)
+            self.save_token(creds)
+
+        return creds
+
+    def missing_scopes(self, creds):
+        """Scopes in ``SCOPES`` that ``creds`` were not granted"""
+        if creds is None or creds.scopes is None:
+            return []
+        return [scope for scope in self.SCOPES if scope not in creds.scopes]
+
+    def load_token(self):
+        if not vault.enabled:
+            if not os.path.exists(self.token_file):
+                return None
+            with open(self.token_file, 'rb') as token:
+                return pickle.load(token)
+
+        from google.oauth2.credentials import Credentials
+
+        info = vault.get(self.token_key)
+        if info:
+            # Keep the scopes the token was granted so missing ones show up
+            return Credentials.from_authorized_user_info(json.loads(info))
+        if os.path.exists(self.token_file):
+            # One-time move of a token saved by an older version
+            with open(self.token_file, 'rb') as token:
+                creds = pickle.load(token)
+            self.save_token(creds)
+            os.remove(self.token_file)
+            print(f"Moved {self.token_file} into the credential vault")
+            return creds
+        return None
+
+    def save_token(self, creds):
+        if vault.enabled:
+            vault.set(self.token_key, creds.to_json())
+        else:
+            with open(self.token_file, 'wb') as token:
+                pickle.dump(creds, token)
+
+    def refresh_token(self):
+        """Refresh the access token and store it (blocking)"""
+        from google.auth.transport.requests import Request
+
+        self.creds.refresh(Request())
+        self.save_token(self.creds)
+
+    async def _keep_token_fresh(self):
+        while True:
+            expiry = self.creds.expiry  # naive UTC, as google-auth stores it
+            if expiry is None:
+                return
+            now = datetime.now(timezone.utc).replace(tzinfo=None)
+            delay = (expiry - now).total_seconds() - self.REFRESH_MARGIN
+            await asyncio.sleep(max(delay, 30))
+            try:
+                await asyncio.to_thread(self.refresh_token)
+            except Exception as e:
+                # The next poll falls back to authenticate()
+                print(f"{self.kind} token refresh failed ({self.account}): {e}")
+                return
+
+    async def auth_headers(self):
+        if not self.creds or not self.creds.valid:
+            self.creds = await asyncio.to_thread(self.authenticate)
+        if self._refresher is None or self._refresher.done():
+            self._refresher = asyncio.create_task(self._keep_token_fresh())
+        return {'Authorization': f"Bearer {self.creds.token}"}
+
+    async def close(self):
+        if self._refresher is not None:
+            self._refresher.cancel()
+            self._refresher = None
+
+
+# ============== GMAIL API POLLER ==============
+
+class GmailAPIPoller(GoogleAPISource, Source):
+    """Fetches new mail of one Gmail account through the Gmail REST API.
+
+    Instead of searching the mailbox, each poll asks ``users.history.list``
+    for messages added to ``label`` since the stored ``historyId``: one small
+    request when nothing changed. New messages are then read in batches of
+    50 as metadata (headers and snippet), so the spoken body is the
+    snippet rather than the full text. Needs no app password, only an OAuth
+    sign-in with the read-only Gmail scope.
+    """
+
+    SCOPES = ['https://www.googleapis.com/auth/gmail.readonly']
+
+    TOKEN_FILE = 'token_gmail.pickle'
+    TOKEN_KEY = 'oauth.gmail'
+
+    kind = "Email"
+
+    error_label = "Gmail API"
+
+    backend = "gmail_api"
+
+    API_ROOT = "https://gmail.googleapis.com"
+    API_PATH = "/gmail/v1/users/me"
+    BATCH_PATH = "/batch/gmail/v1"
+
+    STATE_FILE = "gmail_history.txt"
+
+    # Only what the feed shows, to keep responses small
+    HISTORY_FIELDS = "history/messagesAdded/message/id,historyId,nextPageToken"
+    MESSAGE_FIELDS = "id,snippet,internalDate,payload/headers"
+    METADATA_HEADERS = ['Subject', 'From']
+
+    # Ids per messages.list page when catching up without history
+    LIST_PAGE_SIZE = 500
+
+    def __init__(self, http, account):
+        super().__init__(http, account)
+        self.state_file = account_file(self.STATE_FILE, self.account)
+        self.history_id = self.load_history_id()
+        self.username = None
+        self.configure(account)
+
+    def configure(self, account):
+        """Apply (possibly changed) account settings; takes effect next poll"""
+        username = account.get('username', '')
+        if self.username is not None and username != self.username:
+            # History ids belong to one mailbox; start from the new one's newest
+            self.history_id = None
+        self.username = username
+        self.label = account.get('label') or 'INBOX'
+
+    def load_history_id(self):
+        if not os.path.exists(self.state_file):
+            return None
+        with open(self.state_file, "r") as f:
+            return f.read().strip() or None
+
+    def save_history_id(self, history_id):
+        with open(self.state_file, "w") as f:
+            f.write(history_id)
+        self.history_id = history_id
+
+    async def _get(self, path, params, headers):
+        return await self.http.get(f"{self.API_ROOT}{self.API_PATH}{path}", params=params,
+                                   headers=headers, source=self.kind)
+
+    async def _start_from_now(self, headers):
+        profile = await self._get("/profile", {'fields': "historyId"}, headers)
+        self.save_history_id(str(profile['historyId']))
+
+    async def added_message_ids(self, headers):
+        """``(ids, history_id)`` of messages added to the label, oldest first"""
+        ids = []
+        params = {
+            'startHistoryId': self.history_id,
+            'historyTypes': "messageAdded",
+            'labelId': self.label,
+            'fields': self.HISTORY_FIELDS
+        }
+        while True:
+            page = await self._get("/history", params, headers)
+            for record in page.get('history', []):
+                for added in record.get('messagesAdded', []):
+                    ids.append(added['message']['id'])
+            if 'nextPageToken' not in page:
+                return list(dict.fromkeys(ids)), str(page.get('historyId', self.history_id))
+            params['pageToken'] = page['nextPageToken']
+
+    async def message_ids_since(self, since, headers):
+        """Ids of messages in the label received after epoch ``since``"""
+        ids = []
+        params = {
+            'q': f"after:{int(since)}",
+            'labelIds': self.label,
+            'maxResults': self.LIST_PAGE_SIZE,
+            'fields': "messages/id,nextPageToken"
+        }
+        while True:
+            page = await self._get("/messages", params, headers)
+            ids += [message['id'] for message in page.get('messages', [])]
+            if 'nextPageToken' not in page:
+                return ids
+            params['pageToken'] = page['nextPageToken']
+
+    async def fetch_delta(self):
+        headers = await self.auth_headers()
+        if self.history_id is None:
+            await self._start_from_now(headers)
+            return None
+
+        try:
+            ids, history_id = await self.added_message_ids(headers)
+        except HTTPError as e:
+            if e.status != 404:
+                raise
+            # History is kept for about a week; older ids are rejected
+            print(f"Gmail history expired ({self.account}); starting from now")
+            await self._start_from_now(headers)
+            return None
+        return await self._read_messages(ids, history_id, headers)
+
+    async def fetch_backlog(self, since):
+        headers = await self.auth_headers()
+        ids = None
+        if self.history_id is not None:
+            try:
+                ids, history_id = await self.added_message_ids(headers)
+            except HTTPError as e:
+                if e.status != 404:
+                    raise
+        if ids is None:
+            # No usable history: list what the label received in the window
+            profile = await self._get("/profile", {'fields': "historyId"}, headers)
+            history_id = str(profile['historyId'])
+            ids = await self.message_ids_since(since, headers)
+        delta = await self._read_messages(ids, history_id, headers)
+        delta.since = since
+        return delta
+
+    async def _read_messages(self, ids, history_id, headers):
+        """Delta of message metadata for ``ids``, read in batches, oldest first"""
+        detected = time.time()
+        params = {'format': "metadata", 'metadataHeaders': self.METADATA_HEADERS,
+                  'fields': self.MESSAGE_FIELDS}
+        responses = await batch_get(
+            self.http, f"{self.API_ROOT}{self.BATCH_PATH}",
+            [(f"{self.API_PATH}/messages/{message_id}", params) for message_id in ids],
+            headers, source=self.kind)
+        # Messages deleted before they were read are simply skipped
+        messages = [body for status, body in responses if status == 200]
+        messages.sort(key=lambda m: int(m.get('internalDate', 0)))
+        return Delta(messages, history_id, detected)
+
+    def normalize(self, message, delta):
+        BYTES_DOWNLOADED.inc(len(message.get('snippet', '')), source=self.kind)
+        header = {h['name'].lower(): h['value']
+                  for h in message.get('payload', {}).get('headers', [])}
+        sent = int(message.get('internalDate', 0)) / 1000 or delta.detected
+        trace = Trace("Email").mark("source", sent).mark("detected", delta.detected)
+        return Announcement(
+            "Email", header.get('subject', ''), html.unescape(message.get('snippet', '')),
+            sent, header.get('from', ''), self.account, trace=trace.mark("parsed"))
+
+    def commit(self, watermark):
+        self.save_history_id(watermark)
+
+    def state(self):
+        return self.history_id
+
+    def restore(self, state):
+        self.commit(state)
+
+
+def parse_imap_message(account, raw, delta):
+    """Announcement for one fetched ``(uid, message)``; uses no poller state,
+    so parse workers can run it on several batches at once"""
+    uid, raw_email = raw
+    msg = email.message_from_bytes(raw_email)
+    subject, from_, body, charset, markup = GmailPoller.parse_email(msg)
+    sent = GmailPoller.message_time(msg)
+    trace = Trace("Email").mark("source", sent).mark("detected", delta.detected)
+    return Announcement("Email", subject, body, sent, from_, account, charset,
+                        trace.mark("parsed"), markup=markup)
+
+
+def mail_poller(account, http, slots=None):
+    """Poller for a mailbox from ``email_accounts``, per its ``backend``"""
+    if account['backend'] == "gmail_api":
+        return GmailAPIPoller(http, account)
+    return GmailPoller(account, slots)
+
+
+# ============== GOOGLE CLASSROOM POLLER ==============
+
+class ClassroomPoller(GoogleAPISource, Source):
+    """Fetches Classroom items updated since the last stored timestamp.
+
+    Announcements, coursework and course materials of every course are read
+    through the Classroom batch endpoint, a few requests per cycle however
+    many courses there are. Coursework and materials are diffed against a
+    snapshot of their earlier fields so that only new items and moved due
+    dates are announced. Each Google account gets its own timestamp
+    file and OAuth token.
+    """
+
+    SCOPES = [
+        'https://www.googleapis.com/auth/classroom.courses.readonly',
+        'https://www.googleapis.com/auth/classroom.announcements.readonly',
+        'https://www.googleapis.com/auth/classroom.coursework.students.readonly',
+        'https://www.googleapis.com/auth/classroom.courseworkmaterials.readonly'
+    ]
+
+    kind = "Classroom"
+
+    error_label = "Classroom update"
+
+    API_BASE = "https://classroom.googleapis.com/v1"
+
+    # Per-course lists fetched each cycle: name -> (URL path, response key)
+    STREAMS = {
+        'announcements': ('announcements', 'announcements'),
+        'coursework': ('courseWork', 'courseWork'),
+        'materials': ('courseWorkMaterials', 'courseWorkMaterial')
+    }
+
+    # Newest items requested per stream and course
+    PAGE_SIZE = 10
+
+    # The same when catching up, so a busy course's backlog is not cut at ten
+    CATCH_UP_PAGE_SIZE = 100
+
+    # Coursework/material fields remembered for diffing
+    MAX_SNAPSHOTS = 2000
+
+    def __init__(self, http, account=None):
+        super().__init__(http, account)
+        self.timestamp_file = account_file('last_timestamp.txt', self.account)
+        self.snapshot_file = account_file('classroom_items.json', self.account)
+        self.snapshots = self.load_snapshots()
+        # (stream, status) errors already printed, to avoid repeating them every cycle
+        self._reported = set()
+        self.last_ts = self.load_last_timestamp()
+
+    def load_last_timestamp(self):
+        if not os.path.exists(self.timestamp_file):
+            return None
+        try:
+            with open(self.timestamp_file, 'r') as f:
+                return float(f.read().strip())
+        except:
+            return None
+
+    def save_last_timestamp(self, ts):
+        with open(self.timestamp_file, 'w') as f:
+            f.write(str(ts))
+
+    def iso_to_timestamp(self, iso_string):
+        try:
+            dt = datetime.fromisoformat(iso_string.replace("Z", "+00:00"))
+            return dt.timestamp()
+        except:
+            return 0
+
+    def load_snapshots(self):
+        try:
+            with open(self.snapshot_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_snapshots(self):
+        # Keep the most recently updated items only
+        if len(self.snapshots) > self.MAX_SNAPSHOTS:
+            newest = sorted(self.snapshots.items(), key=lambda kv: kv[1]['updated'])
+            self.snapshots = dict(newest[-self.MAX_SNAPSHOTS:])
+        with open(self.snapshot_file, 'w') as f:
+            json.dump(self.snapshots, f)
+
+    def _fetch_calls(self, courses, streams, page_size):
+        prefix = "/" + self.API_BASE.rsplit("/", 1)[1]
+        params = {'orderBy': 'updateTime desc', 'pageSize': page_size}
+        return [(f"{prefix}/courses/{course['id']}/{self.STREAMS[stream][0]}", params)
+                for course in courses
+                for stream in streams]
+
+    def _changes(self, stream, item):
+        """Announcement text for a new or meaningfully changed item, else None.
+
+        Announcements are announced on every update, as before. Coursework is
+        announced when new or when its due date moves; materials when new.
+        """
+        if stream == "announcements":
+            return item.get('text', '')
+
+        item_id = f"{stream}:{item.get('id')}"
+        title = item.get('title', 'Untitled')
+        fields = {'title': title, 'due': due_text(item),
+                  'updated': item.get('updateTime', '')}
+        old = self.snapshots.get(item_id)
+        self.snapshots[item_id] = fields
+
+        if stream == "materials":
+            return f"New material: {title}" if old is None else None
+        if old is None:
+            due = f" (due {fields['due']})" if fields['due'] else ""
+            return f"New assignment: {title}{due}"
+        if old['due'] != fields['due']:
+            was = f", was {old['due']}" if old['due'] else ""
+            now = fields['due'] or "no due date"
+            return f"Due date moved: {title} is now due {now}{was}"
+        return None
+
+    async def list_courses(self, headers):
+        results = await self.http.get(
+            f"{self.API_BASE}/courses", params={'pageSize': 100}, headers=headers,
+            source=self.kind)
+        return results.get('courses', [])
+
+    async def fetch_items(self, courses, streams, headers, page_size=None):
+        """Delta of ``(course, stream, item)`` for ``streams`` of ``courses``.
+
+        Its watermark is the newest ``updateTime`` seen, in epoch seconds.
+        """
+        # Every stream of every course in ceil(len(streams) * courses / 50) requests
+        responses = await batch_get(
+            self.http, self.API_BASE.rsplit("/", 1)[0] + "/batch",
+            self._fetch_calls(courses, streams, page_size or self.PAGE_SIZE), headers,
+            source=self.kind)
+        detected = time.time()
+
+        found = []
+        latest = self.last_ts or 0
+        pairs = ((course, stream) for course in courses for stream in streams)
+        for (course, stream), (status, body) in zip(pairs, responses):
+            if status != 200:
+                API_ERRORS.inc(source=self.kind, code=str(status))
+                if (stream, status) not in self._reported:
+                    self._reported.add((stream, status))
+                    print(f"Classroom {stream} unavailable ({self.account}): HTTP {status}")
+                continue
+
+            items = body.get(self.STREAMS[stream][1], [])
+            # Oldest first, so a moved due date is compared in order
+            for item in sorted(items, key=lambda i: i.get('updateTime', '')):
+                latest = max(latest, self.iso_to_timestamp(item.get("updateTime", "")))
+                found.append((course, stream, item))
+        return Delta(found, latest, detected)
+
+    async def fetch_delta(self):
+        headers = await self.auth_headers()
+        courses = await self.list_courses(headers)
+        if not courses:
+            return None
+        return await self.fetch_items(courses, self.STREAMS, headers)
+
+    async def fetch_backlog(self, since):
+        headers = await self.auth_headers()
+        courses = await self.list_courses(headers)
+        if not courses:
+            return None
+        delta = await self.fetch_items(courses, self.STREAMS, headers,
+                                       self.CATCH_UP_PAGE_SIZE)
+        delta.since = since
+        return delta
+
+    def normalize(self, raw, delta):
+        course, stream, item = raw
+        ts = self.iso_to_timestamp(item.get("updateTime", ""))
+        if self.last_ts is None and delta.since is None:
+            # First run: remember what exists, announce nothing
+            self._changes(stream, item)
+            return None
+        if ts <= (self.last_ts or 0):
+            return None
+        if delta.since is not None and ts < delta.since:
+            # Older than the catch-up window
+            self._changes(stream, item)
+            return None
+
+        text = self._changes(stream, item)
+        if text is None:
+            return None
+        trace = Trace("Classroom").mark("source", ts).mark("detected", delta.detected)
+        created = self.iso_to_timestamp(item.get('creationTime', "")) or ts
+        return Announcement(
+            "Classroom", f"Classroom: {course['name']}", text, created, course['name'],
+            self.account, trace=trace.mark("parsed"))
+
+    def commit(self, watermark):
+        """Store the snapshots and, unless None, the timestamp watermark.
+
+        Partial fetches commit None: the watermark must not hide older
+        changes of the courses they did not read.
+        """
+        self.save_snapshots()
+        if watermark is not None:
+            self.save_last_timestamp(watermark)
+            self.last_ts = watermark
+
+    def state(self):
+        return {'last_ts': self.last_ts, 'snapshots': self.snapshots}
+
+    def restore(self, state):
+        self.snapshots = state['snapshots']
+        self.commit(state['last_ts'])
+
+
+def due_text(item):
+    """Local due date/time of a coursework item, '' if it has none"""
+    date = item.get('dueDate')
+    if not date:
+        return ""
+    time_of_day = item.get('dueTime', {})
+    # The API gives due dates in UTC
+    due = datetime(date['year'], date['month'], date['day'],
+                   time_of_day.get('hours', 23), time_of_day.get('minutes', 59),
+                   tzinfo=timezone.utc)
+    return due.astimezone().strftime("%Y-%m-%d %H:%M")
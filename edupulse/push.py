@@ -0,0 +1,197 @@
+import base64
+import json
+import threading
+import time
+from collections import deque
+
+from .httpclient import HTTPError
+from .pollers import ClassroomPoller
+
+
+# ============== CLASSROOM PUSH NOTIFICATIONS ==============
+#
+# Instead of reading every course each cycle, the push poller registers a
+# Classroom feed per course with a Cloud Pub/Sub topic and pulls the change
+# notifications from a subscription. A cycle with no notifications costs a
+# single pull; otherwise only the courses named in the notifications are
+# fetched. Classroom only publishes coursework changes, so announcements and
+# materials (and anything a lost notification would hide) are still picked
+# up by a full sweep every ``sweep_interval`` seconds. While registration is
+# not possible the poller behaves exactly like ClassroomPoller.
+
+PUBSUB_API = "https://pubsub.googleapis.com/v1"
+
+PUBSUB_SCOPE = 'https://www.googleapis.com/auth/pubsub'
+PUSH_SCOPE = 'https://www.googleapis.com/auth/classroom.push-notifications'
+
+FEED_TYPE = "COURSE_WORK_CHANGES"
+
+DEFAULT_SWEEP_INTERVAL = 900
+
+
+class PubSubSubscriber:
+    """Pulls and acknowledges messages of a Cloud Pub/Sub subscription.
+
+    ``subscription`` is the full name, ``projects/<project>/subscriptions/<id>``.
+    """
+
+    MAX_MESSAGES = 100
+
+    def __init__(self, http, subscription, api_base=PUBSUB_API):
+        self.http = http
+        self.subscription = subscription
+        self.api_base = api_base
+
+    async def pull(self, headers):
+        """Decoded notifications waiting on the subscription, acknowledged"""
+        url = f"{self.api_base}/{self.subscription}"
+        # returnImmediately is deprecated but still the only way to avoid
+        # holding the request open when the subscription is empty
+        results = await self.http.post(
+            f"{url}:pull", json={'maxMessages': self.MAX_MESSAGES, 'returnImmediately': True},
+            headers=headers, source="Classroom")
+        received = results.get('receivedMessages', [])
+        if not received:
+            return []
+
+        await self.http.post(
+            f"{url}:acknowledge", json={'ackIds': [m['ackId'] for m in received]},
+            headers=headers, source="Classroom")
+        notifications = []
+        for message in received:
+            try:
+                data = base64.b64decode(message['message'].get('data', ''))
+                notifications.append(json.loads(data))
+            except ValueError:
+                continue  # not a Classroom notification
+        return notifications
+
+
+class LocalQueueSubscriber:
+    """In-process stand-in for a Pub/Sub subscription.
+
+    ``publish`` may be called from any thread; used by the benchmarks and
+    handy for trying the push path without a Google Cloud project.
+    """
+
+    def __init__(self):
+        self._messages = deque()
+        self._lock = threading.Lock()
+
+    def publish(self, notification):
+        with self._lock:
+            self._messages.append(notification)
+
+    async def pull(self, headers):
+        with self._lock:
+            notifications = list(self._messages)
+            self._messages.clear()
+        return notifications
+
+
+class ClassroomPushPoller(ClassroomPoller):
+    """ClassroomPoller that reads only the courses its notifications name"""
+
+    # Renew registrations this long before they expire (they last a week)
+    RENEW_MARGIN = 86400
+
+    # Wait this long before trying to register again after a failure
+    RETRY_INTERVAL = 3600
+
+    SCOPES = ClassroomPoller.SCOPES + [PUSH_SCOPE, PUBSUB_SCOPE]
+
+    def __init__(self, http, account=None, subscriber=None, topic="",
+                 sweep_interval=DEFAULT_SWEEP_INTERVAL):
+        super().__init__(http, account)
+        self.subscriber = subscriber
+        self.topic = topic
+        self.sweep_interval = sweep_interval
+        self.courses = {}
+        # course id -> registration expiry (epoch seconds)
+        self.registrations = {}
+        self._last_sweep = None
+        self._retry_at = 0
+
+    @property
+    def push_active(self):
+        return bool(self.registrations)
+
+    async def fetch_delta(self):
+        headers = await self.auth_headers()
+        now = time.time()
+        if (not self.push_active or self._last_sweep is None or
+                now - self._last_sweep >= self.sweep_interval):
+            return await self._sweep(headers, now)
+
+        try:
+            notifications = await self.subscriber.pull(headers)
+        except Exception as e:
+            print(f"Classroom notifications unavailable ({self.account}): {e}")
+            return await self._sweep(headers, now)
+        changed = {n.get('resourceId', {}).get('courseId') for n in notifications}
+        changed.discard(None)
+        if changed - set(self.courses):
+            # A course we have not seen yet; the sweep registers it
+            return await self._sweep(headers, now)
+        if not changed:
+            return None
+
+        delta = await self.fetch_items(
+            [self.courses[c] for c in changed], ['coursework'], headers)
+        delta.watermark = None  # see ClassroomPoller.commit
+        return delta
+
+    async def _sweep(self, headers, now):
+        """Full poll of every course, then keep the registrations current"""
+        courses = await self.list_courses(headers)
+        self.courses = {c['id']: c for c in courses}
+        delta = await self.fetch_items(courses, self.STREAMS, headers) if courses else None
+        self._last_sweep = now
+        if now >= self._retry_at:
+            await self._register(headers, now)
+        return delta
+
+    async def _register(self, headers, now):
+        was_active = self.push_active
+        for course_id in list(self.registrations):
+            if course_id not in self.courses:
+                del self.registrations[course_id]  # expires on its own
+
+        due = [c for c in self.courses
+               if self.registrations.get(c, 0) - now < self.RENEW_MARGIN]
+        for course_id in due:
+            try:
+                registration = await self.http.post(
+                    f"{self.API_BASE}/registrations",
+                    json={
+                        'feed': {
+                            'feedType': FEED_TYPE,
+                            'courseWorkChangesInfo': {'courseId': course_id}
+                        },
+                        'cloudPubsubTopic': {'topicName': self.topic}
+                    },
+                    headers=headers, source=self.kind)
+            except HTTPError as e:
+                self.registrations.clear()
+                self._retry_at = now + self.RETRY_INTERVAL
+                print(f"Classroom push unavailable ({self.account}), polling instead: "
+                      f"HTTP {e.status}")
+                return
+            self.registrations[course_id] = self.iso_to_timestamp(
+                registration.get('expiryTime', ''))
+
+        self._retry_at = 0
+        if not was_active and self.registrations:
+            print(f"Classroom push notifications on ({self.account}, "
+                  f"{len(self.registrations)} course(s))")
+
+
+def push_subscriber(http, push_settings):
+    """Subscriber for the ``push`` settings, or None when push is off"""
+    if not push_settings['enabled']:
+        return None
+    if not push_settings['topic'] or not push_settings['subscription']:
+        print("Classroom push needs push.topic and push.subscription; polling instead")
+        return None
+    return PubSubSubscriber(http, push_settings['subscription'])
+
@@ -0,0 +1,208 @@
+import asyncio
+import json
+import random
+import threading
+import time
+
+from .pipeline import Announcement
+from .settings import DEFAULT_ACCOUNT
+from .tracing import Trace
+
+
+# ============== RECORDING AND REPLAY ==============
+#
+# The recorder appends every announcement a source emits to a JSONL stream,
+# one ``{'kind', 'at', 'item'}`` object per line with ``item`` from
+# ``Announcement.to_record``. A Replay feeds a recorded or
+# synthetic stream back through the ingestion core at the original pace, a
+# multiple of it, or as fast as possible, so the pipeline and feed can be
+# load-tested with realistic burst shapes without touching real accounts.
+
+RECORD_FILE = "stream.jsonl"
+
+SPEEDS = {"1x": 1.0, "10x": 10.0, "max": None}
+
+# Poll interval for replay sources once their stream is exhausted
+REPLAY_IDLE_INTERVAL = 60
+
+
+class StreamRecorder:
+    """Appends emitted items to a JSONL stream; disabled until ``start``"""
+
+    def __init__(self):
+        self.path = None
+        self.enabled = False
+        self._lock = threading.Lock()
+
+    def start(self, path=RECORD_FILE):
+        self.path = path
+        self.enabled = True
+        print(f"Recording ingested items to {path}")
+
+    def record(self, kind, announcement):
+        if not self.enabled:
+            return
+        trace = announcement.trace
+        event = {
+            'kind': kind,
+            'at': trace.marks.get("detected", time.time()) if trace else time.time(),
+            'item': announcement.to_record()
+        }
+        try:
+            with self._lock, open(self.path, 'a') as f:
+                f.write(json.dumps(event) + "\n")
+        except OSError as e:
+            print(f"Recording error: {e}")
+
+
+def load_stream(path):
+    """Events of a recorded stream, oldest first"""
+    events = []
+    with open(path, 'r') as f:
+        for line in f:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue  # torn write from a crash
+            if 'kind' in event and 'item' in event:
+                events.append(event)
+    events.sort(key=lambda e: e.get('at', 0))
+    return events
+
+
+def save_stream(events, path):
+    with open(path, 'w') as f:
+        for event in events:
+            f.write(json.dumps(event) + "\n")
+
+
+def parse_speed(value):
+    """``1x``/``10x``/``max`` or any number; None means as fast as possible"""
+    if value in SPEEDS:
+        return SPEEDS[value]
+    speed = float(value.rstrip("x"))
+    if speed <= 0:
+        raise ValueError("speed must be positive")
+    return speed
+
+
+class Replay:
+    """Plays a stream of events back with its original spacing scaled by ``speed``.
+
+    ``sources()`` returns one source per item kind; they share a clock so the
+    kinds stay interleaved as recorded. ``finished`` is set once every source
+    has emitted its last event.
+    """
+
+    def __init__(self, events, speed=1.0):
+        self.events = sorted(events, key=lambda e: e.get('at', 0))
+        self.speed = speed
+        self.emitted = 0
+        self.started = None
+        self.finished = None
+        self._running = set()
+
+    @classmethod
+    def from_file(cls, path, speed=1.0):
+        return cls(load_stream(path), speed)
+
+    def sources(self):
+        kinds = sorted({e['kind'] for e in self.events})
+        self._running = set(kinds)
+        self.finished = asyncio.Event()
+        if not kinds:
+            self.finished.set()
+        return [ReplaySource(self, kind) for kind in kinds]
+
+    def _delay(self, event):
+        """Seconds to wait before emitting ``event``"""
+        now = time.monotonic()
+        if self.started is None:
+            self.started = now
+        if self.speed is None or not self.events:
+            return 0
+        offset = (event.get('at', 0) - self.events[0].get('at', 0)) / self.speed
+        return self.started + offset - now
+
+    def _source_done(self, kind):
+        self._running.discard(kind)
+        if not self._running:
+            self.finished.set()
+
+
+class ReplaySource:
+    """Source emitting one kind of event from a Replay, once"""
+
+    def __init__(self, replay, kind):
+        self.replay = replay
+        self.kind = kind
+        self.done = False
+
+    async def poll(self, emit):
+        if self.done:
+            return
+
+        for event in self.replay.events:
+            if event['kind'] != self.kind:
+                continue
+            delay = self.replay._delay(event)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            elif self.replay.speed is None:
+                await asyncio.sleep(0)  # let the other kinds interleave
+
+            announcement = Announcement.from_record(event['item'], self.kind)
+            # Latency is measured from the replayed emission, not the recording
+            announcement.trace = Trace(self.kind).mark("source").mark("detected").mark("parsed")
+            self.replay.emitted += 1
+            emit(announcement)
+
+        self.done = True
+        self.replay._source_done(self.kind)
+
+
+# ============== SYNTHETIC STREAMS ==============
+
+def _storm_offsets(rng, count, duration):
+    """Exam-day shape: most items land in a few short bursts"""
+    bursts = [rng.uniform(0, duration * 0.9) for _ in range(3)]
+    width = duration * 0.02
+    offsets = []
+    for _ in range(count):
+        if rng.random() < 0.8:
+            offsets.append(rng.choice(bursts) + rng.uniform(0, width))
+        else:
+            offsets.append(rng.uniform(0, duration))
+    return offsets
+
+
+def _steady_offsets(rng, count, duration):
+    return [rng.uniform(0, duration) for _ in range(count)]
+
+
+SHAPES = {'steady': _steady_offsets, 'storm': _storm_offsets}
+
+
+def synthetic_stream(count, duration, shape="storm", email_share=0.7, seed=0):
+    """``count`` fake events spread over ``duration`` seconds"""
+    rng = random.Random(seed)
+    start = time.time()
+    events = []
+    for n, offset in enumerate(sorted(SHAPES[shape](rng, count, duration)), 1):
+        at = start + offset
+        if rng.random() < email_share:
+            announcement = Announcement(
+                "Email", f"Exam update {n}",
+                f"Exam hall {n % 12 + 1} opens at {8 + n % 4}:00. Bring your ID card.",
+                at, f"office{n % 5}@school.example", DEFAULT_ACCOUNT)
+        else:
+            course = f"Course {n % 8 + 1}"
+            announcement = Announcement(
+                "Classroom", f"Classroom: {course}",
+                f"Reminder {n}: the exam timetable has been updated.",
+                at, course, DEFAULT_ACCOUNT)
+        events.append({'kind': announcement.kind, 'at': at, 'item': announcement.to_record()})
+    return events
+
+
+recorder = StreamRecorder()
@@ -0,0 +1,239 @@
+import asyncio
+import heapq
+import itertools
+import time
+from bisect import bisect_left
+from datetime import datetime, timedelta
+
+from .metrics import SCHEDULE_FIRES
+from .pipeline import Announcement
+from .tracing import Trace
+
+
+# ============== SCHEDULED ANNOUNCEMENTS ==============
+#
+# Bells, drill reminders and recurring notices from the ``schedule``
+# settings. Each item has a cron rule (minute hour day month weekday, local
+# time) or a one-off ``at`` time. All pending fires sit in one heap, so a
+# tick costs O(log n) however many schedules there are, and the loop sleeps
+# until the earliest one. ``lead_seconds`` before a fire the announcement is
+# built, cleaned up and translated; at the fire time it only has to be
+# handed to the speak queue.
+
+DEFAULT_LEAD_SECONDS = 30
+
+# Fires found later than this, e.g. after the machine slept, are skipped
+LATE_LIMIT = 60
+
+# Wake at least this often, so clock changes are noticed
+MAX_SLEEP = 60
+
+# Cron fields: (low, high, names)
+_MONTHS = {name: i + 1 for i, name in enumerate(
+    "jan feb mar apr may jun jul aug sep oct nov dec".split())}
+_WEEKDAYS = {name: i for i, name in enumerate("sun mon tue wed thu fri sat".split())}
+_FIELDS = ((0, 59, {}), (0, 23, {}), (1, 31, {}), (1, 12, _MONTHS), (0, 7, _WEEKDAYS))
+
+# Years searched for the next match before a rule is taken to never fire
+_SEARCH_YEARS = 5
+
+
+class ScheduleError(ValueError):
+    """A schedule item that cannot be understood"""
+
+
+def _parse_field(text, low, high, names):
+    def value(token):
+        token = names.get(token, token)
+        try:
+            return int(token)
+        except ValueError:
+            raise ScheduleError(f"bad value {token!r}") from None
+
+    values = set()
+    for part in text.lower().split(","):
+        body, _, step = part.partition("/")
+        if body == "*":
+            start, end = low, high
+        else:
+            first, _, last = body.partition("-")
+            start = value(first)
+            end = value(last) if last else high if step else start
+        step = value(step) if step else 1
+        if step < 1 or not low <= start <= end <= high:
+            raise ScheduleError(f"{part!r} is outside {low}-{high}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronRule:
+    """Five-field cron expression, e.g. ``55 7 * * mon-fri``, in local time.
+
+    As in cron, a day matches if either the day of month or the weekday does
+    when both are restricted.
+    """
+
+    __slots__ = ('expression', 'minutes', 'hours', 'days', 'months', 'weekdays', '_either_day')
+
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ScheduleError(f"{expression!r} needs 5 fields")
+        minutes, hours, days, months, weekdays = (
+            _parse_field(text, *spec) for text, spec in zip(fields, _FIELDS))
+        self.expression = expression
+        self.minutes = sorted(minutes)
+        self.hours = sorted(hours)
+        self.days = days
+        self.months = months
+        self.weekdays = {day % 7 for day in weekdays}  # 7 is Sunday too
+        self._either_day = fields[2] != "*" and fields[4] != "*"
+
+    def _day_matches(self, t):
+        day = t.day in self.days
+        weekday = t.isoweekday() % 7 in self.weekdays
+        return day or weekday if self._either_day else day and weekday
+
+    def next_after(self, ts):
+        """First fire time after epoch ``ts``, or None if there is none"""
+        t = datetime.fromtimestamp(ts).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        last_year = t.year + _SEARCH_YEARS
+        while t.year <= last_year:
+            if t.month not in self.months:
+                t = datetime(t.year + t.month // 12, t.month % 12 + 1, 1)
+                continue
+            if not self._day_matches(t):
+                t = datetime(t.year, t.month, t.day) + timedelta(days=1)
+                continue
+            i = bisect_left(self.hours, t.hour)
+            if i == len(self.hours):
+                t = datetime(t.year, t.month, t.day) + timedelta(days=1)
+                continue
+            if self.hours[i] != t.hour:
+                t = t.replace(hour=self.hours[i], minute=0)
+            i = bisect_left(self.minutes, t.minute)
+            if i == len(self.minutes):
+                t = t.replace(minute=0) + timedelta(hours=1)
+                continue
+            return t.replace(minute=self.minutes[i]).timestamp()
+        return None
+
+
+class OneShot:
+    """A single fire time, ``YYYY-MM-DD HH:MM[:SS]`` local or epoch seconds"""
+
+    __slots__ = ('at',)
+
+    def __init__(self, at):
+        if isinstance(at, str):
+            try:
+                at = datetime.fromisoformat(at).timestamp()
+            except ValueError:
+                raise ScheduleError(f"bad time {at!r}") from None
+        self.at = at
+
+    def next_after(self, ts):
+        return self.at if self.at > ts else None
+
+
+class Schedule:
+    """One ``schedule.items`` entry"""
+
+    __slots__ = ('name', 'rule', 'text', 'language')
+
+    def __init__(self, name, rule, text, language=None):
+        self.name = name
+        self.rule = rule
+        self.text = text
+        self.language = language
+
+    @classmethod
+    def from_settings(cls, item):
+        """Schedule for a settings item; raises ScheduleError"""
+        if item.get('cron') and item.get('at'):
+            raise ScheduleError("has both 'cron' and 'at'")
+        rule = CronRule(item['cron']) if item.get('cron') else OneShot(item['at'])
+        return cls(item.get('name') or item['text'][:40], rule, item['text'],
+                   item.get('language'))
+
+
+class Scheduler:
+    """Fires scheduled announcements on time; lives on one asyncio loop.
+
+    ``emit`` gets each Announcement, already localized and translated, on
+    the loop at its fire time. ``configure`` must be called on the loop once
+    ``run`` has started.
+    """
+
+    def __init__(self, settings, emit, language="English"):
+        self.emit = emit
+        # (when, seq, schedule, fire time, Announcement once prepared)
+        self._heap = []
+        self._seq = itertools.count()
+        self._wake = None
+        self.configure(settings, language)
+
+    def configure(self, settings, language="English"):
+        """Apply the ``schedule`` settings section; pending fires are recomputed"""
+        self.lead = settings['lead_seconds']
+        self.language = language
+        schedules = []
+        for item in settings['items'] if settings['enabled'] else []:
+            try:
+                schedules.append(Schedule.from_settings(item))
+            except ScheduleError as e:
+                print(f"Skipping schedule {item.get('name') or item['text'][:40]!r}: {e}")
+
+        now = time.time()
+        self._heap = []
+        for schedule in schedules:
+            fire = schedule.rule.next_after(now)
+            if fire is not None:
+                self._heap.append((fire - self.lead, next(self._seq), schedule, fire, None))
+        heapq.heapify(self._heap)
+        if self._wake is not None:
+            self._wake.set()
+
+    @property
+    def pending(self):
+        return len(self._heap)
+
+    async def run(self):
+        self._wake = asyncio.Event()
+        while True:
+            now = time.time()
+            while self._heap and self._heap[0][0] <= now:
+                self._step(heapq.heappop(self._heap), now)
+            delay = min(self._heap[0][0] - now, MAX_SLEEP) if self._heap else MAX_SLEEP
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def _step(self, entry, now):
+        _, _, schedule, fire, announcement = entry
+        if announcement is None:
+            announcement = self._prepare(schedule, fire)
+            heapq.heappush(self._heap, (fire, next(self._seq), schedule, fire, announcement))
+            return
+
+        if now - fire > LATE_LIMIT:
+            print(f"Missed schedule {schedule.name!r} at {announcement.timestamp}")
+            SCHEDULE_FIRES.inc(result="missed")
+        else:
+            SCHEDULE_FIRES.inc(result="fired")
+            self.emit(announcement)
+        # After a long gap, continue from now rather than replay every miss
+        fire = schedule.rule.next_after(max(fire, now))
+        if fire is not None:
+            heapq.heappush(self._heap, (fire - self.lead, next(self._seq), schedule, fire, None))
+
+    def _prepare(self, schedule, fire):
+        """The announcement for one fire, ready to be spoken"""
+        trace = Trace("Scheduled").mark("source", fire)
+        announcement = Announcement("Scheduled", schedule.name, schedule.text, fire,
+                                    source="Schedule", trace=trace)
+        announcement.localize(schedule.language or self.language)
+        announcement.translated  # clean up and translate now, not at the fire time
+        return announcement
@@ -0,0 +1,499 @@
+import copy
+import json
+import os
+import re
+import tempfile
+import threading
+
+from .vault import VaultError, vault
+
+
+# ============== SETTINGS MANAGER ==============
+
+class SettingsManager:
+    """Manages loading and saving settings to settings.json"""
+    
+    SETTINGS_FILE = "settings.json"
+    
+    DEFAULT_SETTINGS = {
+        # backend "imap" uses the password; "gmail_api" signs in with OAuth
+        # and reads only messages added to ``label``
+        "email": {
+            "backend": "imap",
+            "imap_host": "imap.gmail.com",
+            "username": "",
+            "password": "",
+            "label": "INBOX"
+        },
+        "agora": {
+            "app_id": "",
+            "channel": "pa_channel",
+            "token": "",
+            "openai_key": "",
+            "authorization": "",
+            "headless": True
+        },
+        "polling": {
+            "email_interval": 60,
+            "classroom_interval": 60,
+            "max_imap_connections": 4
+        },
+        "audio": {
+            "default_language": "English",
+            "auto_broadcast": False
+        },
+        # GUI event-loop stall watchdog, also switchable from the settings page
+        "diagnostics": {
+            "stall_watchdog": False,
+            "stall_threshold_ms": 200
+        },
+        # Latency traces for ``python -m edupulse traces``; traces.jsonl
+        # moves to traces.jsonl.1 once it reaches max_mb
+        "tracing": {
+            "enabled": True,
+            "max_mb": 10
+        },
+        # Classroom push notifications through Cloud Pub/Sub, e.g.
+        #   "topic": "projects/<project>/topics/classroom"
+        #   "subscription": "projects/<project>/subscriptions/edupulse"
+        # Courses are still fully polled every sweep_interval seconds
+        "push": {
+            "enabled": False,
+            "topic": "",
+            "subscription": "",
+            "sweep_interval": 900
+        },
+        # Shorter spoken versions of long announcements. "extractive" runs
+        # locally; "openai" sends the text to api_url (any OpenAI-compatible
+        # endpoint, e.g. a local model server) with agora.openai_key
+        "summary": {
+            "enabled": False,
+            "backend": "extractive",
+            "target_words": 40,
+            "workers": 4,
+            "model": "gpt-4o-mini",
+            "api_url": "https://api.openai.com/v1/chat/completions"
+        },
+        # After downtime, including a restart (with the outbox on), read what
+        # was missed in the last lookback_hours in bulk. Items changed within
+        # fresh_minutes are announced; older ones are listed on one digest card
+        "catch_up": {
+            "enabled": False,
+            "lookback_hours": 24,
+            "fresh_minutes": 15
+        },
+        # Bells and recurring notices, spoken at their time. Each item has a
+        # "text" and either a "cron" rule (minute hour day month weekday,
+        # local time) or a one-off "at" time, e.g.
+        #   {"name": "Morning bell", "cron": "55 7 * * mon-fri", "text": "..."}
+        #   {"name": "Fire drill", "at": "2026-11-03 10:30", "text": "...",
+        #    "language": "Spanish"}
+        # Items are prepared lead_seconds before they are due
+        "schedule": {
+            "enabled": True,
+            "lead_seconds": 30,
+            "items": []
+        },
+        # Several stations sharing the sources of one school. store is a
+        # SQLite file every station can open, e.g. on a network share;
+        # station must be unique (default: host name and process id)
+        "cluster": {
+            "enabled": False,
+            "store": "",
+            "station": "",
+            "lease_seconds": 15
+        },
+        # Fetched items are parsed and cleaned up on this many worker threads
+        # (0: on the polling loop)
+        "parsing": {
+            "workers": 2
+        },
+        # Crash-safe delivery: new items and polling state are stored in
+        # this SQLite file (relative to this file's directory) before they
+        # are shown or spoken, and items not acknowledged before a crash are
+        # delivered again on start-up
+        "outbox": {
+            "enabled": True,
+            "path": "outbox.db"
+        },
+        # Local HTTP/WebSocket API for other school systems and dashboards.
+        # With a token set, clients must send it as a Bearer token
+        "api": {
+            "enabled": False,
+            "host": "127.0.0.1",
+            "port": 8765,
+            "token": ""
+        },
+        # Daemon /metrics endpoint; port 0 disables it
+        "metrics": {
+            "host": "127.0.0.1",
+            "port": 9464
+        },
+        # Extra accounts watched alongside the ones above, e.g.
+        #   "email": [{"name": "principal", "username": "...", "password": "..."}]
+        #   "classroom": [{"name": "admin"}]
+        "accounts": {
+            "email": [],
+            "classroom": []
+        }
+    }
+    
+    # Bounds for numeric settings: (min, max)
+    LIMITS = {
+        ('polling', 'email_interval'): (5, 86400),
+        ('polling', 'classroom_interval'): (5, 86400),
+        ('polling', 'max_imap_connections'): (1, 64),
+        ('metrics', 'port'): (0, 65535),
+        ('api', 'port'): (1, 65535),
+        ('push', 'sweep_interval'): (60, 86400),
+        ('summary', 'target_words'): (10, 60),
+        ('summary', 'workers'): (1, 16),
+        ('parsing', 'workers'): (0, 32),
+        ('catch_up', 'lookback_hours'): (1, 168),
+        ('catch_up', 'fresh_minutes'): (0, 1440),
+        ('schedule', 'lead_seconds'): (0, 3600),
+        ('cluster', 'lease_seconds'): (3, 300),
+        ('diagnostics', 'stall_threshold_ms'): (50, 10000),
+        ('tracing', 'max_mb'): (1, 1024)
+    }
+    
+    # Allowed values of string settings
+    CHOICES = {
+        ('email', 'backend'): ('imap', 'gmail_api'),
+        ('summary', 'backend'): ('extractive', 'openai')
+    }
+    
+    # Keys of the old flat settings.json and where they live now
+    LEGACY_KEYS = {
+        'imap_host': ('email', 'imap_host'),
+        'username': ('email', 'username'),
+        'password': ('email', 'password'),
+        'email_poll_interval': ('polling', 'email_interval'),
+        'classroom_poll_interval': ('polling', 'classroom_interval')
+    }
+    
+    @classmethod
+    def defaults(cls):
+        """A fresh, independent copy of the default settings"""
+        return copy.deepcopy(cls.DEFAULT_SETTINGS)
+    
+    @classmethod
+    def load_settings(cls):
+        """Load settings from file or create default.
+        
+        Invalid values are reported and replaced by their defaults, so one bad
+        field never discards the rest of the file.
+        """
+        if not os.path.exists(cls.SETTINGS_FILE):
+            # Create default settings file
+            cls.save_settings(cls.defaults())
+            return cls.defaults()
+        
+        try:
+            with open(cls.SETTINGS_FILE, 'r') as f:
+                loaded = json.load(f)
+            if not isinstance(loaded, dict):
+                raise SettingsError("top level must be an object")
+        except (OSError, ValueError) as e:
+            print(f"Error loading settings: {e}")
+            return cls.defaults()
+        
+        # Merge with defaults to handle new keys
+        settings = cls.defaults()
+        cls._deep_update(settings, cls._migrate(loaded))
+        for path, message in cls.validate(settings):
+            fallback = "dropping it" if len(path) == 3 else "using the default"
+            print(f"Invalid setting {'.'.join(path)}: {message}, {fallback}")
+            if len(path) < 3:
+                cls._reset(settings, path)
+        for kind, accounts in settings['accounts'].items():
+            if isinstance(accounts, list):
+                settings['accounts'][kind] = [a for a in accounts if _valid_account(a)]
+        settings['schedule']['items'] = [
+            item for item in settings['schedule']['items'] if _valid_schedule(item)]
+        
+        try:
+            # A vault that could not be read is retried on every load
+            vault.unlock()
+            if vault.unseal(settings):
+                print(f"Moving plaintext secrets from {cls.SETTINGS_FILE} into the vault")
+                cls.save_settings(settings)
+        except VaultError as e:
+            print(f"Credential vault unavailable: {e}; secrets stay empty until it opens")
+        return settings
+    
+    @classmethod
+    def save_settings(cls, settings):
+        """Atomically replace the settings file; False if invalid or not written"""
+        errors = cls.validate(settings)
+        if errors:
+            for path, message in errors:
+                print(f"Not saving settings, {'.'.join(path)}: {message}")
+            return False
+        
+        directory = os.path.dirname(os.path.abspath(cls.SETTINGS_FILE))
+        try:
+            # Secrets go to the encrypted vault; the file keeps empty fields
+            on_disk = vault.seal(settings)
+            fd, tmp_path = tempfile.mkstemp(
+                prefix=".settings-", suffix=".tmp", dir=directory)
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(on_disk, f, indent=4)
+                    f.flush()
+                    os.fsync(f.fileno())
+                # A crash leaves either the old or the new file, never half of one
+                os.replace(tmp_path, cls.SETTINGS_FILE)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            return True
+        except Exception as e:
+            print(f"Error saving settings: {e}")
+            return False
+    
+    @classmethod
+    def validate(cls, settings):
+        """Schema problems as ``[(path, message)]``; empty when valid"""
+        errors = cls._type_errors(settings, cls.DEFAULT_SETTINGS, ())
+        for path, (low, high) in cls.LIMITS.items():
+            value = cls._get(settings, path)
+            if _is_number(value) and not low <= value <= high:
+                errors.append((path, f"must be between {low} and {high}"))
+        for path, allowed in cls.CHOICES.items():
+            if cls._get(settings, path) not in allowed:
+                errors.append((path, f"must be one of {', '.join(allowed)}"))
+        for kind in ('email', 'classroom'):
+            accounts = cls._get(settings, ('accounts', kind))
+            for i, account in enumerate(accounts if isinstance(accounts, list) else []):
+                if not _valid_account(account):
+                    errors.append((('accounts', kind, str(i)), "needs a 'name'"))
+        items = cls._get(settings, ('schedule', 'items'))
+        for i, item in enumerate(items if isinstance(items, list) else []):
+            if not _valid_schedule(item):
+                errors.append((('schedule', 'items', str(i)),
+                               "needs a 'text' and a 'cron' or 'at'"))
+        return errors
+    
+    @classmethod
+    def _type_errors(cls, value, default, path):
+        if isinstance(default, dict):
+            if not isinstance(value, dict):
+                return [(path, "must be an object")]
+            errors = []
+            for key, default_value in default.items():
+                if key in value:
+                    errors.extend(cls._type_errors(value[key], default_value, path + (key,)))
+            return errors
+        if isinstance(default, bool):
+            ok = isinstance(value, bool)
+        elif isinstance(default, int):
+            ok = _is_number(value) and float(value).is_integer()
+        else:
+            ok = isinstance(value, type(default))
+        return [] if ok else [(path, f"must be {type(default).__name__}")]
+    
+    @classmethod
+    def _migrate(cls, loaded):
+        """Move keys of the old flat schema into their sections"""
+        migrated = {k: v for k, v in loaded.items() if k not in cls.LEGACY_KEYS}
+        for key, (section, name) in cls.LEGACY_KEYS.items():
+            if key in loaded and not isinstance(loaded.get(section), dict):
+                migrated.setdefault(section, {})[name] = loaded[key]
+        return migrated
+    
+    @staticmethod
+    def _get(settings, path):
+        for key in path:
+            if not isinstance(settings, dict):
+                return None
+            settings = settings.get(key)
+        return settings
+    
+    @classmethod
+    def _reset(cls, settings, path):
+        default = cls._get(cls.DEFAULT_SETTINGS, path)
+        if path:
+            cls._get(settings, path[:-1])[path[-1]] = copy.deepcopy(default)
+    
+    @classmethod
+    def _deep_update(cls, base_dict, update_dict):
+        """Recursively update nested dictionaries"""
+        for key, value in update_dict.items():
+            if isinstance(value, dict) and isinstance(base_dict.get(key), dict):
+                cls._deep_update(base_dict[key], value)
+            else:
+                base_dict[key] = value
+
+
+class SettingsError(ValueError):
+    """Settings that do not match the schema"""
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _valid_account(account):
+    return isinstance(account, dict) and isinstance(account.get('name'), str)
+
+
+def _valid_schedule(item):
+    return (isinstance(item, dict) and isinstance(item.get('text'), str) and
+            any(isinstance(item.get(key), str) and item[key] for key in ('cron', 'at')))
+
+
+# ============== SETTINGS SERVICE ==============
+
+class SettingsService:
+    """The live settings of a running app.
+
+    ``save`` validates at once but writes after a short quiet period, so a
+    burst of changes costs one atomic write. A watcher thread reloads the
+    file when something else changes it. Subscribers get ``(new, old)``
+    after every accepted change. They are called on the thread that made the
+    change, i.e. the caller of ``save`` or the watcher thread.
+    """
+    
+    SAVE_DELAY = 0.5
+    
+    WATCH_INTERVAL = 1.0
+    
+    def __init__(self):
+        self.path = SettingsManager.SETTINGS_FILE
+        self.settings = SettingsManager.load_settings()
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._pending = None
+        self._save_timer = None
+        self._signature = self._file_signature()
+        self._stop = threading.Event()
+        self._watcher = None
+    
+    def subscribe(self, callback):
+        self._listeners.append(callback)
+    
+    def save(self, settings):
+        """Make ``settings`` current and schedule writing it to disk.
+        
+        Raises ``SettingsError`` listing every problem if it is invalid.
+        """
+        errors = SettingsManager.validate(settings)
+        if errors:
+            raise SettingsError("; ".join(f"{'.'.join(p)} {m}" for p, m in errors))
+        
+        new = copy.deepcopy(settings)
+        with self._lock:
+            old, self.settings = self.settings, new
+            self._pending = new
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+            self._save_timer = threading.Timer(self.SAVE_DELAY, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+        self._notify(new, old)
+    
+    def flush(self):
+        """Write any pending change now"""
+        with self._lock:
+            pending, self._pending = self._pending, None
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            if pending is not None and SettingsManager.save_settings(pending):
+                self._signature = self._file_signature()
+    
+    def watch(self):
+        """Start reloading the file when it changes on disk"""
+        if self._watcher is not None:
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(
+            target=self._watch, name="edupulse-settings", daemon=True)
+        self._watcher.start()
+    
+    def close(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+        self.flush()
+    
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+    
+    def _watch(self):
+        while not self._stop.wait(self.WATCH_INTERVAL):
+            signature = self._file_signature()
+            with self._lock:
+                if signature == self._signature or self._pending is not None:
+                    continue
+                self._signature = signature
+            self._reload()
+    
+    def _reload(self):
+        new = SettingsManager.load_settings()
+        with self._lock:
+            if new == self.settings:
+                return
+            old, self.settings = self.settings, new
+        print(f"Reloaded {self.path}")
+        self._notify(new, old)
+    
+    def _notify(self, new, old):
+        for callback in self._listeners:
+            try:
+                callback(new, old)
+            except Exception as e:
+                print(f"Error applying settings: {e}")
+
+
+# ============== ACCOUNTS ==============
+
+DEFAULT_ACCOUNT = "default"
+
+
+def email_accounts(settings):
+    """Every mailbox to watch: the Email Settings one first, then the extras.
+
+    Extra accounts inherit ``backend``, ``imap_host`` and ``label`` from the
+    main email settings. IMAP mailboxes need a username and password; Gmail
+    API ones sign in with OAuth instead.
+    """
+    main = settings['email']
+    inherited = {key: main[key] for key in ('backend', 'imap_host', 'label')}
+    accounts = []
+    for account in [{'name': DEFAULT_ACCOUNT, **main}] + settings['accounts']['email']:
+        account = {**inherited, **account}
+        if account['backend'] == 'gmail_api' or (
+                account.get('username') and account.get('password')):
+            accounts.append(account)
+    return accounts
+
+
+def classroom_accounts(settings):
+    """Every Google account whose Classroom courses are watched"""
+    return [{'name': DEFAULT_ACCOUNT}] + list(settings['accounts']['classroom'])
+
+
+def data_file(path):
+    """``path`` resolved against the directory of the settings file, unless absolute"""
+    directory = os.path.dirname(os.path.abspath(SettingsManager.SETTINGS_FILE))
+    return os.path.join(directory, path)
+
+
+def account_file(path, account_name):
+    """Per-account variant of a state or token file.
+
+    The default account keeps the original file name, so existing
+    ``last_uid.txt``/``token.pickle`` files carry over.
+    """
+    if account_name == DEFAULT_ACCOUNT:
+        return path
+    root, ext = os.path.splitext(path)
+    safe_name = re.sub(r'[^A-Za-z0-9_.-]', '_', account_name)
+    return f"{root}_{safe_name}{ext}"
@@ -0,0 +1,140 @@
+import asyncio
+
+from .httpclient import HTTPClient
+
+
+# ============== SOURCE INTERFACE ==============
+#
+# Every poller is a Source: ``fetch_delta`` gets what changed since the
+# stored watermark, ``normalize`` turns each raw item into an
+# ``Announcement`` (or None to drop it) and ``commit`` stores the new
+# watermark once every item has been emitted. ``parse`` normalizes a whole
+# delta, on a ParsePool when the core has one, see ``parsing``. The
+# ingestion core, the daemon, the GUI and the standalone gmail.py/gcr.py
+# monitors all drive sources through ``poll``, so fetching and parsing live
+# in one place.
+# After downtime the core polls with a CatchUp instead, which reads the
+# backlog through ``fetch_backlog``, see ``catchup``. In cluster mode the
+# leader hands ``state`` to whichever station takes over from it, and with
+# an outbox ``state`` is stored together with each poll's items.
+
+class Delta:
+    """Raw items fetched by one poll and the watermark to commit after them"""
+
+    __slots__ = ('items', 'watermark', 'detected', 'since', 'parsed')
+
+    def __init__(self, items, watermark, detected=None, since=None):
+        self.items = items
+        self.watermark = watermark
+        # When the items were noticed; start of the latency trace
+        self.detected = detected
+        # Start of the lookback window of a catch-up fetch
+        self.since = since
+        # ParsePool jobs already started on ``items`` while fetching, in order
+        self.parsed = None
+
+
+class Source:
+    """Base class of the ingestion sources.
+
+    Subclasses set ``kind`` and ``account`` and implement ``fetch_delta``,
+    ``normalize`` and ``commit``. A failed poll is reported and retried on
+    the next cycle with the watermark unchanged.
+    """
+
+    kind = "Source"
+
+    # Prefix of the error messages, e.g. "Gmail error (default): ..."
+    error_label = "Source"
+
+    account = None
+
+    # ParsePool shared by the sources of an IngestCore; None parses inline
+    parse_pool = None
+
+    async def fetch_delta(self):
+        """A Delta of new raw items, or None when there is nothing to do"""
+        raise NotImplementedError
+
+    async def fetch_backlog(self, since):
+        """Like ``fetch_delta``, but everything missed since epoch ``since``.
+
+        Also used on the very first poll, where ``fetch_delta`` only sets the
+        watermark. Sources without a bulk read just fetch their delta.
+        """
+        delta = await self.fetch_delta()
+        if delta is not None:
+            delta.since = since
+        return delta
+
+    def normalize(self, raw, delta):
+        """The ``Announcement`` for one raw item, or None to skip it"""
+        raise NotImplementedError
+
+    def parser(self):
+        """``(raw, delta) -> Announcement or None`` free of poller state, which
+        a ParsePool may run on several chunks of a delta at once.
+
+        None, the default, parses the whole delta with ``normalize`` in order,
+        as it must when normalizing keeps state.
+        """
+        return None
+
+    async def parse(self, delta):
+        """The announcements of ``delta``, in order"""
+        if self.parse_pool is not None:
+            return await self.parse_pool.parse(self, delta)
+        announcements = (self.normalize(raw, delta) for raw in delta.items)
+        return [a for a in announcements if a is not None]
+
+    def commit(self, watermark):
+        """Persist the watermark of a fully emitted delta"""
+        raise NotImplementedError
+
+    def state(self):
+        """JSON-able polling state another station can continue from, see ``cluster``"""
+        return None
+
+    def restore(self, state):
+        """Continue from another station's ``state``"""
+
+    async def poll(self, emit, catch_up=None):
+        """One cycle; False if it failed. ``catch_up`` reads the backlog instead"""
+        try:
+            if catch_up is not None:
+                await catch_up.run(self, emit)
+                return True
+            delta = await self.fetch_delta()
+            if delta is None:
+                return True
+            for item in await self.parse(delta):
+                emit(item)
+            self.commit(delta.watermark)
+            return True
+        except Exception as e:
+            self.on_error(e)
+            return False
+
+    def on_error(self, error):
+        print(f"{self.error_label} error ({self.account}): {error}")
+
+    async def close(self):
+        pass
+
+
+async def watch(make_sources, interval, emit):
+    """Poll ``make_sources(http)`` every ``interval`` seconds, forever.
+
+    For the standalone monitors, which need no GUI, daemon or speech.
+    """
+    http = HTTPClient()
+    sources = make_sources(http)
+    try:
+        while True:
+            for source in sources:
+                await source.poll(emit)
+            await asyncio.sleep(interval)
+    finally:
+        for source in sources:
+            await source.close()
+        await http.close()
@@ -0,0 +1,109 @@
+import builtins
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+# ============== STARTUP PROFILER ==============
+#
+# Records how long each import and each named start-up phase takes,
+# so cold start can be checked against a target. Enabled with the
+# EDUPULSE_STARTUP_REPORT=1 environment variable or the --startup-report flag;
+# when disabled every hook below is a no-op.
+
+REPORT_ENV = "EDUPULSE_STARTUP_REPORT"
+TARGET_ENV = "EDUPULSE_STARTUP_TARGET_MS"
+
+# Imports nested deeper than this are folded into their parent's time
+MAX_IMPORT_DEPTH = 2
+
+
+class StartupProfiler:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.enabled = False
+        self.target_ms = None
+        self.imports = []
+        self.phases = []
+        self._original_import = None
+        self._local = threading.local()
+
+    def enable(self, target_ms=None):
+        if self.enabled:
+            return
+        self.enabled = True
+        if target_ms is None and os.environ.get(TARGET_ENV):
+            target_ms = float(os.environ[TARGET_ENV])
+        self.target_ms = target_ms
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        original = self._original_import
+        # Already loaded (or relative) imports cost nothing worth reporting
+        if level or name in sys.modules:
+            return original(name, globals, locals, fromlist, level)
+
+        depth = getattr(self._local, 'depth', 0)
+        if depth >= MAX_IMPORT_DEPTH:
+            return original(name, globals, locals, fromlist, level)
+
+        # Reserve the slot now so the report lists imports in start order
+        entry = [depth, name, 0.0]
+        self.imports.append(entry)
+        self._local.depth = depth + 1
+        started = time.perf_counter()
+        try:
+            return original(name, globals, locals, fromlist, level)
+        finally:
+            self._local.depth = depth
+            entry[2] = time.perf_counter() - started
+
+    @contextmanager
+    def phase(self, name):
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - started))
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def finish(self, label="Startup"):
+        """Stop timing imports and print the report"""
+        if not self.enabled:
+            return
+        builtins.__import__ = self._original_import
+        self.enabled = False
+        print(self.report(label))
+
+    def report(self, label="Startup"):
+        total = self.elapsed_ms()
+        lines = [f"{label} time: {total:.0f} ms"]
+
+        lines.append("  Imports:")
+        for depth, name, seconds in self.imports:
+            if seconds >= 0.001:
+                indent = "  " * depth
+                lines.append(f"    {seconds * 1000:8.1f} ms  {indent}{name}")
+
+        lines.append("  Phases:")
+        for name, seconds in self.phases:
+            lines.append(f"    {seconds * 1000:8.1f} ms  {name}")
+
+        if self.target_ms is not None:
+            verdict = "OK" if total <= self.target_ms else "OVER TARGET"
+            lines.append(f"  Target: {self.target_ms:.0f} ms ({verdict})")
+        return "\n".join(lines)
+
+
+startup = StartupProfiler()
+
+if os.environ.get(REPORT_ENV):
+    startup.enable()
@@ -0,0 +1,220 @@
+import hashlib
+import re
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from .metrics import API_ERRORS, SUMMARY_CACHE, SUMMARY_DURATION
+
+
+# ============== SPOKEN SUMMARIES ==============
+#
+# Long announcements are cut at MAX_SPOKEN_WORDS by the agent. With
+# summaries on, each item's speech text is shortened to about
+# ``target_words`` on a small thread pool as soon as it is ingested, so a
+# backlog is summarized in parallel and the speaker only ever waits for the
+# item it is about to read. Results are cached by a hash of the text, the
+# backend and the target length. The default backend is a local extractive
+# summarizer; an OpenAI-compatible chat endpoint can be used instead.
+
+DEFAULT_TARGET_WORDS = 40
+
+DEFAULT_WORKERS = 4
+
+DEFAULT_API_URL = "https://api.openai.com/v1/chat/completions"
+DEFAULT_MODEL = "gpt-4o-mini"
+
+CACHE_SIZE = 1024
+
+# How long a speaker waits for a summary before reading the full text
+SUMMARY_WAIT = 10
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_WORD = re.compile(r"[^\W\d_]{3,}")
+
+# Greetings and sign-offs carry nothing worth speaking
+_COURTESY = re.compile(r"(?i)(?:dear|hi|hello|good (?:morning|afternoon|evening)|greetings|"
+                       r"(?:kind |best )?regards|thanks|thank you|sincerely)\b")
+
+STOPWORDS = frozenset("""
+    the and for are but not you all any can her was one our out day get has him
+    his how man new now old see two way who boy did its let put say she too use
+    that with have this will your from they been were said each which their what
+    there would about could other into more some than then them these those only
+    also just over such very when where while after before should please dear
+""".split())
+
+
+def extractive_summary(text, target_words):
+    """The highest-scoring sentences of ``text``, in order, within ``target_words``.
+
+    Sentences score by how many of the text's frequent words they hold. The
+    first sentence after any greeting, and sentences with numbers (dates,
+    times, rooms), get a bonus, since announcements put the essentials there.
+    """
+    if len(text.split()) <= target_words:
+        return text
+    sentences = [s for s in _SENTENCE_END.split(text) if s]
+    frequency = Counter(w for w in _WORD.findall(text.lower()) if w not in STOPWORDS)
+
+    scored = []
+    lead = True
+    for index, sentence in enumerate(sentences):
+        if _COURTESY.match(sentence):
+            scored.append((0, index))
+            continue
+        words = [w for w in _WORD.findall(sentence.lower()) if w not in STOPWORDS]
+        score = sum(frequency[w] for w in words) / (len(words) ** 0.5 if words else 1)
+        if lead:
+            score *= 1.5
+            lead = False
+        if any(c.isdigit() for c in sentence):
+            score *= 1.2
+        scored.append((score, index))
+
+    chosen = []
+    seen = set()
+    length = 0
+    for score, index in sorted(scored, reverse=True):
+        words = len(sentences[index].split())
+        if score and length + words <= target_words and sentences[index] not in seen:
+            chosen.append(index)
+            seen.add(sentences[index])
+            length += words
+    if not chosen:
+        # Even the best sentence is too long: read its start
+        best = max(scored)[1]
+        return " ".join(sentences[best].split()[:target_words])
+    return " ".join(sentences[i] for i in sorted(chosen))
+
+
+class ExtractiveBackend:
+    """Local sentence extraction; no network, no model"""
+
+    name = "extractive"
+
+    def summarize(self, text, target_words):
+        return extractive_summary(text, target_words)
+
+
+class OpenAIBackend:
+    """Any OpenAI-compatible chat completions endpoint, e.g. a local model server"""
+
+    name = "openai"
+
+    REQUEST_TIMEOUT = 30
+
+    PROMPT = ("Rewrite this school announcement as a spoken message of at most "
+              "{words} words. Keep dates, times, places and what listeners must do. "
+              "Reply with the message only.")
+
+    def __init__(self, api_key, model=DEFAULT_MODEL, api_url=DEFAULT_API_URL):
+        self.api_key = api_key
+        self.model = model
+        self.api_url = api_url
+
+    def summarize(self, text, target_words):
+        import requests
+
+        response = requests.post(
+            self.api_url,
+            headers={'Authorization': f"Bearer {self.api_key}"},
+            json={
+                'model': self.model,
+                'messages': [
+                    {'role': "system", 'content': self.PROMPT.format(words=target_words)},
+                    {'role': "user", 'content': text}
+                ],
+                'max_tokens': target_words * 3,
+                'temperature': 0
+            },
+            timeout=self.REQUEST_TIMEOUT)
+        response.raise_for_status()
+        return response.json()['choices'][0]['message']['content'].strip()
+
+
+class Summarizer:
+    """Summarizes announcements on a thread pool, with a content-hash cache.
+
+    ``submit`` sets ``announcement.brief`` straight away on a cache hit;
+    otherwise it is set from a worker thread, and the announcement's
+    ``brief_job`` future completes once it is in place. A failing backend
+    falls back to the extractive summary, which is not cached.
+    """
+
+    def __init__(self, backend=None, target_words=DEFAULT_TARGET_WORDS,
+                 workers=DEFAULT_WORKERS):
+        self.backend = backend or ExtractiveBackend()
+        self.target_words = target_words
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix="edupulse-summary")
+        self._cache = OrderedDict()
+        # hash -> announcements waiting for a summary being computed
+        self._waiting = {}
+        self._lock = threading.Lock()
+
+    def submit(self, announcement):
+        """Start summarizing ``announcement`` if it is longer than the target"""
+        text = announcement.speech
+        if len(text.split()) <= self.target_words:
+            return
+        key = hashlib.sha256(
+            f"{self.backend.name}\0{self.target_words}\0{text}".encode()).hexdigest()
+        with self._lock:
+            summary = self._cache.get(key)
+            if summary is not None:
+                self._cache.move_to_end(key)
+                SUMMARY_CACHE.inc(result="hit")
+                announcement.set_brief(summary)
+                if announcement.trace:
+                    announcement.trace.mark("summarized")
+                return
+            SUMMARY_CACHE.inc(result="miss")
+            waiting = self._waiting.get(key)
+            if waiting is not None:
+                # Same text already in progress, e.g. one mail to several accounts
+                waiting[0].append(announcement)
+                announcement.brief_job = waiting[1]
+                return
+            job = self._pool.submit(self._run, key, text)
+            self._waiting[key] = ([announcement], job)
+            announcement.brief_job = job
+
+    def _run(self, key, text):
+        cache = True
+        with SUMMARY_DURATION.time(backend=self.backend.name):
+            try:
+                summary = self.backend.summarize(text, self.target_words)
+            except Exception as e:
+                print(f"Summary backend {self.backend.name} failed, using extractive: {e}")
+                API_ERRORS.inc(source="Summary", code=type(e).__name__)
+                summary = extractive_summary(text, self.target_words)
+                cache = False
+        with self._lock:
+            announcements, _ = self._waiting.pop(key)
+            if cache:
+                self._cache[key] = summary
+                if len(self._cache) > CACHE_SIZE:
+                    self._cache.popitem(last=False)
+            for announcement in announcements:
+                announcement.set_brief(summary)
+                if announcement.trace:
+                    announcement.trace.mark("summarized")
+        return summary
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def summarizer_from_settings(settings):
+    """Summarizer for the ``summary`` settings, or None when they are off"""
+    summary = settings['summary']
+    if not summary['enabled']:
+        return None
+    backend = None
+    if summary['backend'] == "openai":
+        api_key = settings['agora']['openai_key']
+        if api_key or summary['api_url'] != DEFAULT_API_URL:
+            backend = OpenAIBackend(api_key, summary['model'], summary['api_url'])
+        else:
+            print("OpenAI summaries need agora.openai_key; using extractive summaries")
+    return Summarizer(backend, summary['target_words'], summary['workers'])
@@ -0,0 +1,175 @@
+import html
+import re
+
+
+# ============== TEXT NORMALIZATION ==============
+#
+# Turns a mail or Classroom body into a display text for the feed and a
+# shorter speech text for the agent. Every rule is one branch of a single
+# compiled alternation, so the body is scanned once and both outputs are
+# built in the same walk: markup, quoted replies, signatures and footers
+# never reach the card or the TTS. Links and addresses are left out of the
+# speech text, along with a label introducing a link ("Details: <url>"),
+# and common abbreviations are spelled out or, for filler, left out.
+
+# Abbreviations read out in full, or not at all; keys are lower-case
+ABBREVIATIONS = {
+    'e.g.': "for example",
+    'i.e.': "that is",
+    'etc.': "et cetera",
+    'approx.': "approximately",
+    'dept.': "department",
+    'dr.': "doctor",
+    'mr.': "mister",
+    'mrs.': "missus",
+    'prof.': "professor",
+    'rm.': "room",
+    'no.': "number",
+    'asap': "as soon as possible",
+    'fyi': "",  # filler
+    'pls': "please",
+    'w/': "with",
+    '&': "and"
+}
+
+# Lines that start a footer; everything from there on is dropped
+FOOTER_STARTS = (
+    r"Sent from my ",
+    r"Get Outlook for ",
+    r"You received this (?:message|email) because",
+    r"To unsubscribe",
+    r"This (?:e-?mail|message) (?:and any attachments )?(?:is|may be) confidential"
+)
+
+_BLOCK_TAGS = r"br|p|div|li|tr|h[1-6]|ul|ol|table|blockquote"
+
+# Rules as (guard, [(name, pattern)]) in priority order. The guard is a
+# cheap test of the current position, so most branches are skipped without
+# being tried; the HTML rules only apply to HTML bodies.
+_HTML_RULES = [
+    (r"(?=<)", [
+        ('drop_block', r"<(?P<element>script|style|head|title)\b[^>]*>[\s\S]*?</(?P=element)\s*>"),
+        ('drop_block2', r"<blockquote\b[^>]*>[\s\S]*?</blockquote\s*>"),
+        ('drop', r"<!--[\s\S]*?-->"),
+        # Gmail's signature/quote containers
+        ('cut_html', r"<div\b[^>]*\bclass=\"[^\"]*\bgmail_(?:signature|quote)[\s\S]*"),
+        ('block_tag', rf"(?:(?!<blockquote|<div[^>]*gmail_)</?(?:{_BLOCK_TAGS})\b[^>]*>\s*)+"),
+        ('tag', r"</?[a-zA-Z][^>]*>"),
+    ]),
+    (r"(?=&)", [
+        ('entity', r"&(?:#\d{1,7}|#[xX][0-9a-fA-F]{1,6}|[a-zA-Z]{2,8});"),
+    ]),
+    # A "--" signature separator between tags
+    (r"(?<=>)", [
+        ('cut_html2', r"[ \t]*-- ?(?=[ \t]*<)[\s\S]*"),
+    ]),
+]
+_TEXT_RULES = [
+    (r"(?m:^)", [
+        ('quote', r"[ \t]*>.*"),
+    ]),
+]
+_COMMON_RULES = [
+    (r"(?m:^)", [
+        # "On Mon, 1 Jan 2024, Jane <jane@x> wrote:" and the quoted mail below it
+        ('cut', r"[ \t]*On\b[^\n]{0,300}?\bwrote:[\s\S]*"),
+        ('cut2', r"-- ?(?m:$)[\s\S]*"),
+        ('cut3', r"[ \t]*(?:{})[\s\S]*".format("|".join(FOOTER_STARTS))),
+    ]),
+    (r"\b(?=\w)", [
+        ('url', r"(?:https?://|www\.)[^\s<>\"')\]]*[^\s<>\"')\].,;:!?]"),
+        ('email', r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+\b"),
+        ('abbrev', r"(?i:e\.g\.|i\.e\.|etc\.|approx\.|dept\.|dr\.|mrs?\.|prof\.|rm\.|"
+                   r"no\.(?=\s*\d)|asap\b|fyi\b|pls\b|w/(?=\s))"),
+    ]),
+    # Any whitespace but a lone space, which is already what both outputs want
+    (r"(?=[^\S ]| \s|&)", [
+        ('amp', r"(?<=\s)&(?=\s)"),
+        ('para', r"[ \t]*\n(?:[ \t]*\n)+[ \t]*"),
+        ('newline', r"[ \t]*\n[ \t]*"),
+        ('space', r"[ \t\r\f\v\u00a0]{2,}|[\t\r\f\v\u00a0]"),
+    ]),
+]
+
+
+def _compile(rules):
+    return re.compile("|".join(
+        guard + "(?:" + "|".join(f"(?P<{name}>{pattern})" for name, pattern in group) + ")"
+        for guard, group in rules))
+
+
+_HTML_TOKENS = _compile(_HTML_RULES + _COMMON_RULES)
+_TEXT_TOKENS = _compile(_TEXT_RULES + _COMMON_RULES)
+
+# Entities decoded to whitespace still need collapsing afterwards
+_TIDY = re.compile(r"[ \t]*\n[ \t]*(?:\n[ \t]*)+|[ \t]*\n[ \t]*| {2,}")
+
+# Space left before punctuation, empty brackets, or punctuation stranded at
+# the start of a sentence, where a URL, address or filler was dropped
+_SPEECH_TIDY = re.compile(r"(?<![.!?]) (?=[.,;:!?])| ?\(\)|(?:^|(?<=[.!?] ))[.,;:]+ ?")
+
+# A short label that a link completes, e.g. "Details: " or ". More info: "
+_LINK_LABEL = re.compile(r"(?:^|(?<=[.!?\n])\s*|\s+)\b[A-Z][\w ]{0,25}:\s*$")
+
+_URL_HOST = re.compile(r"(?:https?://)?(?:www\.)?([^/?#]*)")
+
+
+def _url_label(url):
+    """Short display form of a URL: its host"""
+    host = _URL_HOST.match(url).group(1)
+    return f"[{host}]" if host else ""
+
+
+def normalize(text, markup=False):
+    """``(display_text, speech_text)`` for a body; ``markup`` for HTML bodies"""
+    tokens = _HTML_TOKENS if markup else _TEXT_TOKENS
+    display = []
+    speech = []
+    pos = 0
+    for match in tokens.finditer(text):
+        start = match.start()
+        if start > pos:
+            chunk = text[pos:start]
+            display.append(chunk)
+            speech.append(chunk)
+        pos = match.end()
+
+        kind = match.lastgroup
+        if kind in ('space', 'newline', 'para'):
+            display.append("\n\n" if kind == 'para' else "\n" if kind == 'newline' else " ")
+            speech.append(" ")
+        elif kind == 'block_tag':
+            # A run of block tags separates paragraphs, as "</p><p>" does
+            display.append("\n\n" if match.group().count("<") > 1 else "\n")
+            speech.append(" ")
+        elif kind == 'entity':
+            char = html.unescape(match.group())
+            display.append(char)
+            speech.append("and" if char == "&" else char)
+        elif kind == 'url':
+            display.append(_url_label(match.group()))
+            if speech:
+                speech[-1] = _LINK_LABEL.sub("", speech[-1])
+        elif kind == 'email':
+            display.append(match.group())
+            speech.append("")
+        elif kind in ('abbrev', 'amp'):
+            display.append(match.group())
+            speech.append(ABBREVIATIONS[match.group().lower()])
+        elif kind.startswith('cut'):
+            break
+        # drop, drop_block, tag, quote: nothing in either output
+    else:
+        display.append(text[pos:])
+        speech.append(text[pos:])
+
+    return _tidy("".join(display)), _SPEECH_TIDY.sub("", " ".join("".join(speech).split()))
+
+
+def _tidy(text):
+    def collapse(match):
+        value = match.group()
+        if "\n" not in value:
+            return " "
+        return "\n\n" if value.count("\n") > 1 else "\n"
+    return _TIDY.sub(collapse, text).strip()
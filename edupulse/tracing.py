@@ -0,0 +1,190 @@
+import collections
+import json
+import os
+import threading
+import time
+import uuid
+
+
+# ============== LATENCY TRACING ==============
+#
+# Every ingested item carries a Trace that records wall-clock times for each
+# stage between the source creating it and the PA starting to speak it.
+# Snapshots are appended to traces.jsonl (a trace may be written more than
+# once as it progresses; the latest snapshot wins) and summarised as
+# p50/p95/p99 latencies per source with ``python -m edupulse traces``.
+# Recording only queues a copy of the marks; a writer thread appends the
+# queue once a second, so the GUI thread and the loop never wait on the
+# file. Past ``tracing.max_mb`` the file moves to traces.jsonl.1, replacing
+# the previous one, so at most twice that is kept.
+
+STAGES = (
+    "source",       # mail Date header / Classroom updateTime / schedule or API post time
+    "detected",     # poll response that revealed the item
+    "parsed",       # Announcement built from the raw item
+    "replicated",   # read from the cluster store by another station
+    "queued",       # handed to the GUI buffer or the speak queue
+    "summarized",   # spoken summary ready (summaries on, long items only)
+    "rendered",     # card added to the feed
+    "speak_sent",   # speak request sent to Agora
+    "speak_acked",  # Agora answered the speak request
+)
+
+TRACE_FILE = "traces.jsonl"
+
+DEFAULT_MAX_MB = 10
+
+# How often queued snapshots are written
+FLUSH_INTERVAL = 1.0
+
+PERCENTILES = (50, 95, 99)
+
+
+class Trace:
+    __slots__ = ('trace_id', 'source', 'marks')
+
+    def __init__(self, source, trace_id=None, marks=None):
+        self.trace_id = trace_id or uuid.uuid4().hex[:12]
+        self.source = source
+        self.marks = marks or {}
+
+    def mark(self, stage, ts=None):
+        self.marks[stage] = time.time() if ts is None else ts
+        return self
+
+    def to_dict(self):
+        return {'id': self.trace_id, 'source': self.source, 'marks': self.marks}
+
+
+class TraceRecorder:
+    """Queues trace snapshots and appends them to a JSONL file in batches.
+
+    ``record`` is safe and cheap to call from any thread; the writer thread
+    starts with the first snapshot.
+    """
+
+    def __init__(self, path=TRACE_FILE, max_mb=DEFAULT_MAX_MB):
+        self.path = path
+        self.max_bytes = max_mb * 1024 * 1024
+        self.enabled = True
+        self._queue = collections.deque()
+        self._lock = threading.Lock()
+        self._writer = None
+
+    def configure(self, settings):
+        """Apply the ``tracing`` settings section"""
+        self.enabled = settings['enabled']
+        self.max_bytes = settings['max_mb'] * 1024 * 1024
+
+    def record(self, trace):
+        if not self.enabled or trace is None:
+            return
+        # Copied now: later stages keep marking the same Trace
+        self._queue.append(Trace(trace.source, trace.trace_id, dict(trace.marks)))
+        if self._writer is None:
+            self._start_writer()
+
+    def _start_writer(self):
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._write_loop, name="edupulse-traces", daemon=True)
+                self._writer.start()
+
+    def _write_loop(self):
+        while True:
+            time.sleep(FLUSH_INTERVAL)
+            self.flush()
+
+    def flush(self):
+        """Write the queued snapshots now"""
+        with self._lock:
+            lines = []
+            while self._queue:
+                lines.append(json.dumps(self._queue.popleft().to_dict()))
+            if not lines:
+                return
+            data = "\n".join(lines) + "\n"
+            try:
+                self._rotate(len(data))
+                with open(self.path, 'a') as f:
+                    f.write(data)
+            except OSError as e:
+                print(f"Trace write error: {e}")
+
+    def _rotate(self, incoming):
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return
+        if size and size + incoming > self.max_bytes:
+            os.replace(self.path, self.path + ".1")
+
+    def close(self):
+        """Write what is still queued; call on the way out"""
+        self.flush()
+
+    def load(self):
+        """Latest snapshot of every trace in the file and its rotated predecessor"""
+        traces = {}
+        for path in (self.path + ".1", self.path):
+            try:
+                with open(path, 'r') as f:
+                    for line in f:
+                        try:
+                            data = json.loads(line)
+                        except ValueError:
+                            continue  # torn write from a crash
+                        traces[data['id']] = Trace(data['source'], data['id'], data['marks'])
+            except FileNotFoundError:
+                pass
+        return list(traces.values())
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-pct * len(sorted_values) // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def latency_summary(traces):
+    """``{source: {stage: {'count': n, 'p50': s, ...}}}``, seconds from source time"""
+    samples = {}
+    for trace in traces:
+        origin = trace.marks.get("source")
+        if origin is None:
+            continue
+        per_stage = samples.setdefault(trace.source, {})
+        for stage in STAGES[1:]:
+            if stage in trace.marks:
+                per_stage.setdefault(stage, []).append(trace.marks[stage] - origin)
+
+    summary = {}
+    for source, per_stage in samples.items():
+        summary[source] = {}
+        for stage in STAGES[1:]:
+            values = sorted(per_stage.get(stage, []))
+            if not values:
+                continue
+            stats = {'count': len(values)}
+            for pct in PERCENTILES:
+                stats[f"p{pct}"] = percentile(values, pct)
+            summary[source][stage] = stats
+    return summary
+
+
+def format_summary(summary):
+    lines = []
+    for source in sorted(summary):
+        lines.append(f"{source}: latency since source timestamp (seconds)")
+        lines.append(f"  {'stage':<12} {'count':>6} " +
+                     " ".join(f"{'p' + str(p):>9}" for p in PERCENTILES))
+        for stage, stats in summary[source].items():
+            values = " ".join(f"{stats[f'p{p}']:9.3f}" for p in PERCENTILES)
+            lines.append(f"  {stage:<12} {stats['count']:>6} {values}")
+    return "\n".join(lines) if lines else "No traces recorded yet"
+
+
+tracer = TraceRecorder()
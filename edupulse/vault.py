@@ -0,0 +1,247 @@
+import importlib.util
+import json
+import os
+import tempfile
+import threading
+
+# Both optional: without cryptography secrets stay in settings.json as before;
+# without keyring the vault key lives in a local key file (or comes from the
+# EDUPULSE_MASTER_KEY passphrase).
+HAVE_CRYPTOGRAPHY = importlib.util.find_spec("cryptography") is not None
+HAVE_KEYRING = importlib.util.find_spec("keyring") is not None
+
+
+# ============== CREDENTIAL VAULT ==============
+#
+# Passwords, API keys and OAuth tokens live in one Fernet-encrypted file.
+# It is decrypted once, on first use, and served from memory afterwards.
+# settings.json only ever holds empty placeholders for the secret fields.
+# Relative vault and key file names are taken from the directory of
+# settings.json when the vault is opened, like every other data file. A
+# vault that cannot be decrypted is reported once and never overwritten;
+# until ``unlock`` succeeds it acts empty, and settings without secrets can
+# still be saved.
+
+VAULT_FILE = "vault.bin"
+KEY_FILE = "vault.key"
+
+MASTER_KEY_ENV = "EDUPULSE_MASTER_KEY"
+KEYRING_SERVICE = "edupulse"
+
+_MAGIC = b"EPV1"
+_SALT_BYTES = 16
+_KDF_ITERATIONS = 390000
+
+# Secret fields of the settings, as paths
+SECRET_FIELDS = [
+    ('email', 'password'),
+    ('agora', 'token'),
+    ('agora', 'openai_key'),
+    ('agora', 'authorization'),
+    ('api', 'token')
+]
+
+
+class VaultError(Exception):
+    """The vault exists but cannot be decrypted"""
+
+
+class CredentialVault:
+    """Encrypted key/value store for secrets, cached in memory.
+
+    ``seal`` moves the secret fields out of a settings dict into the vault and
+    ``unseal`` puts them back, so the rest of the app keeps reading secrets
+    from settings as before.
+    """
+
+    def __init__(self, path=VAULT_FILE, key_file=KEY_FILE):
+        # Resolved against the settings directory by ``_open``
+        self._names = (path, key_file)
+        self.path = path
+        self.key_file = key_file
+        self.enabled = HAVE_CRYPTOGRAPHY
+        self._secrets = None
+        self._salt = None
+        self._fernet = None
+        self._locked = False
+        self._lock = threading.RLock()
+
+    # ---------- key/value API ----------
+
+    def get(self, name, default=None):
+        with self._lock:
+            self._open()
+            return self._secrets.get(name, default)
+
+    def set(self, name, value):
+        """Store (or with an empty value, forget) one secret and persist"""
+        with self._lock:
+            self._open()
+            if self._secrets.get(name) == (value or None):
+                return
+            if self._locked:
+                raise VaultError(f"{self.path} is locked; {name} was not saved")
+            if value:
+                self._secrets[name] = value
+            else:
+                self._secrets.pop(name, None)
+            self._write()
+
+    # ---------- settings integration ----------
+
+    def seal(self, settings):
+        """Copy of ``settings`` without secrets; the secrets go to the vault"""
+        if not self.enabled:
+            return settings
+        sealed = json.loads(json.dumps(settings))
+        with self._lock:
+            self._open()
+            changed = False
+            for name, container, key in self._fields(sealed):
+                value = container.get(key) or None
+                if self._locked and value:
+                    # Saving would lose it: the vault cannot be written
+                    raise VaultError(f"{self.path} is locked; {name} was not saved")
+                if self._secrets.get(name) != value:
+                    changed = True
+                    if value:
+                        self._secrets[name] = value
+                    else:
+                        self._secrets.pop(name, None)
+                container[key] = ""
+            if changed and not self._locked:
+                self._write()
+        return sealed
+
+    def unseal(self, settings):
+        """Fill the secret fields of ``settings`` in place.
+
+        Returns True if the file still held plaintext secrets, which the
+        caller should then save again, sealed.
+        """
+        if not self.enabled:
+            return False
+        plaintext = False
+        with self._lock:
+            self._open()
+            for name, container, key in self._fields(settings):
+                if container.get(key):
+                    plaintext = True
+                else:
+                    container[key] = self._secrets.get(name, "")
+        return plaintext
+
+    def _fields(self, settings):
+        for section, key in SECRET_FIELDS:
+            yield f"{section}.{key}", settings[section], key
+        for account in settings['accounts']['email']:
+            yield f"accounts.email.{account['name']}.password", account, 'password'
+
+    @property
+    def locked(self):
+        return self._locked
+
+    def unlock(self):
+        """Open a vault that could not be read before, e.g. once the master key
+        is available; raises VaultError if it still cannot be"""
+        with self._lock:
+            if not self._locked:
+                return
+            self._secrets = None
+            self._locked = False
+            self._open()
+
+    # ---------- storage ----------
+
+    def _open(self):
+        """Decrypt the vault file once; later calls use the cached secrets"""
+        if self._secrets is not None:
+            return
+        from cryptography.fernet import Fernet, InvalidToken
+
+        # Imported here since the settings module imports this one
+        from .settings import data_file
+
+        self.path, self.key_file = (data_file(name) for name in self._names)
+        self._secrets = {}
+        if not os.path.exists(self.path):
+            self._salt = os.urandom(_SALT_BYTES)
+            self._fernet = Fernet(self._master_key())
+            return
+
+        with open(self.path, 'rb') as f:
+            blob = f.read()
+        if not blob.startswith(_MAGIC):
+            self._locked = True
+            raise VaultError(f"{self.path} is not an EduPulse vault")
+        self._salt = blob[len(_MAGIC):len(_MAGIC) + _SALT_BYTES]
+        self._fernet = Fernet(self._master_key())
+        try:
+            self._secrets = json.loads(self._fernet.decrypt(blob[len(_MAGIC) + _SALT_BYTES:]))
+        except InvalidToken:
+            # Never overwrite a vault we could not read
+            self._locked = True
+            raise VaultError(f"Wrong master key for {self.path}")
+
+    def _write(self):
+        if self._locked:
+            raise VaultError(f"{self.path} is locked; secrets were not saved")
+        token = self._fernet.encrypt(json.dumps(self._secrets).encode())
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".vault-", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(_MAGIC + self._salt + token)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _master_key(self):
+        """Fernet key from the passphrase, the OS keyring or the key file"""
+        passphrase = os.environ.get(MASTER_KEY_ENV)
+        if passphrase:
+            return _derive_key(passphrase, self._salt)
+
+        if HAVE_KEYRING:
+            import keyring
+
+            entry = os.path.abspath(self.path)
+            key = keyring.get_password(KEYRING_SERVICE, entry)
+            if key is None:
+                key = _new_key()
+                keyring.set_password(KEYRING_SERVICE, entry, key)
+            return key.encode()
+
+        if os.path.exists(self.key_file):
+            with open(self.key_file, 'rb') as f:
+                return f.read().strip()
+        print(f"Storing the vault key in {self.key_file}; install keyring or set "
+              f"{MASTER_KEY_ENV} to keep it off disk")
+        key = _new_key().encode()
+        fd = os.open(self.key_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(key)
+        return key
+
+
+def _new_key():
+    from cryptography.fernet import Fernet
+
+    return Fernet.generate_key().decode()
+
+
+def _derive_key(passphrase, salt):
+    import base64
+
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+
+    kdf = PBKDF2HMAC(algorithm=hashes.SHA256(), length=32, salt=salt,
+                     iterations=_KDF_ITERATIONS)
+    return base64.urlsafe_b64encode(kdf.derive(passphrase.encode()))
+
+
+vault = CredentialVault()
@@ -0,0 +1,105 @@
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+from .metrics import registry
+
+
+# ============== EVENT-LOOP WATCHDOG ==============
+#
+# The GUI thread calls ``heartbeat`` from a short repeating timer. A monitor
+# thread notices when the beats stop for longer than the threshold and grabs
+# the GUI thread's Python stack at that moment, i.e. while it is still stuck
+# in the slow call. When the beats resume the stall is logged and its length
+# is added to the stall histogram.
+
+HEARTBEAT_MS = 50
+
+DEFAULT_THRESHOLD_MS = 200
+
+# Stalls kept for the diagnostics page
+RECENT_STALLS = 20
+
+STALL_DURATION = registry.histogram(
+    "edupulse_gui_stall_seconds", "GUI event-loop stalls over the watchdog threshold",
+    buckets=(0.1, 0.25, 0.5, 1, 2, 5, 10, 30))
+
+
+class Stall:
+    __slots__ = ('started', 'duration', 'stack')
+
+    def __init__(self, started, duration, stack):
+        self.started = started
+        self.duration = duration
+        self.stack = stack
+
+
+class StallWatchdog:
+    """Detects stalls of the thread that calls ``heartbeat``"""
+
+    def __init__(self, threshold_ms=DEFAULT_THRESHOLD_MS, heartbeat_ms=HEARTBEAT_MS):
+        self.threshold = threshold_ms / 1000
+        self.heartbeat_interval = heartbeat_ms / 1000
+        self.recent = deque(maxlen=RECENT_STALLS)
+        self._watched_ident = None
+        self._last_beat = None
+        self._stack = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self, watched_ident=None):
+        """Watch ``watched_ident`` (default: the calling thread)"""
+        if self._thread is not None:
+            return
+        self._watched_ident = watched_ident or threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._monitor, name="edupulse-watchdog", daemon=True)
+        self._thread.start()
+        print(f"GUI stall watchdog on (threshold {self.threshold * 1000:.0f} ms)")
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        print("GUI stall watchdog off")
+
+    def heartbeat(self):
+        now = time.monotonic()
+        with self._lock:
+            last_beat, stack = self._last_beat, self._stack
+            self._last_beat = now
+            self._stack = None
+        if stack is None:
+            return
+
+        # The gap includes one regular heartbeat interval
+        duration = max(0.0, now - last_beat - self.heartbeat_interval)
+        STALL_DURATION.observe(duration)
+        self.recent.append(Stall(time.time() - duration, duration, stack))
+        print(f"GUI stalled for {duration * 1000:.0f} ms in:\n{stack}")
+
+    def _monitor(self):
+        while not self._stop.wait(self.threshold / 4):
+            with self._lock:
+                last_beat = self._last_beat
+                stalled = (self._stack is None and
+                           time.monotonic() - last_beat > self.threshold)
+            if not stalled:
+                continue
+            frame = sys._current_frames().get(self._watched_ident)
+            stack = "".join(traceback.format_stack(frame)) if frame else "(stack unavailable)\n"
+            with self._lock:
+                # Drop the capture if the thread recovered while we took it
+                if self._last_beat == last_beat:
+                    self._stack = stack
@@ -1,700 +1,129 @@
+from edupulse.startup import startup
+
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QLabel, QPushButton, QComboBox, QLineEdit, QFormLayout, QGroupBox,
     QScrollArea, QStackedWidget, QFrame, QCheckBox, QSpinBox,
-    QListWidget, QListWidgetItem, QSpacerItem, QSizePolicy, QMessageBox
+    QListWidget, QListWidgetItem, QSpacerItem, QSizePolicy, QMessageBox,
+    QPlainTextEdit
 )
-from PyQt6.QtCore import Qt, QSize, QThread, pyqtSignal, QTimer
+from PyQt6.QtCore import Qt, QSize, QObject, pyqtSignal, QTimer
+import asyncio
+import copy
 import sys
 import time
-import requests
-import json
-from datetime import datetime
-from agora2 import AgoraSeleniumVoiceClient, start_ai_agent
-
-# Gmail imports
-import imaplib
-import email
-from email.header import decode_header
-import os
-
-# Google Classroom imports
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
-import pickle
-
-
-# ============== SETTINGS MANAGER ==============
-
-class SettingsManager:
-    """Manages loading and saving settings to settings.json"""
-    
-    SETTINGS_FILE = "settings.json"
-    
-    DEFAULT_SETTINGS = {
-        "email": {
-            "imap_host": "imap.gmail.com",
-            "username": "",
-            "password": ""
-        },
-        "agora": {
-            "app_id": "",
-            "channel": "pa_channel",
-            "token": "",
-            "openai_key": "",
-            "authorization": "",
-            "headless": True
-        },
-        "polling": {
-            "email_interval": 60,
-            "classroom_interval": 60
-        },
-        "audio": {
-            "default_language": "English",
-            "auto_broadcast": False
-        }
-    }
-    
-    @classmethod
-    def load_settings(cls):
-        """Load settings from file or create default"""
-        if os.path.exists(cls.SETTINGS_FILE):
-            try:
-                with open(cls.SETTINGS_FILE, 'r') as f:
-                    loaded = json.load(f)
-                    # Merge with defaults to handle new keys
-                    settings = cls.DEFAULT_SETTINGS.copy()
-                    cls._deep_update(settings, loaded)
-                    return settings
-            except Exception as e:
-                print(f"Error loading settings: {e}")
-                return cls.DEFAULT_SETTINGS.copy()
-        else:
-            # Create default settings file
-            cls.save_settings(cls.DEFAULT_SETTINGS)
-            return cls.DEFAULT_SETTINGS.copy()
-    
-    @classmethod
-    def save_settings(cls, settings):
-        """Save settings to file"""
-        try:
-            with open(cls.SETTINGS_FILE, 'w') as f:
-                json.dump(settings, f, indent=4)
-            return True
-        except Exception as e:
-            print(f"Error saving settings: {e}")
-            return False
-    
-    @classmethod
-    def _deep_update(cls, base_dict, update_dict):
-        """Recursively update nested dictionaries"""
-        for key, value in update_dict.items():
-            if isinstance(value, dict) and key in base_dict:
-                cls._deep_update(base_dict[key], value)
-            else:
-                base_dict[key] = value
-
-
-# ============== GMAIL POLLER ==============
-
-class GmailPollerThread(QThread):
-    new_email = pyqtSignal(dict)
-    
-    def __init__(self, settings, poll_interval=60):
-        super().__init__()
-        self.imap_host = settings['email']['imap_host']
-        self.username = settings['email']['username']
-        self.password = settings['email']['password']
-        self.poll_interval = poll_interval
-        self.running = True
-        self.last_uid = self.load_last_uid()
-        
-    def load_last_uid(self):
-        state_file = "last_uid.txt"
-        if not os.path.exists(state_file):
-            return None
-        with open(state_file, "r") as f:
-            value = f.read().strip()
-            return int(value) if value else None
-    
-    def save_last_uid(self, uid):
-        with open("last_uid.txt", "w") as f:
-            f.write(str(uid))
-    
-    def parse_email(self, msg):
-        subject, encoding = decode_header(msg["Subject"])[0]
-        if isinstance(subject, bytes):
-            subject = subject.decode(encoding or "utf-8", errors="ignore")
-
-        from_, enc = decode_header(msg.get("From"))[0]
-        if isinstance(from_, bytes):
-            from_ = from_.decode(enc or "utf-8", errors="ignore")
-
-        body = ""
-        if msg.is_multipart():
-            for part in msg.walk():
-                content_type = part.get_content_type()
-                disposition = str(part.get("Content-Disposition"))
-                if content_type == "text/plain" and "attachment" not in disposition:
-                    body = part.get_payload(decode=True).decode(errors="ignore")
-                    break
-                elif content_type == "text/html" and "attachment" not in disposition:
-                    body = part.get_payload(decode=True).decode(errors="ignore")
-        else:
-            body = msg.get_payload(decode=True).decode(errors="ignore")
-
-        return subject, from_, body
-    
-    def check_new_mail(self):
-        if not self.username or not self.password:
-            print("Gmail credentials not configured")
-            return
-            
-        try:
-            M = imaplib.IMAP4_SSL(self.imap_host)
-            M.login(self.username, self.password)
-            M.select("INBOX")
-
-            if self.last_uid is None:
-                typ, data = M.uid("search", None, "ALL")
-                if typ == "OK" and data[0]:
-                    uids = data[0].split()
-                    max_uid = int(uids[-1])
-                    self.save_last_uid(max_uid)
-                    self.last_uid = max_uid
-                M.close()
-                M.logout()
-                return
-
-            search_criteria = f"(UID {self.last_uid + 1}:*)"
-            typ, data = M.uid("search", None, search_criteria)
-
-            if typ != "OK" or not data[0]:
-                M.close()
-                M.logout()
-                return
-
-            uids = data[0].split()
-            max_uid_seen = self.last_uid
-
-            for uid in uids:
-                uid_int = int(uid)
-                if uid_int <= self.last_uid:
-                    continue
-
-                typ, msg_data = M.uid("fetch", uid, "(RFC822)")
-                if typ != "OK":
-                    continue
-
-                raw_email = msg_data[0][1]
-                msg = email.message_from_bytes(raw_email)
-                subject, from_, body = self.parse_email(msg)
-
-                self.new_email.emit({
-                    'subject': subject,
-                    'from': from_,
-                    'body': body,
-                    'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                })
-
-                if uid_int > max_uid_seen:
-                    max_uid_seen = uid_int
-
-            self.save_last_uid(max_uid_seen)
-            self.last_uid = max_uid_seen
-
-            M.close()
-            M.logout()
-            
-        except Exception as e:
-            print(f"Gmail error: {e}")
-    
-    def run(self):
-        while self.running:
-            self.check_new_mail()
-            time.sleep(self.poll_interval)
-    
-    def stop(self):
-        self.running = False
 
+from edupulse.agora import AgoraAgent, AgoraError, agora_config
+from edupulse.api import CLOSE_TIMEOUT as API_CLOSE_TIMEOUT, api_from_settings
+from edupulse.cluster import SPEAKER
+from edupulse.coalesce import BURST_THRESHOLD, AnnouncementBuffer, summarize
+from edupulse.ingest import IngestCore
+from edupulse.metrics import registry
+from edupulse.scheduler import Scheduler
+from edupulse.settings import SettingsError, SettingsManager, SettingsService
+from edupulse.summarizer import SUMMARY_WAIT, summarizer_from_settings
+from edupulse.tracing import tracer
+from edupulse.watchdog import HEARTBEAT_MS, StallWatchdog
 
-# ============== GOOGLE CLASSROOM POLLER ==============
 
-class ClassroomPollerThread(QThread):
-    new_announcement = pyqtSignal(dict)
-    
-    def __init__(self, poll_interval=60):
-        super().__init__()
-        self.poll_interval = poll_interval
-        self.running = True
-        self.scopes = [
-            'https://www.googleapis.com/auth/classroom.courses.readonly',
-            'https://www.googleapis.com/auth/classroom.announcements.readonly'
-        ]
-        self.token_file = 'token.pickle'
-        self.credentials_file = 'credentials.json'
-        self.timestamp_file = 'last_timestamp.txt'
-        self.service = None
-        self.last_ts = self.load_last_timestamp()
-        
-    def load_last_timestamp(self):
-        if not os.path.exists(self.timestamp_file):
-            return None
-        try:
-            with open(self.timestamp_file, 'r') as f:
-                return float(f.read().strip())
-        except:
-            return None
-    
-    def save_last_timestamp(self, ts):
-        with open(self.timestamp_file, 'w') as f:
-            f.write(str(ts))
-    
-    def iso_to_timestamp(self, iso_string):
-        try:
-            dt = datetime.fromisoformat(iso_string.replace("Z", "+00:00"))
-            return dt.timestamp()
-        except:
-            return 0
-    
-    def authenticate(self):
-        creds = None
-        if os.path.exists(self.token_file):
-            with open(self.token_file, 'rb') as token:
-                creds = pickle.load(token)
-
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                creds.refresh(Request())
-            else:
-                flow = InstalledAppFlow.from_client_secrets_file(
-                    self.credentials_file, self.scopes)
-                creds = flow.run_local_server(port=0)
-            with open(self.token_file, 'wb') as token:
-                pickle.dump(creds, token)
+# ============== INGESTION BRIDGE ==============
 
-        return build('classroom', 'v1', credentials=creds)
-    
-    def check_announcements(self, service, course_id, course_name, last_ts):
-        try:
-            results = service.courses().announcements().list(
-                courseId=course_id,
-                orderBy='updateTime desc',
-                pageSize=10
-            ).execute()
-
-            announcements = results.get('announcements', [])
-            latest_ts = last_ts if last_ts else 0
-
-            for ann in announcements:
-                ts = self.iso_to_timestamp(ann.get("updateTime", ""))
-                latest_ts = max(latest_ts, ts)
-
-                if last_ts and ts > last_ts:
-                    self.new_announcement.emit({
-                        'course_name': course_name,
-                        'text': ann.get('text', ''),
-                        'creation_time': ann.get('creationTime', '')
-                    })
-
-            return latest_ts
-
-        except HttpError as e:
-            print(f"Classroom error: {e}")
-            return last_ts
-    
-    def check_classroom_updates(self):
-        try:
-            if not self.service:
-                self.service = self.authenticate()
-            
-            first_run = self.last_ts is None
-            
-            results = self.service.courses().list(pageSize=100).execute()
-            courses = results.get('courses', [])
+# How long a burst may keep arriving before the feed renders it
+FRAME_MS = 50
 
-            if not courses:
-                return
+# How often a pending auto-play checks whether its spoken summary is ready
+SUMMARY_POLL_MS = 100
 
-            latest_timestamp_found = self.last_ts or 0
 
-            for course in courses:
-                course_id = course['id']
-                course_name = course['name']
+class IngestBridge(QObject):
+    """Carries results from the ingestion thread to the GUI thread.
 
-                course_latest_ts = self.check_announcements(
-                    self.service, course_id, course_name, self.last_ts)
+    Signals emitted from the IngestCore thread are queued to receivers living
+    in the GUI thread. New items travel through an AnnouncementBuffer instead;
+    ``items_pending`` only fires when that buffer stops being empty.
+    """
+    items_pending = pyqtSignal()
+    # Announcement to speak now: due from the Scheduler or urgent from the API
+    scheduled_due = pyqtSignal(object)
+    agora_ready = pyqtSignal(dict)
+    agora_error = pyqtSignal(str)
+    agora_status = pyqtSignal(str)
+    # (new, old) from the settings service, which may call from its watcher thread
+    settings_changed = pyqtSignal(dict, dict)
 
-                latest_timestamp_found = max(latest_timestamp_found, course_latest_ts)
 
-            self.save_last_timestamp(latest_timestamp_found)
-            self.last_ts = latest_timestamp_found
+# ============== AGORA INTEGRATION ==============
 
-        except Exception as e:
-            print(f"Classroom update error: {e}")
+class AgoraManager(AgoraAgent):
+    """AgoraAgent whose blocking start-up is driven from the ingestion loop"""
     
-    def run(self):
-        while self.running:
-            self.check_classroom_updates()
-            time.sleep(self.poll_interval)
+    def __init__(self, config, core, bridge):
+        super().__init__(config)
+        self.core = core
+        self.bridge = bridge
+        # Local API told what is being spoken, when it runs
+        self.api = None
     
-    def stop(self):
-        self.running = False
-
-
-# ============== AGORA INTEGRATION ==============
-
-# Update only the relevant parts - keep everything else the same
-
-# ============== AGORA INTEGRATION ==============
-
-class AgoraInitThread(QThread):
-    finished = pyqtSignal(dict)
-    error = pyqtSignal(str)
-    status_update = pyqtSignal(str)  # NEW: For progress updates
+    def report_playback(self, announcement):
+        """Speaking ``announcement`` started, or with None stopped"""
+        if self.api is not None:
+            self.api.playback(announcement)
+
+    def speak_soon(self, text):
+        """Speak from the ingestion loop; returns a ``concurrent.futures.Future``"""
+        return self.core.submit(self.speak_async(text, self.core.http))
     
-    def __init__(self, config):
-        super().__init__()
-        self.config = config
-        
-    def run(self):
+    def initialize(self, on_success, on_error):
+        self.bridge.agora_ready.connect(lambda resp: on_success(self.agent_id))
+        self.bridge.agora_error.connect(on_error)
+        self.core.submit(self._start())
+    
+    async def _start(self):
         try:
-            self.status_update.emit("Starting Agora agent...")
-            
-            # Validate required fields
-            required_fields = ['APP_ID', 'CHANNEL', 'TOKEN', 'OPENAI_KEY', 'AUTHORIZATION']
-            missing = [f for f in required_fields if not self.config.get(f)]
-            
-            if missing:
-                self.error.emit(f"Missing required settings: {', '.join(missing)}")
-                return
-            
-            # Start AI agent
-            self.status_update.emit("Connecting to Agora API...")
-            agent_response = start_ai_agent(
-                self.config['APP_ID'],
-                "",  # customer_id - not used
-                "",  # customer_secret - not used
-                self.config['CHANNEL'],
-                self.config['TOKEN'],
-                "1001",  # agent_uid - fixed
-                "1002",  # user_uid - fixed
-                self.config['OPENAI_KEY'],
-                "",  # azure_key - not used
-                "eastus",  # azure_region - not used
-                self.config['AUTHORIZATION']
-            )
-            
-            # Check for errors in response
-            if not agent_response:
-                self.error.emit("No response from Agora API")
-                return
-                
-            if "code" in agent_response and agent_response["code"] != 0:
-                error_msg = agent_response.get("message", "Unknown error")
-                reason = agent_response.get("reason", "")
-                full_error = f"{error_msg}" + (f": {reason}" if reason else "")
-                self.error.emit(f"Agora API error - {full_error}")
-                print(f"Full Agora response: {agent_response}")
-                return
-            
-            status = agent_response.get("status")
-            if status not in ["STARTING", "RUNNING"]:
-                reason = agent_response.get("reason", "Unknown reason")
-                self.error.emit(f"Agent failed to start. Status: {status}, Reason: {reason}")
-                print(f"Full Agora response: {agent_response}")
-                return
-            
-            agent_id = agent_response.get("agent_id")
-            if not agent_id:
-                self.error.emit("No agent_id in response")
-                print(f"Full Agora response: {agent_response}")
-                return
-            
-            self.status_update.emit(f"Agent started (ID: {agent_id}), initializing voice client...")
-            time.sleep(5)
-            
-            # Start voice client
-            self.status_update.emit("Starting voice client...")
-            client = AgoraSeleniumVoiceClient(
-                app_id=self.config['APP_ID'],
-                channel=self.config['CHANNEL'],
-                token=self.config['TOKEN'],
-                uid="1002",
-                agent_uid="1001",
-                headless=self.config.get('HEADLESS', True)
-            )
-            client.start()
-            
-            agent_response['_client'] = client
-            self.status_update.emit("Connected successfully!")
-            self.finished.emit(agent_response)
-            
-        except requests.exceptions.RequestException as e:
-            self.error.emit(f"Network error: {str(e)}")
-            print(f"Network error details: {e}")
+            agent_response = await asyncio.to_thread(
+                self.start, self.bridge.agora_status.emit)
+            self.bridge.agora_ready.emit(agent_response)
+        except AgoraError as e:
+            self.bridge.agora_error.emit(str(e))
         except Exception as e:
-            self.error.emit(f"Initialization error: {str(e)}")
+            self.bridge.agora_error.emit(f"Initialization error: {str(e)}")
             print(f"Error details: {e}")
             import traceback
             traceback.print_exc()
 
 
-class AgoraManager:
-    def __init__(self, config):
-        self.config = config
-        self.agent_id = None
-        self.client = None
-        self.is_initialized = False
-        self.status_callback = None
-        
-    def initialize(self, on_success, on_error, on_status=None):
-        self.status_callback = on_status
-        self.init_thread = AgoraInitThread(self.config)
-        self.init_thread.finished.connect(lambda resp: self._on_init_success(resp, on_success))
-        self.init_thread.error.connect(on_error)
-        if on_status:
-            self.init_thread.status_update.connect(on_status)
-        self.init_thread.start()
-        
-    def _on_init_success(self, agent_response, callback):
-        self.agent_id = agent_response.get('agent_id')
-        self.client = agent_response.get('_client')
-        self.is_initialized = True
-        callback(self.agent_id)
-        
-    def speak(self, text):
-        if not self.is_initialized or not self.agent_id:
-            raise Exception("Agora not initialized")
-        
-        words = text.split()
-        if len(words) > 60:
-            text = ' '.join(words[:60])
-        
-        url = f"https://api.agora.io/api/conversational-ai-agent/v2/projects/{self.config['APP_ID']}/agents/{self.agent_id}/speak"
-        
-        payload = {
-            "text": text,
-            "priority": "INTERRUPT",
-            "interruptable": False
-        }
-        headers = {
-            "Authorization": self.config['AUTHORIZATION']
-        }
-        
-        try:
-            response = requests.post(url, json=payload, headers=headers, timeout=10)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            print(f"Speak error: {e}")
-            raise
-        
-    def cleanup(self):
-        if not self.agent_id:
-            return
-            
-        try:
-            url = f"https://api.agora.io/api/conversational-ai-agent/v2/projects/{self.config['APP_ID']}/agents/{self.agent_id}/leave"
-            
-            headers = {
-                "Authorization": self.config['AUTHORIZATION']
-            }
-            
-            requests.post(url, headers=headers, timeout=10)
-            
-            if self.client:
-                self.client.stop()
-                
-        except Exception as e:
-            print(f"Error during cleanup: {e}")
-
-
-# ... (keep all UI classes the same until MainWindow) ...
-
-
-class MainWindow(QMainWindow):
-    def __init__(self):
-        super().__init__()
-        self.setWindowTitle("Multilingual PA System")
-        self.resize(1200, 750)
-
-        # Load settings
-        self.settings = SettingsManager.load_settings()
-        
-        # Build simplified Agora config from settings
-        self.agora_config = {
-            'APP_ID': self.settings['agora']['app_id'],
-            'CHANNEL': self.settings['agora']['channel'],
-            'TOKEN': self.settings['agora']['token'],
-            'OPENAI_KEY': self.settings['agora']['openai_key'],
-            'AUTHORIZATION': self.settings['agora']['authorization'],
-            'HEADLESS': self.settings['agora']['headless']
-        }
-        
-        self.agora_manager = AgoraManager(self.agora_config)
-        self.gmail_poller = None
-        self.classroom_poller = None
-        
-        self._build_ui()
-        self._apply_styles()
-        self._initialize_agora()
-
-    # ... (keep _build_ui and _switch_page the same) ...
-
-    def _initialize_agora(self):
-        # Validate configuration
-        required = {
-            'app_id': 'Agora App ID',
-            'channel': 'Channel name',
-            'token': 'RTC Token',
-            'openai_key': 'OpenAI API Key',
-            'authorization': 'Authorization header'
-        }
-        
-        missing = [name for key, name in required.items() if not self.settings['agora'][key]]
-        
-        if missing:
-            error_msg = f"Missing configuration:\n• " + "\n• ".join(missing)
-            self.feed_page.update_status("Not configured")
-            QMessageBox.warning(self, "Configuration Required", 
-                              f"{error_msg}\n\nPlease configure these in Settings.")
-            return
-            
-        def on_success(agent_id):
-            self.feed_page.update_status(f"Connected • Agent ID: {agent_id}")
-            self._start_pollers()
-            
-        def on_error(error_msg):
-            self.feed_page.update_status(f"Error: {error_msg}")
-            
-            # Show detailed error dialog
-            error_dialog = QMessageBox(self)
-            error_dialog.setIcon(QMessageBox.Icon.Critical)
-            error_dialog.setWindowTitle("Agora Initialization Failed")
-            error_dialog.setText("Failed to initialize Agora voice system")
-            error_dialog.setInformativeText(error_msg)
-            
-            # Add troubleshooting tips
-            details = """
-Common issues:
-
-1. Invalid Authorization header
-   • Check that it starts with "Basic "
-   • Verify your credentials are correct
-
-2. Invalid RTC Token
-   • Token may have expired
-   • Generate a new token from Agora console
-   • Ensure token is for the correct channel
-
-3. Invalid App ID
-   • Check App ID matches your Agora project
-
-4. OpenAI API Key issues
-   • Verify the key is active
-   • Check you have sufficient credits
-
-5. Network issues
-   • Check your internet connection
-   • Verify firewall settings
-"""
-            error_dialog.setDetailedText(details)
-            error_dialog.exec()
-            
-        def on_status(status_msg):
-            self.feed_page.update_status(status_msg)
-        
-        self.agora_manager.initialize(on_success, on_error, on_status)
-
-    # ... (keep rest of MainWindow methods the same) ...
-
-class AgoraManager:
-    def __init__(self, config):
-        self.config = config
-        self.agent_id = None
-        self.client = None
-        self.is_initialized = False
-        
-    def initialize(self, on_success, on_error):
-        self.init_thread = AgoraInitThread(self.config)
-        self.init_thread.finished.connect(lambda resp: self._on_init_success(resp, on_success))
-        self.init_thread.error.connect(on_error)
-        self.init_thread.start()
-        
-    def _on_init_success(self, agent_response, callback):
-        self.agent_id = agent_response.get('agent_id')
-        self.client = agent_response.get('_client')
-        self.is_initialized = True
-        callback(self.agent_id)
-        
-    def speak(self, text):
-        if not self.is_initialized or not self.agent_id:
-            raise Exception("Agora not initialized")
-        
-        words = text.split()
-        if len(words) > 60:
-            text = ' '.join(words[:60])
-        
-        url = f"https://api.agora.io/api/conversational-ai-agent/v2/projects/{self.config['APP_ID']}/agents/{self.agent_id}/speak"
-        
-        payload = {
-            "text": text,
-            "priority": "INTERRUPT",
-            "interruptable": False
-        }
-        headers = {
-            "Authorization": "Basic " + self.config['AUTHORIZATION']
-        }
-        
-        response = requests.post(url, json=payload, headers=headers)
-        return response.json()
-        
-    def cleanup(self):
-        if not self.agent_id:
-            return
-            
-        try:
-            url = f"https://api.agora.io/api/conversational-ai-agent/v2/projects/{self.config['APP_ID']}/agents/{self.agent_id}/leave"
-            
-            headers = {
-                "Authorization": "Basic " + self.config['AUTHORIZATION']
-            }
-            
-            requests.post(url, headers=headers)
-            
-            if self.client:
-                self.client.stop()
-                
-        except Exception as e:
-            print(f"Error during cleanup: {e}")
-
-
 # ============== UI COMPONENTS ==============
 
 class AnnouncementCard(QWidget):
-    def __init__(self, title: str, source: str, timestamp: str,
-                 original_text: str, translated_text: str, 
-                 agora_manager=None, auto_play=False, parent=None):
+    """One announcement. A burst summary also holds the burst's own items,
+    whose cards are built the first time they are shown.
+
+    Speak requests run on the ingestion loop; ``speak_finished`` brings the
+    outcome (None or the exception) back to the GUI thread.
+    """
+    speak_finished = pyqtSignal(object)
+
+    def __init__(self, announcement, agora_manager=None, parent=None, items=()):
         super().__init__(parent)
 
         self.setObjectName("AnnouncementCard")
         self.agora_manager = agora_manager
-        self.translated_text = translated_text
+        self.announcement = announcement
         self.is_playing = False
+        self._manual = False
+        self.items = list(items)
+        self.items_container = None
+        self.speak_finished.connect(self._on_speak_finished)
 
         main_layout = QVBoxLayout(self)
         main_layout.setContentsMargins(16, 16, 16, 16)
         main_layout.setSpacing(8)
 
         title_row = QHBoxLayout()
-        title_label = QLabel(title)
+        title_label = QLabel(announcement.title)
         title_label.setObjectName("CardTitle")
 
-        meta_label = QLabel(f"{source} • {timestamp}")
+        meta_label = QLabel(f"{announcement.source} • {announcement.timestamp}")
         meta_label.setObjectName("CardMeta")
         meta_label.setAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
 
@@ -705,16 +134,16 @@ class AnnouncementCard(QWidget):
         original_label = QLabel("Original")
         original_label.setObjectName("CardSectionLabel")
 
-        original_text_label = QLabel(original_text)
+        original_text_label = QLabel(announcement.text)
         original_text_label.setWordWrap(True)
         original_text_label.setObjectName("CardBody")
 
         translated_label = QLabel("Translated")
         translated_label.setObjectName("CardSectionLabel")
 
-        translated_text_label = QLabel(translated_text)
-        translated_text_label.setWordWrap(True)
-        translated_text_label.setObjectName("CardBodyStrong")
+        self.translated_text_label = QLabel(announcement.translated)
+        self.translated_text_label.setWordWrap(True)
+        self.translated_text_label.setObjectName("CardBodyStrong")
 
         bottom_row = QHBoxLayout()
         bottom_row.setSpacing(8)
@@ -724,17 +153,19 @@ class AnnouncementCard(QWidget):
         self.play_button.clicked.connect(self._on_play_audio)
 
         bottom_row.addWidget(self.play_button)
+        if self.items:
+            self.items_button = QPushButton(f"Show {len(self.items)} items")
+            self.items_button.setObjectName("SecondaryButton")
+            self.items_button.clicked.connect(self._toggle_items)
+            bottom_row.addWidget(self.items_button)
         bottom_row.addStretch()
 
         main_layout.addLayout(title_row)
         main_layout.addWidget(original_label)
         main_layout.addWidget(original_text_label)
         main_layout.addWidget(translated_label)
-        main_layout.addWidget(translated_text_label)
+        main_layout.addWidget(self.translated_text_label)
         main_layout.addLayout(bottom_row)
-        
-        if auto_play:
-            QTimer.singleShot(500, self.play_audio)
 
     def play_audio(self):
         if self.is_playing:
@@ -744,20 +175,67 @@ class AnnouncementCard(QWidget):
             print("Agora not ready for auto-play")
             return
         
+        # Only the first (automatic) playback belongs to the latency trace
+        trace = self.announcement.trace
+        self.announcement.trace = None
+        # The spoken summary may have arrived after the card was built
+        self.translated_text_label.setText(self.announcement.translated)
+        self._speak(trace)
+
+    def _speak(self, trace=None, manual=False):
+        self.is_playing = True
+        self._manual = manual
+        self.play_button.setEnabled(False)
+        self.play_button.setText("Playing...")
+        self.agora_manager.report_playback(self.announcement)
+        if trace:
+            trace.mark("speak_sent")
         try:
-            self.is_playing = True
-            self.play_button.setEnabled(False)
-            self.play_button.setText("Playing...")
-            
-            self.agora_manager.speak(self.translated_text)
-            
-            QTimer.singleShot(2000, self._reset_buttons)
-            
+            future = self.agora_manager.speak_soon(self.announcement.translated)
         except Exception as e:
-            print(f"Failed to play audio: {e}")
-            self._reset_buttons()
+            self._on_speak_finished(e)
+            return
+        future.add_done_callback(lambda f: self._speak_done(f, trace))
+
+    def _speak_done(self, future, trace):
+        # Runs on the ingestion thread
+        error = Exception("cancelled") if future.cancelled() else future.exception()
+        if trace and error is None:
+            trace.mark("speak_acked")
+            tracer.record(trace)
+        try:
+            self.speak_finished.emit(error)
+        except RuntimeError:
+            pass  # the card was deleted meanwhile
+
+    def _on_speak_finished(self, error):
+        if error is None:
+            QTimer.singleShot(2000, self._reset_buttons)
+            return
+        if self._manual:
+            QMessageBox.critical(self, "Error", f"Failed to play audio: {error}")
+        else:
+            print(f"Failed to play audio: {error}")
+        self._reset_buttons()
+
+    def _toggle_items(self):
+        if self.items_container is None:
+            self.items_container = QWidget()
+            items_layout = QVBoxLayout(self.items_container)
+            items_layout.setContentsMargins(0, 8, 0, 0)
+            items_layout.setSpacing(16)
+            for item in self.items:
+                items_layout.addWidget(AnnouncementCard(item, self.agora_manager))
+            self.layout().addWidget(self.items_container)
+        else:
+            self.items_container.setHidden(not self.items_container.isHidden())
+        if self.items_container.isHidden():
+            self.items_button.setText(f"Show {len(self.items)} items")
+        else:
+            self.items_button.setText("Hide items")
     
     def _reset_buttons(self):
+        self.agora_manager.report_playback(None)
         self.is_playing = False
         self.play_button.setEnabled(True)
         self.play_button.setText("Play Audio")
@@ -774,24 +252,9 @@ class AnnouncementCard(QWidget):
             self.play_audio()
             return
         
-        try:
-            if self.is_playing:
-                return
-                
-            self.is_playing = True
-            sender.setEnabled(False)
-            sender.setText("Playing...")
-            self.play_button.setEnabled(False)
-            
-            self.agora_manager.speak(self.translated_text)
-            
-            QApplication.processEvents()
-            
-            QTimer.singleShot(2000, self._reset_buttons)
-            
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to play audio: {str(e)}")
-            self._reset_buttons()
+        if self.is_playing:
+            return
+        self._speak(manual=True)
 
 
 class FeedPage(QWidget):
@@ -801,6 +264,11 @@ class FeedPage(QWidget):
         self.agora_manager = agora_manager
         self.auto_broadcast = False
         self.is_initial_load = True
+        self._auto_play_card = None
+        self._auto_play_deadline = 0
+        self._auto_play_timer = QTimer(self)
+        self._auto_play_timer.setSingleShot(True)
+        self._auto_play_timer.timeout.connect(self._play_pending)
         self._build_ui()
 
     def _build_ui(self):
@@ -861,14 +329,58 @@ class FeedPage(QWidget):
     def _on_auto_broadcast_toggle(self, checked):
         self.auto_broadcast = checked
 
-    def add_announcement(self, title, source, timestamp, original, translated, auto_play=False):
-        should_auto_play = auto_play and not self.is_initial_load
+    def add_announcement(self, announcement, auto_play=False, items=()):
+        should_auto_play = auto_play and announcement.broadcast and not self.is_initial_load
         
-        card = AnnouncementCard(
-            title, source, timestamp, original, translated, 
-            self.agora_manager, should_auto_play
-        )
+        card = AnnouncementCard(announcement, self.agora_manager, items=items)
         self.scroll_layout.insertWidget(self.scroll_layout.count() - 1, card)
+        
+        if should_auto_play:
+            self._schedule_auto_play(card)
+        return card
+    
+    def add_batch(self, announcements, dropped=0, auto_play=False, language="English"):
+        """Add everything drained from the ingestion buffer in one layout pass.
+        
+        Bursts are collapsed into a single summary card that lists the
+        burst's items on demand; catch-up digests always get their own.
+        """
+        if not announcements:
+            return
+        
+        self.setUpdatesEnabled(False)
+        try:
+            digests = [a for a in announcements if not a.broadcast]
+            announcements = [a for a in announcements if a.broadcast]
+            for announcement in digests:
+                self.add_announcement(announcement, auto_play)
+            if len(announcements) + dropped > BURST_THRESHOLD:
+                self.add_announcement(
+                    summarize(announcements, dropped, language), auto_play, announcements)
+            else:
+                for announcement in announcements:
+                    self.add_announcement(announcement, auto_play)
+        finally:
+            self.setUpdatesEnabled(True)
+    
+    def _schedule_auto_play(self, card):
+        # At most one auto-play is ever pending; a newer card replaces it
+        self._auto_play_card = card
+        self._auto_play_deadline = time.monotonic() + SUMMARY_WAIT
+        if not self._auto_play_timer.isActive():
+            self._auto_play_timer.start(500)
+    
+    def _play_pending(self):
+        card = self._auto_play_card
+        if card is None:
+            return
+        job = card.announcement.brief_job
+        if job is not None and not job.done() and time.monotonic() < self._auto_play_deadline:
+            # Only the card about to be spoken waits for its summary
+            self._auto_play_timer.start(SUMMARY_POLL_MS)
+            return
+        self._auto_play_card = None
+        card.play_audio()
     
     def mark_initial_load_complete(self):
         self.is_initial_load = False
@@ -878,14 +390,21 @@ class FeedPage(QWidget):
 
 
 class SettingsPage(QWidget):
-    settings_saved = pyqtSignal(dict)
+    # (new, old) from the settings service, which may call from its watcher thread
+    settings_changed = pyqtSignal(dict, dict)
+    # Applied immediately, without saving: (enabled, threshold_ms)
+    watchdog_changed = pyqtSignal(bool, int)
     
-    def __init__(self, settings, parent=None):
+    def __init__(self, service, parent=None):
         super().__init__(parent)
         self.setObjectName("SettingsPage")
-        self.settings = settings
+        self.service = service
+        # Edited in place; handed to the service on save
+        self.settings = copy.deepcopy(service.settings)
         self._build_ui()
         self._load_settings()
+        self.settings_changed.connect(self._on_settings_changed)
+        service.subscribe(self.settings_changed.emit)
 
     def _build_ui(self):
         root_layout = QVBoxLayout(self)
@@ -918,10 +437,18 @@ class SettingsPage(QWidget):
         self.email_password.setPlaceholderText("App password")
         self.email_imap = QLineEdit()
         self.email_imap.setPlaceholderText("imap.gmail.com")
-
+        self.email_backend = QComboBox()
+        self.email_backend.addItem("IMAP (app password)", "imap")
+        self.email_backend.addItem("Gmail API (Google sign-in)", "gmail_api")
+        self.email_backend.setObjectName("ComboBox")
+        self.email_label = QLineEdit()
+        self.email_label.setPlaceholderText("INBOX")
+
+        email_layout.addRow("Backend", self.email_backend)
         email_layout.addRow("Email", self.email_username)
         email_layout.addRow("Password", self.email_password)
         email_layout.addRow("IMAP Host", self.email_imap)
+        email_layout.addRow("Gmail label", self.email_label)
 
         # Agora settings (simplified)
         agora_group = QGroupBox("Agora Settings")
@@ -962,8 +489,15 @@ class SettingsPage(QWidget):
         self.classroom_interval.setRange(5, 3600)
         self.classroom_interval.setSuffix(" sec")
 
+        self.catch_up_enabled = QCheckBox("Catch up on items missed while offline")
+        self.catch_up_hours = QSpinBox()
+        self.catch_up_hours.setRange(1, 168)
+        self.catch_up_hours.setSuffix(" h")
+
         polling_layout.addRow("Email polling", self.email_interval)
         polling_layout.addRow("Classroom polling", self.classroom_interval)
+        polling_layout.addRow("", self.catch_up_enabled)
+        polling_layout.addRow("Catch-up window", self.catch_up_hours)
 
         # Audio settings
         audio_group = QGroupBox("Audio Settings")
@@ -974,7 +508,31 @@ class SettingsPage(QWidget):
         self.default_language.addItems(["English", "Hindi", "Tamil", "Telugu", "Bengali"])
         self.default_language.setObjectName("ComboBox")
 
+        self.summary_enabled = QCheckBox("Speak a summary of long announcements")
+        self.summary_words = QSpinBox()
+        self.summary_words.setRange(10, 60)
+        self.summary_words.setSuffix(" words")
+
         audio_layout.addRow("Default language", self.default_language)
+        audio_layout.addRow("", self.summary_enabled)
+        audio_layout.addRow("Summary length", self.summary_words)
+
+        # Diagnostics settings
+        diagnostics_group = QGroupBox("Diagnostics")
+        diagnostics_group.setObjectName("SettingsGroup")
+        diagnostics_layout = QFormLayout(diagnostics_group)
+
+        self.stall_watchdog = QCheckBox("Log GUI stalls with the stack that caused them")
+        self.stall_threshold = QSpinBox()
+        self.stall_threshold.setRange(50, 10000)
+        self.stall_threshold.setSingleStep(50)
+        self.stall_threshold.setSuffix(" ms")
+
+        self.tracing_enabled = QCheckBox("Record announcement latency traces")
+
+        diagnostics_layout.addRow("", self.stall_watchdog)
+        diagnostics_layout.addRow("Stall threshold", self.stall_threshold)
+        diagnostics_layout.addRow("", self.tracing_enabled)
 
         # Action buttons
         actions_row = QHBoxLayout()
@@ -993,18 +551,28 @@ class SettingsPage(QWidget):
         scroll_layout.addWidget(agora_group)
         scroll_layout.addWidget(polling_group)
         scroll_layout.addWidget(audio_group)
+        scroll_layout.addWidget(diagnostics_group)
         scroll_layout.addStretch()
         scroll_layout.addLayout(actions_row)
 
         scroll_area.setWidget(scroll_content)
         root_layout.addWidget(scroll_area)
 
+        self.stall_watchdog.toggled.connect(self._emit_watchdog_changed)
+        self.stall_threshold.valueChanged.connect(self._emit_watchdog_changed)
+
+    def _emit_watchdog_changed(self):
+        self.watchdog_changed.emit(self.stall_watchdog.isChecked(), self.stall_threshold.value())
+
     def _load_settings(self):
         """Load settings into UI fields"""
         # Email
         self.email_username.setText(self.settings['email']['username'])
         self.email_password.setText(self.settings['email']['password'])
         self.email_imap.setText(self.settings['email']['imap_host'])
+        self.email_backend.setCurrentIndex(
+            max(0, self.email_backend.findData(self.settings['email']['backend'])))
+        self.email_label.setText(self.settings['email']['label'])
 
         # Agora (simplified)
         self.agora_app_id.setText(self.settings['agora']['app_id'])
@@ -1017,18 +585,29 @@ class SettingsPage(QWidget):
         # Polling
         self.email_interval.setValue(self.settings['polling']['email_interval'])
         self.classroom_interval.setValue(self.settings['polling']['classroom_interval'])
+        self.catch_up_enabled.setChecked(self.settings['catch_up']['enabled'])
+        self.catch_up_hours.setValue(self.settings['catch_up']['lookback_hours'])
 
         # Audio
         lang = self.settings['audio']['default_language']
         index = self.default_language.findText(lang)
         if index >= 0:
             self.default_language.setCurrentIndex(index)
+        self.summary_enabled.setChecked(self.settings['summary']['enabled'])
+        self.summary_words.setValue(self.settings['summary']['target_words'])
+
+        # Diagnostics
+        self.stall_watchdog.setChecked(self.settings['diagnostics']['stall_watchdog'])
+        self.stall_threshold.setValue(self.settings['diagnostics']['stall_threshold_ms'])
+        self.tracing_enabled.setChecked(self.settings['tracing']['enabled'])
 
     def _save_settings(self):
         """Save settings from UI to file"""
         self.settings['email']['username'] = self.email_username.text()
         self.settings['email']['password'] = self.email_password.text()
         self.settings['email']['imap_host'] = self.email_imap.text()
+        self.settings['email']['backend'] = self.email_backend.currentData()
+        self.settings['email']['label'] = self.email_label.text() or "INBOX"
 
         self.settings['agora']['app_id'] = self.agora_app_id.text()
         self.settings['agora']['channel'] = self.agora_channel.text()
@@ -1039,14 +618,31 @@ class SettingsPage(QWidget):
 
         self.settings['polling']['email_interval'] = self.email_interval.value()
         self.settings['polling']['classroom_interval'] = self.classroom_interval.value()
+        self.settings['catch_up']['enabled'] = self.catch_up_enabled.isChecked()
+        self.settings['catch_up']['lookback_hours'] = self.catch_up_hours.value()
 
         self.settings['audio']['default_language'] = self.default_language.currentText()
+        self.settings['summary']['enabled'] = self.summary_enabled.isChecked()
+        self.settings['summary']['target_words'] = self.summary_words.value()
 
-        if SettingsManager.save_settings(self.settings):
-            QMessageBox.information(self, "Success", "Settings saved successfully!\n\nRestart the application for changes to take effect.")
-            self.settings_saved.emit(self.settings)
-        else:
-            QMessageBox.critical(self, "Error", "Failed to save settings.")
+        self.settings['diagnostics']['stall_watchdog'] = self.stall_watchdog.isChecked()
+        self.settings['diagnostics']['stall_threshold_ms'] = self.stall_threshold.value()
+        self.settings['tracing']['enabled'] = self.tracing_enabled.isChecked()
+
+        try:
+            self.service.save(self.settings)
+        except SettingsError as e:
+            QMessageBox.critical(self, "Error", f"Failed to save settings: {e}")
+            return
+        QMessageBox.information(self, "Success", "Settings saved successfully!\n\n"
+                                "Polling changes apply right away; Agora and summary "
+                                "changes take effect after a restart.")
+
+    def _on_settings_changed(self, new, old):
+        if new != self.settings:
+            # Edited outside the app; show what is now in effect
+            self.settings = copy.deepcopy(new)
+            self._load_settings()
 
     def _reset_settings(self):
         """Reset to default settings"""
@@ -1054,36 +650,122 @@ class SettingsPage(QWidget):
                                      "Are you sure you want to reset all settings to defaults?",
                                      QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
         if reply == QMessageBox.StandardButton.Yes:
-            self.settings = SettingsManager.DEFAULT_SETTINGS.copy()
+            self.settings = SettingsManager.defaults()
             self._load_settings()
 
 
+class DiagnosticsPage(QWidget):
+    """Live view of the metrics registry and recent GUI stalls, refreshed while shown"""
+    
+    REFRESH_MS = 2000
+    
+    # Stalls listed with their stacks, newest first
+    SHOWN_STALLS = 5
+    
+    def __init__(self, watchdog=None, parent=None):
+        super().__init__(parent)
+        self.setObjectName("DiagnosticsPage")
+        self.watchdog = watchdog
+        self._build_ui()
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh)
+
+    def _build_ui(self):
+        root_layout = QVBoxLayout(self)
+        root_layout.setContentsMargins(24, 24, 24, 24)
+        root_layout.setSpacing(16)
+
+        header_label = QLabel("Diagnostics")
+        header_label.setObjectName("PageTitle")
+
+        self.metrics_view = QPlainTextEdit()
+        self.metrics_view.setReadOnly(True)
+        self.metrics_view.setObjectName("MetricsView")
+
+        root_layout.addWidget(header_label)
+        root_layout.addWidget(self.metrics_view)
+
+    def refresh(self):
+        scroll = self.metrics_view.verticalScrollBar()
+        position = scroll.value()
+        self.metrics_view.setPlainText(registry.summary() + self._stall_report())
+        scroll.setValue(position)
+
+    def _stall_report(self):
+        if self.watchdog is None or not self.watchdog.recent:
+            return ""
+        lines = ["", "", "Recent GUI stalls"]
+        for stall in list(self.watchdog.recent)[::-1][:self.SHOWN_STALLS]:
+            started = time.strftime("%H:%M:%S", time.localtime(stall.started))
+            lines.append(f"{started}  {stall.duration * 1000:.0f} ms")
+            lines.append(stall.stack.rstrip())
+            lines.append("")
+        return "\n".join(lines)
+
+    def showEvent(self, event):
+        self.refresh()
+        self.refresh_timer.start(self.REFRESH_MS)
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.refresh_timer.stop()
+        super().hideEvent(event)
+
+
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, replay=None):
         super().__init__()
+        self.replay = replay
         self.setWindowTitle("Multilingual PA System")
         self.resize(1200, 750)
 
         # Load settings
-        self.settings = SettingsManager.load_settings()
+        with startup.phase("load settings"):
+            self.settings_service = SettingsService()
+            self.settings = self.settings_service.settings
         
         # Build simplified Agora config from settings
-        self.agora_config = {
-            'APP_ID': self.settings['agora']['app_id'],
-            'CHANNEL': self.settings['agora']['channel'],
-            'TOKEN': self.settings['agora']['token'],
-            'OPENAI_KEY': self.settings['agora']['openai_key'],
-            'AUTHORIZATION': self.settings['agora']['authorization'],
-            'HEADLESS': self.settings['agora']['headless']
-        }
+        self.agora_config = agora_config(self.settings)
         
-        self.agora_manager = AgoraManager(self.agora_config)
-        self.gmail_poller = None
-        self.classroom_poller = None
+        # One background thread hosts every source and the Agora start-up
+        self.announcement_buffer = AnnouncementBuffer(on_drop=self._acknowledge)
+        self.ingest_bridge = IngestBridge()
+        self.ingest_core = IngestCore()
+        self.ingest_core.start_thread()
         
-        self._build_ui()
-        self._apply_styles()
-        self._initialize_agora()
+        self.agora_manager = AgoraManager(
+            self.agora_config, self.ingest_core, self.ingest_bridge)
+        # Spoken summaries are prepared on their own worker threads
+        self.summarizer = summarizer_from_settings(self.settings)
+        # Runs on the ingestion loop once the agent is up
+        self.scheduler = None
+        self.scheduler_job = None
+        # Local API, on the ingestion loop once the feed takes items
+        self.api = api_from_settings(self.settings['api'], self._buffered, self._urgent)
+        self.agora_manager.api = self.api
+        self.ingest_bridge.scheduled_due.connect(self._play_scheduled)
+        
+        # Optional GUI stall detection, fed by a heartbeat on this thread
+        self.watchdog = StallWatchdog()
+        self.heartbeat_timer = QTimer(self)
+        self.heartbeat_timer.timeout.connect(self.watchdog.heartbeat)
+        diagnostics = self.settings['diagnostics']
+        self._set_watchdog(diagnostics['stall_watchdog'], diagnostics['stall_threshold_ms'])
+        tracer.configure(self.settings['tracing'])
+        
+        with startup.phase("build UI"):
+            self._build_ui()
+        with startup.phase("apply styles"):
+            self._apply_styles()
+        with startup.phase("initialize Agora"):
+            self._initialize_agora()
+        if self.replay is not None:
+            self._start_replay()
+        
+        # Saved and externally edited settings apply without a restart
+        self.ingest_bridge.settings_changed.connect(self._apply_settings)
+        self.settings_service.subscribe(self.ingest_bridge.settings_changed.emit)
+        self.settings_service.watch()
 
     def _build_ui(self):
         central = QWidget()
@@ -1111,6 +793,9 @@ class MainWindow(QMainWindow):
         nav_settings = QPushButton("Settings")
         nav_settings.setCheckable(True)
         nav_settings.setObjectName("NavButton")
+        nav_diagnostics = QPushButton("Diagnostics")
+        nav_diagnostics.setCheckable(True)
+        nav_diagnostics.setObjectName("NavButton")
 
         nav_feed.setChecked(True)
 
@@ -1119,6 +804,7 @@ class MainWindow(QMainWindow):
         sidebar_layout.addSpacing(16)
         sidebar_layout.addWidget(nav_feed)
         sidebar_layout.addWidget(nav_settings)
+        sidebar_layout.addWidget(nav_diagnostics)
         sidebar_layout.addStretch()
 
         footer_label = QLabel("Prototype build")
@@ -1127,26 +813,49 @@ class MainWindow(QMainWindow):
 
         self.stack = QStackedWidget()
         self.feed_page = FeedPage(self.agora_manager)
-        self.settings_page = SettingsPage(self.settings)
         self.stack.addWidget(self.feed_page)
-        self.stack.addWidget(self.settings_page)
+        # Other pages are built on first navigation, see _switch_page
+        self.settings_page = None
+        self.pages = {'feed': self.feed_page}
+        self.nav_buttons = {
+            'feed': nav_feed,
+            'settings': nav_settings,
+            'diagnostics': nav_diagnostics
+        }
 
         main_layout.addWidget(sidebar)
         main_layout.addWidget(self.stack)
 
         self.setCentralWidget(central)
 
-        nav_feed.clicked.connect(lambda: self._switch_page(0, nav_feed, nav_settings))
-        nav_settings.clicked.connect(lambda: self._switch_page(1, nav_feed, nav_settings))
-
-    def _switch_page(self, index: int, feed_btn: QPushButton, settings_btn: QPushButton):
-        self.stack.setCurrentIndex(index)
-        if index == 0:
-            feed_btn.setChecked(True)
-            settings_btn.setChecked(False)
-        else:
-            feed_btn.setChecked(False)
-            settings_btn.setChecked(True)
+        for name, button in self.nav_buttons.items():
+            button.clicked.connect(lambda checked, name=name: self._switch_page(name))
+
+    def _switch_page(self, name: str):
+        page = self.pages.get(name)
+        if page is None:
+            page = self._build_page(name)
+            self.pages[name] = page
+            self.stack.addWidget(page)
+        self.stack.setCurrentWidget(page)
+        for button_name, button in self.nav_buttons.items():
+            button.setChecked(button_name == name)
+
+    def _build_page(self, name: str):
+        if name == 'settings':
+            self.settings_page = SettingsPage(self.settings_service)
+            self.settings_page.watchdog_changed.connect(self._set_watchdog)
+            return self.settings_page
+        return DiagnosticsPage(self.watchdog)
+
+    def _set_watchdog(self, enabled: bool, threshold_ms: int):
+        self.watchdog.threshold = threshold_ms / 1000
+        if enabled and not self.watchdog.running:
+            self.watchdog.start()
+            self.heartbeat_timer.start(HEARTBEAT_MS)
+        elif not enabled and self.watchdog.running:
+            self.heartbeat_timer.stop()
+            self.watchdog.stop()
 
     def _initialize_agora(self):
         if not self.settings['agora']['app_id']:
@@ -1164,64 +873,146 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "Agora Error", 
                               f"Failed to initialize Agora: {error_msg}")
         
+        self.ingest_bridge.agora_status.connect(self.feed_page.update_status)
         self.agora_manager.initialize(on_success, on_error)
 
     def _start_pollers(self):
+        if self.replay is not None:
+            # The replay already feeds the feed; don't poll real accounts too
+            return
         self.feed_page.mark_initial_load_complete()
         
-        if self.settings['email']['username'] and self.settings['email']['password']:
-            self.gmail_poller = GmailPollerThread(
-                self.settings,
-                poll_interval=self.settings['polling']['email_interval']
-            )
-            self.gmail_poller.new_email.connect(self._on_new_email)
-            self.gmail_poller.start()
-        
-        self.classroom_poller = ClassroomPollerThread(
-            poll_interval=self.settings['polling']['classroom_interval']
-        )
-        self.classroom_poller.new_announcement.connect(self._on_new_announcement)
-        self.classroom_poller.start()
+        self.ingest_bridge.items_pending.connect(self._schedule_drain)
+        self._start_api()
         
-        status = self.feed_page.status_label.text()
-        self.feed_page.update_status(status + " • Polling Email & Classroom")
-
-    def _on_new_email(self, email_data):
-        title = email_data['subject']
-        source = "Email"
-        timestamp = email_data['timestamp']
-        original = email_data['body'][:500]
-        translated = email_data['body'][:500]
+        mailboxes, google_accounts = self.ingest_core.add_configured_sources(
+            self.settings, self._buffered, self._buffered)
         
-        auto_play = self.feed_page.auto_broadcast
+        self.scheduler = Scheduler(
+            self.settings['schedule'], self.ingest_bridge.scheduled_due.emit,
+            self.settings['audio']['default_language'])
+        self.scheduler_job = self.ingest_core.submit(self.scheduler.run())
+        if self.ingest_core.cluster is not None:
+            self.ingest_core.loop.call_soon_threadsafe(self.ingest_core.cluster.want, SPEAKER)
         
-        self.feed_page.add_announcement(
-            title, source, timestamp, original, translated, auto_play
-        )
+        status = self.feed_page.status_label.text()
+        self.feed_page.update_status(
+            status + f" • Polling {mailboxes} mailbox(es) & {google_accounts} Classroom account(s)")
 
-    def _on_new_announcement(self, ann_data):
-        title = f"Classroom: {ann_data['course_name']}"
-        source = "Classroom"
-        timestamp = ann_data['creation_time']
-        original = ann_data['text'][:500]
-        translated = ann_data['text'][:500]
-        
-        auto_play = self.feed_page.auto_broadcast
-        
-        self.feed_page.add_announcement(
-            title, source, timestamp, original, translated, auto_play
+    def _start_replay(self):
+        # Replays start straight away so the feed can be load-tested without Agora
+        self.feed_page.mark_initial_load_complete()
+        self.ingest_bridge.items_pending.connect(self._schedule_drain)
+        self._start_api()
+        self.ingest_core.add_replay(self.replay, self._buffered, self._buffered)
+        self.feed_page.update_status(f"Replaying {len(self.replay.events)} item(s)")
+
+    def _start_api(self):
+        if self.api is not None:
+            self.ingest_core.submit(self.api.start())
+    
+    def _buffered(self, announcement):
+        """Poller callback: buffer on the ingestion thread, wake the GUI once per batch"""
+        announcement.localize(self.settings['audio']['default_language'])
+        if self.api:
+            self.api.publish(announcement)
+        if announcement.trace:
+            announcement.trace.mark("queued")
+        # Summaries are only seen when spoken, and may be a paid API call
+        if self.summarizer and announcement.broadcast and self._auto_plays():
+            self.summarizer.submit(announcement)
+        if self.announcement_buffer.put(announcement):
+            self.ingest_bridge.items_pending.emit()
+    
+    def _urgent(self, announcement):
+        """API callback for urgent notices, on the ingestion thread"""
+        announcement.localize(self.settings['audio']['default_language'])
+        self.ingest_bridge.scheduled_due.emit(announcement)
+    
+    def _play_scheduled(self, announcement):
+        """Show a scheduled or urgent item and speak it now, even with auto-broadcast off"""
+        if self.api:
+            self.api.publish(announcement)
+        announcement.trace.mark("queued")
+        card = self.feed_page.add_announcement(announcement)
+        announcement.trace.mark("rendered")
+        if self._speaks():
+            card.play_audio()  # records the trace
+    
+    def _speaks(self):
+        """False on cluster stations that do not hold the speaker lease"""
+        cluster = self.ingest_core.cluster
+        return cluster is None or cluster.leads(SPEAKER)
+    
+    def _auto_plays(self):
+        """Whether items arriving now are spoken as they are shown"""
+        feed = self.feed_page
+        return feed.auto_broadcast and not feed.is_initial_load and self._speaks()
+    
+    def _schedule_drain(self):
+        # Let the rest of the burst arrive, then render it in one go
+        QTimer.singleShot(FRAME_MS, self._drain_announcements)
+    
+    def _drain_announcements(self):
+        announcements, dropped = self.announcement_buffer.drain()
+        self.feed_page.add_batch(
+            announcements, dropped, self._auto_plays(),
+            self.settings['audio']['default_language']
         )
+        
+        rendered = time.time()
+        for announcement in announcements:
+            if announcement.trace:
+                tracer.record(announcement.trace.mark("rendered", rendered))
+            # On screen now; a restart need not show it again
+            self._acknowledge(announcement)
+    
+    def _acknowledge(self, announcement):
+        """Shown, or dropped by the full buffer: not to be delivered again"""
+        if self.ingest_core.outbox is not None:
+            self.ingest_core.outbox.ack(announcement)
+
+    def _apply_settings(self, new, old):
+        """Live-apply saved or externally edited settings"""
+        self.settings = new
+        if self.replay is None:
+            self.ingest_core.reconfigure(new)
+        if self.scheduler is not None:
+            self.ingest_core.loop.call_soon_threadsafe(
+                self.scheduler.configure, new['schedule'], new['audio']['default_language'])
+        diagnostics = new['diagnostics']
+        self._set_watchdog(diagnostics['stall_watchdog'], diagnostics['stall_threshold_ms'])
+        tracer.configure(new['tracing'])
+        if new['agora'] != old['agora']:
+            self.feed_page.update_status("Agora settings changed - restart to reconnect")
+        if new['push'] != old['push']:
+            self.feed_page.update_status("Classroom push settings changed - restart to apply")
+        if new['summary'] != old['summary']:
+            self.feed_page.update_status("Summary settings changed - restart to apply")
+        if new['cluster'] != old['cluster']:
+            self.feed_page.update_status("Cluster settings changed - restart to apply")
+        if new['api'] != old['api']:
+            self.feed_page.update_status("API settings changed - restart to apply")
+        if new['outbox'] != old['outbox']:
+            self.feed_page.update_status("Outbox settings changed - restart to apply")
+        if new['parsing'] != old['parsing']:
+            self.feed_page.update_status("Parsing settings changed - restart to apply")
 
     def closeEvent(self, event):
-        if self.gmail_poller:
-            self.gmail_poller.stop()
-            self.gmail_poller.wait()
-        
-        if self.classroom_poller:
-            self.classroom_poller.stop()
-            self.classroom_poller.wait()
-        
+        self._set_watchdog(False, self.settings['diagnostics']['stall_threshold_ms'])
+        self.settings_service.close()
+        if self.scheduler_job is not None:
+            self.scheduler_job.cancel()
+        if self.api is not None:
+            try:
+                self.ingest_core.submit(self.api.close()).result(API_CLOSE_TIMEOUT + 1)
+            except Exception as e:
+                print(f"Error closing the API: {e}")
+        self.ingest_core.stop_thread()
+        if self.summarizer:
+            self.summarizer.close()
         self.agora_manager.cleanup()
+        tracer.close()
         event.accept()
 
     def _apply_styles(self):
@@ -1387,16 +1178,28 @@ class MainWindow(QMainWindow):
                 color: #f9fafb;
                 font-weight: 500;
             }
+            #MetricsView {
+                font-family: 'Consolas', 'DejaVu Sans Mono', monospace;
+                font-size: 9pt;
+                border: 1px solid #1f2937;
+                border-radius: 12px;
+                background-color: #020617;
+            }
             #FeedScrollArea, #SettingsScrollArea {
                 background-color: transparent;
             }
         """)
 
 
-def main():
-    app = QApplication(sys.argv)
-    window = MainWindow()
-    window.show()
+def main(replay=None):
+    with startup.phase("create QApplication"):
+        app = QApplication(sys.argv)
+    with startup.phase("create MainWindow"):
+        window = MainWindow(replay)
+    with startup.phase("show window"):
+        window.show()
+    # Runs once the event loop is up, i.e. after the first paint is queued
+    QTimer.singleShot(0, startup.finish)
     sys.exit(app.exec())
 
 
@@ -0,0 +1,147 @@
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import time
+
+import pytest
+
+from edupulse.api import (_WS_CLOSE, _WS_GUID, _WS_PING, _WS_PONG, _WS_TEXT,
+                          MAX_BODY_BYTES, ApiServer, _frame, _RequestError, read_frame)
+from edupulse.pipeline import Announcement
+
+
+def masked(opcode, payload, mask=b"\x12\x34\x56\x78"):
+    """Client-to-server frame, as a browser sends it"""
+    length = len(payload)
+    if length < 126:
+        header = bytes((0x80 | opcode, 0x80 | length))
+    elif length < 65536:
+        header = bytes((0x80 | opcode, 0x80 | 126)) + length.to_bytes(2, "big")
+    else:
+        header = bytes((0x80 | opcode, 0x80 | 127)) + length.to_bytes(8, "big")
+    return header + mask + bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+
+
+def read(data):
+    async def parse():
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        return await read_frame(reader)
+    return asyncio.run(parse())
+
+
+@pytest.mark.parametrize("length, header", [
+    (0, b"\x81\x00"),
+    (125, b"\x81\x7d"),
+    (126, b"\x81\x7e\x00\x7e"),
+    (65535, b"\x81\x7e\xff\xff"),
+    (65536, b"\x81\x7f\x00\x00\x00\x00\x00\x01\x00\x00"),
+])
+def test_frame_length_encodings(length, header):
+    payload = os.urandom(length)
+    frame = _frame(_WS_TEXT, payload)
+    assert frame == header + payload
+
+
+@pytest.mark.parametrize("length", [0, 5, 125, 126, 1000, 65535])
+def test_unmasked_frames_round_trip(length):
+    payload = os.urandom(length)
+    assert read(_frame(_WS_TEXT, payload)) == (_WS_TEXT, payload)
+
+
+@pytest.mark.parametrize("length", [0, 5, 125, 126, 1000, 65535])
+def test_masked_frames_are_unmasked(length):
+    payload = os.urandom(length)
+    assert read(masked(_WS_PING, payload)) == (_WS_PING, payload)
+
+
+def test_oversized_frame_is_refused_before_reading_it():
+    with pytest.raises(_RequestError) as error:
+        read(bytes((0x80 | _WS_TEXT, 0x80 | 127)) + (MAX_BODY_BYTES + 1).to_bytes(8, "big"))
+    assert error.value.status == 413
+
+
+def test_truncated_frame_raises():
+    with pytest.raises(asyncio.IncompleteReadError):
+        read(_frame(_WS_TEXT, b"hello")[:-1])
+
+
+async def open_stream(port, query=""):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    key = base64.b64encode(os.urandom(16)).decode()
+    writer.write(
+        f"GET /api/stream{query} HTTP/1.1\r\nHost: localhost\r\n"
+        "Upgrade: websocket\r\nConnection: Upgrade\r\n"
+        f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n".encode())
+    response = (await reader.readuntil(b"\r\n\r\n")).decode()
+    expected = base64.b64encode(hashlib.sha1((key + _WS_GUID).encode()).digest()).decode()
+    assert response.startswith("HTTP/1.1 101 ")
+    assert f"Sec-WebSocket-Accept: {expected}\r\n" in response
+    return reader, writer
+
+
+def server():
+    return ApiServer({'host': "127.0.0.1", 'port': 0, 'token': ""}, print, print)
+
+
+def test_stream_sends_items_answers_pings_and_closes():
+    async def scenario():
+        api = server()
+        assert await api.start()
+        reader, writer = await open_stream(api.port)
+        await asyncio.sleep(0.05)
+
+        api.publish(Announcement("Notice", "Bus late", "Route 4 is late", time.time()))
+        opcode, payload = await asyncio.wait_for(read_frame(reader), 2)
+        message = json.loads(payload)
+        assert opcode == _WS_TEXT
+        assert message['type'] == "item" and message['item']['title'] == "Bus late"
+
+        writer.write(masked(_WS_PING, b"still there?"))
+        assert await asyncio.wait_for(read_frame(reader), 2) == (_WS_PONG, b"still there?")
+
+        started = time.monotonic()
+        await api.close()
+        assert time.monotonic() - started < 1.0
+        assert await asyncio.wait_for(read_frame(reader), 2) == (_WS_CLOSE, b"")
+        assert not api._handlers
+        writer.close()
+
+    asyncio.run(scenario())
+
+
+def test_stream_replays_items_after_a_cursor():
+    async def scenario():
+        api = server()
+        assert await api.start()
+        for title in ("One", "Two", "Three"):
+            api._publish(Announcement("Notice", title, title, time.time()))
+        reader, writer = await open_stream(api.port, "?after=1")
+        titles = []
+        for _ in range(2):
+            _, payload = await asyncio.wait_for(read_frame(reader), 2)
+            titles.append(json.loads(payload)['item']['title'])
+        assert titles == ["Two", "Three"]
+        writer.close()
+        await api.close()
+
+    asyncio.run(scenario())
+
+
+def test_close_does_not_wait_on_a_silent_client():
+    async def scenario():
+        api = server()
+        assert await api.start()
+        # Connected but never sends its request
+        _, writer = await asyncio.open_connection("127.0.0.1", api.port)
+        await asyncio.sleep(0.05)
+        started = time.monotonic()
+        await api.close()
+        assert time.monotonic() - started < 2.0
+        assert not api._handlers
+        writer.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,170 @@
+import asyncio
+import time
+
+import pytest
+
+from edupulse.cluster import Cluster, ClusterStore
+from edupulse.pipeline import Announcement
+
+
+@pytest.fixture
+def store_path(tmp_path):
+    return str(tmp_path / "cluster.db")
+
+
+def item(title, ts=None):
+    return Announcement("Email", title, f"About {title}", ts or time.time(), "office@school.test")
+
+
+def station(store_path, name, lease_seconds=3):
+    received = []
+    cluster = Cluster({'station': name, 'lease_seconds': lease_seconds, 'store': store_path},
+                      {}, received.append)
+    return cluster, received
+
+
+async def until(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        await asyncio.sleep(0.02)
+    return True
+
+
+async def stop(task):
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+def test_one_holder_per_lease(store_path):
+    a, b = ClusterStore(store_path), ClusterStore(store_path)
+    assert a.acquire(["imap", "speaker"], "a", 30) == {"imap", "speaker"}
+    assert b.acquire(["imap", "speaker"], "b", 30) == set()
+    assert a.acquire(["imap"], "a", 30) == {"imap"}  # renewal
+
+
+def test_released_lease_is_free_at_once(store_path):
+    a, b = ClusterStore(store_path), ClusterStore(store_path)
+    a.acquire(["imap"], "a", 30)
+    a.release(["imap"], "b")  # not the holder: no effect
+    assert b.acquire(["imap"], "b", 30) == set()
+    a.release(["imap"], "a")
+    assert b.acquire(["imap"], "b", 30) == {"imap"}
+
+
+def test_expired_lease_passes_to_another_station(store_path):
+    a, b = ClusterStore(store_path), ClusterStore(store_path)
+    a.acquire(["imap"], "a", 0.05)
+    time.sleep(0.1)
+    assert b.acquire(["imap"], "b", 30) == {"imap"}
+    assert a.acquire(["imap"], "a", 30) == set()
+
+
+def test_items_are_logged_once_across_stations(store_path):
+    a, b = ClusterStore(store_path), ClusterStore(store_path)
+    first = [item("Timetable", 1000), item("Bus", 1001)]
+    assert a.commit("imap", "a", first, {'uid': 2}) == first
+    again = [item("Bus", 1001), item("Lunch", 1002)]
+    assert [x.title for x in b.commit("imap", "b", again, {'uid': 3})] == ["Lunch"]
+    assert b.load_state("imap") == {'uid': 3}
+    assert [(station, record['title']) for _, station, record in a.read_since(0)] == [
+        ("a", "Timetable"), ("a", "Bus"), ("b", "Lunch")]
+
+
+def test_stopped_leader_hands_over_before_expiry(store_path):
+    async def scenario():
+        a, _ = station(store_path, "a")
+        b, _ = station(store_path, "b")
+        a_gained, b_gained = [], []
+        a.want("imap", lambda: a_gained.append(time.monotonic()))
+        a_task = asyncio.ensure_future(a.run())
+        assert await until(lambda: a.leads("imap"))
+        b.want("imap", lambda: b_gained.append(time.monotonic()))
+        b_task = asyncio.ensure_future(b.run())
+        await asyncio.sleep(0.3)
+        assert not b.leads("imap")
+
+        stopped = time.monotonic()
+        await stop(a_task)
+        # Released on stop, so well inside the 3 s lease
+        assert await until(lambda: b.leads("imap"), timeout=2.0)
+        assert b_gained[0] - stopped < 2.0
+        assert len(a_gained) == 1 and not a.leads("imap")
+        await stop(b_task)
+        assert ClusterStore(store_path).acquire(["imap"], "c", 30) == {"imap"}
+
+    asyncio.run(scenario())
+
+
+def test_dropped_lease_is_handed_over_without_blocking_the_loop(store_path):
+    async def scenario():
+        a, _ = station(store_path, "a")
+        b, _ = station(store_path, "b")
+        a.want("imap")
+        a_task = asyncio.ensure_future(a.run())
+        assert await until(lambda: a.leads("imap"))
+        b.want("imap")
+        b_task = asyncio.ensure_future(b.run())
+        await asyncio.sleep(0.3)
+        assert not b.leads("imap")
+
+        # Another connection holds the store's write lock
+        blocker = ClusterStore(store_path)
+        blocker._db.execute("BEGIN IMMEDIATE")
+        started = time.monotonic()
+        a.drop("imap")
+        assert time.monotonic() - started < 0.1
+        assert not a.leads("imap")
+        await asyncio.sleep(0.2)
+        blocker._db.execute("ROLLBACK")
+
+        # Released as soon as the store is free, well inside the 3 s lease
+        assert await until(lambda: b.leads("imap"), timeout=2.0)
+        await stop(a_task)
+        await stop(b_task)
+
+    asyncio.run(scenario())
+
+def test_follower_shows_other_stations_items_and_resumes(store_path):
+    async def scenario():
+        leader, leader_received = station(store_path, "a")
+        follower, received = station(store_path, "b")
+        follower_task = asyncio.ensure_future(follower.run())
+        await asyncio.sleep(0.1)
+
+        timetable = item("Timetable")
+        await leader.commit("imap", [timetable])
+        assert await until(lambda: [x.title for x in received] == ["Timetable"])
+        await stop(follower_task)
+
+        # Logged while the follower is down; it continues from its saved position
+        await leader.commit("imap", [item("Bus"), item("Timetable", timetable.ts)])
+        follower, received = station(store_path, "b")
+        follower_task = asyncio.ensure_future(follower.run())
+        assert await until(lambda: [x.title for x in received] == ["Bus"])
+        await asyncio.sleep(0.2)
+        assert [x.title for x in received] == ["Bus"]
+        assert leader_received == []  # its own items are emitted where polled
+        await stop(follower_task)
+
+    asyncio.run(scenario())
+
+
+def test_new_station_lists_old_backlog_on_a_digest(store_path):
+    async def scenario():
+        leader, _ = station(store_path, "a")
+        now = time.time()
+        await leader.commit("imap", [item("Old", now - 7200), item("New", now)])
+        received = []
+        follower = Cluster({'station': "b", 'lease_seconds': 3, 'store': store_path},
+                           {}, received.append, lookback=86400, fresh=900)
+        task = asyncio.ensure_future(follower.run())
+        assert await until(lambda: len(received) == 2)
+        await stop(task)
+        new, card = received
+        assert new.title == "New"
+        assert card.kind == "Digest" and not card.broadcast
+        assert "Old" in card.text
+
+    asyncio.run(scenario())
@@ -0,0 +1,110 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from edupulse.coalesce import AnnouncementBuffer
+from edupulse.outbox import Outbox, outbox_from_settings
+from edupulse.pipeline import Announcement
+from edupulse.settings import SettingsManager
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "outbox.db")
+
+
+def item(title):
+    return Announcement("Email", title, f"About {title}", time.time(), "office@school.test")
+
+
+def commit(outbox, name, announcements, state=None):
+    return asyncio.run(outbox.commit(name, announcements, state))
+
+
+def test_items_and_state_survive_a_crash(path):
+    outbox = Outbox(path)
+    items = [item("Timetable"), item("Bus"), item("Lunch")]
+    assert commit(outbox, "imap", items, {'uid': 42})
+    assert [a.delivery for a in items] == sorted(a.delivery for a in items)
+    # Crash: nothing flushed or closed
+
+    restarted = Outbox(path)
+    pending = restarted.pending()
+    assert [a.title for a in pending] == ["Timetable", "Bus", "Lunch"]
+    assert [a.text for a in pending] == [a.text for a in items]
+    state, saved = restarted.states()['imap']
+    assert state == {'uid': 42}
+    assert time.time() - saved < 60
+
+
+def test_only_unacknowledged_items_come_back(path):
+    outbox = Outbox(path)
+    items = [item("Timetable"), item("Bus"), item("Lunch")]
+    commit(outbox, "imap", items)
+    outbox.ack(items[0])
+    outbox.ack(items[2])
+    outbox.flush()
+    outbox.ack(items[1])  # acknowledged, but not yet written when it crashes
+
+    assert [a.title for a in Outbox(path).pending()] == ["Bus"]
+
+
+def test_resumed_items_can_be_acknowledged(path):
+    outbox = Outbox(path)
+    commit(outbox, "imap", [item("Timetable")])
+    outbox.close()
+
+    restarted = Outbox(path)
+    [pending] = restarted.pending()
+    restarted.ack(pending)
+    restarted.ack(pending)  # a second ack is harmless
+    restarted.flush()
+    restarted.close()
+    assert Outbox(path).pending() == []
+
+
+def test_unchanged_state_is_not_rewritten(path):
+    outbox = Outbox(path)
+    commit(outbox, "imap", [], {'uid': 1})
+    _, first = outbox.states()['imap']
+    time.sleep(0.01)
+    commit(outbox, "imap", [], {'uid': 1})
+    assert outbox.states()['imap'] == ({'uid': 1}, first)
+    commit(outbox, "imap", [], {'uid': 2})
+    state, saved = outbox.states()['imap']
+    assert state == {'uid': 2} and saved > first
+
+
+def test_commit_reports_an_unwritable_outbox(path):
+    outbox = Outbox(path)
+    outbox.close()
+    items = [item("Timetable")]
+    assert commit(outbox, "imap", items) is False
+    assert items[0].delivery is None
+
+
+def test_items_the_buffer_drops_are_acknowledged(path):
+    outbox = Outbox(path)
+    items = [item(f"Notice {i}") for i in range(5)]
+    commit(outbox, "imap", items)
+    buffer = AnnouncementBuffer(capacity=2, on_drop=outbox.ack)
+    for announcement in items:
+        buffer.put(announcement)
+    outbox.flush()
+
+    shown, dropped = buffer.drain()
+    assert dropped == 3
+    assert [a.title for a in Outbox(path).pending()] == [a.title for a in shown]
+
+
+def test_relative_path_is_next_to_settings(tmp_path, monkeypatch):
+    monkeypatch.setattr(SettingsManager, 'SETTINGS_FILE', str(tmp_path / "settings.json"))
+    settings = SettingsManager.defaults()
+    outbox = outbox_from_settings(settings)
+    assert outbox.path == os.path.join(str(tmp_path), "outbox.db")
+    outbox.close()
+
+    settings['outbox']['enabled'] = False
+    assert outbox_from_settings(settings) is None
@@ -0,0 +1,105 @@
+from datetime import datetime
+
+import pytest
+
+from edupulse.scheduler import CronRule, OneShot, Schedule, ScheduleError
+
+
+def at(*fields):
+    return datetime(*fields).timestamp()
+
+
+def fires(expression, start, count):
+    rule = CronRule(expression)
+    ts, times = start, []
+    for _ in range(count):
+        ts = rule.next_after(ts)
+        times.append(datetime.fromtimestamp(ts))
+    return times
+
+
+def test_next_fire_is_strictly_after():
+    rule = CronRule("55 7 * * *")
+    assert rule.next_after(at(2025, 3, 3, 7, 54, 59)) == at(2025, 3, 3, 7, 55)
+    assert rule.next_after(at(2025, 3, 3, 7, 55)) == at(2025, 3, 4, 7, 55)
+    assert rule.next_after(at(2025, 3, 3, 7, 55, 30)) == at(2025, 3, 4, 7, 55)
+
+
+def test_weekday_range_skips_the_weekend():
+    # 2025-03-07 is a Friday
+    assert fires("0 8 * * mon-fri", at(2025, 3, 7, 9, 0), 2) == [
+        datetime(2025, 3, 10, 8, 0), datetime(2025, 3, 11, 8, 0)]
+
+
+def test_sunday_is_both_0_and_7():
+    sunday = at(2025, 3, 9, 12, 0)
+    assert CronRule("0 12 * * 0").next_after(sunday - 60) == sunday
+    assert CronRule("0 12 * * 7").next_after(sunday - 60) == sunday
+    assert CronRule("0 12 * * sun").next_after(sunday - 60) == sunday
+
+
+def test_steps_and_ranges():
+    assert [t.minute for t in fires("*/20 9 * * *", at(2025, 3, 3, 8, 0), 3)] == [0, 20, 40]
+    assert [t.minute for t in fires("10-30/10 9 * * *", at(2025, 3, 3, 8, 0), 3)] == [
+        10, 20, 30]
+    assert [t.hour for t in fires("0 8/6 * * *", at(2025, 3, 3, 0, 0), 3)] == [8, 14, 20]
+    assert [t.minute for t in fires("5,1,3 9 * * *", at(2025, 3, 3, 8, 0), 3)] == [1, 3, 5]
+
+
+def test_hour_and_day_rollover():
+    assert fires("0 * * * *", at(2025, 3, 3, 23, 30), 1) == [datetime(2025, 3, 4, 0, 0)]
+    assert fires("30 6 * * *", at(2025, 3, 31, 7, 0), 1) == [datetime(2025, 4, 1, 6, 30)]
+    assert fires("0 0 1 jan *", at(2025, 12, 31, 12, 0), 1) == [datetime(2026, 1, 1, 0, 0)]
+
+
+def test_day_of_month_or_weekday_when_both_are_set():
+    # The 13th, or any Friday: 2025-06-06 and 2025-06-13 are Fridays
+    assert fires("0 9 13 * fri", at(2025, 6, 1, 0, 0), 3) == [
+        datetime(2025, 6, 6, 9, 0), datetime(2025, 6, 13, 9, 0),
+        datetime(2025, 6, 20, 9, 0)]
+
+
+def test_day_of_month_and_month_when_weekday_is_any():
+    assert fires("0 9 31 * *", at(2025, 4, 1, 0, 0), 2) == [
+        datetime(2025, 5, 31, 9, 0), datetime(2025, 7, 31, 9, 0)]
+
+
+def test_leap_day_waits_for_a_leap_year():
+    assert fires("0 0 29 feb *", at(2025, 3, 1, 0, 0), 1) == [datetime(2028, 2, 29, 0, 0)]
+
+
+def test_impossible_date_never_fires():
+    assert CronRule("0 0 30 feb *").next_after(at(2025, 1, 1, 0, 0)) is None
+
+
+@pytest.mark.parametrize("expression", [
+    "0 8 * *",
+    "0 8 * * * *",
+    "60 8 * * *",
+    "0 24 * * *",
+    "0 8 0 * *",
+    "0 8 * 13 *",
+    "0 8 * * 8",
+    "*/0 8 * * *",
+    "0 8 * * someday",
+    "30-10 8 * * *",
+])
+def test_bad_expressions_are_refused(expression):
+    with pytest.raises(ScheduleError):
+        CronRule(expression)
+
+
+def test_one_shot_fires_once():
+    rule = OneShot("2025-03-03 07:55")
+    assert rule.next_after(at(2025, 3, 3, 7, 0)) == at(2025, 3, 3, 7, 55)
+    assert rule.next_after(at(2025, 3, 3, 7, 55)) is None
+    with pytest.raises(ScheduleError):
+        OneShot("tomorrow morning")
+
+
+def test_schedule_from_settings():
+    schedule = Schedule.from_settings({'text': "Fire drill at ten", 'cron': "50 9 * * wed"})
+    assert schedule.name == "Fire drill at ten"
+    assert isinstance(schedule.rule, CronRule)
+    with pytest.raises(ScheduleError):
+        Schedule.from_settings({'text': "Bell", 'cron': "0 8 * * *", 'at': "2025-03-03 08:00"})
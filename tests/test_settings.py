@@ -0,0 +1,163 @@
+import json
+import os
+
+import pytest
+
+from edupulse.settings import SettingsError, SettingsManager, SettingsService
+from edupulse.vault import vault
+
+
+@pytest.fixture
+def settings_file(tmp_path, monkeypatch):
+    path = tmp_path / "settings.json"
+    monkeypatch.setattr(SettingsManager, 'SETTINGS_FILE', str(path))
+    monkeypatch.setattr(vault, 'enabled', False)
+    return path
+
+
+def write(path, settings):
+    path.write_text(json.dumps(settings))
+
+
+def test_defaults_are_valid():
+    assert SettingsManager.validate(SettingsManager.defaults()) == []
+
+
+def test_validate_reports_every_problem_by_path():
+    settings = SettingsManager.defaults()
+    settings['polling']['email_interval'] = 1
+    settings['api']['port'] = "8765"
+    settings['email']['backend'] = "pop3"
+    settings['cluster']['enabled'] = 1
+    settings['accounts']['email'] = [{'username': "x"}]
+
+    errors = dict(SettingsManager.validate(settings))
+
+    assert errors[('polling', 'email_interval')] == "must be between 5 and 86400"
+    assert errors[('api', 'port')] == "must be int"
+    assert errors[('email', 'backend')] == "must be one of imap, gmail_api"
+    assert errors[('cluster', 'enabled')] == "must be bool"
+    assert errors[('accounts', 'email', '0')] == "needs a 'name'"
+    assert len(errors) == 5
+
+
+def test_bool_is_not_a_number():
+    settings = SettingsManager.defaults()
+    settings['polling']['email_interval'] = True
+    assert [path for path, _ in SettingsManager.validate(settings)] == [
+        ('polling', 'email_interval')]
+
+
+def test_whole_floats_pass_as_int():
+    settings = SettingsManager.defaults()
+    settings['polling']['email_interval'] = 30.0
+    assert SettingsManager.validate(settings) == []
+
+
+def test_load_resets_only_the_bad_fields(settings_file):
+    write(settings_file, {
+        'polling': {'email_interval': "fast", 'classroom_interval': 120},
+        'api': {'port': 9000},
+        'accounts': {'email': [{'name': "office"}, {'password': "x"}]},
+        'schedule': {'items': [{'text': "Bell"}, {'text': "Bell", 'cron': "0 8 * * *"}]}
+    })
+
+    settings = SettingsManager.load_settings()
+
+    defaults = SettingsManager.defaults()
+    assert settings['polling']['email_interval'] == defaults['polling']['email_interval']
+    assert settings['polling']['classroom_interval'] == 120
+    assert settings['api']['port'] == 9000
+    assert settings['accounts']['email'] == [{'name': "office"}]
+    assert settings['schedule']['items'] == [{'text': "Bell", 'cron': "0 8 * * *"}]
+
+
+def test_load_migrates_the_flat_schema(settings_file):
+    write(settings_file, {'imap_host': "imap.school.test", 'email_poll_interval': 30})
+
+    settings = SettingsManager.load_settings()
+
+    assert settings['email']['imap_host'] == "imap.school.test"
+    assert settings['polling']['email_interval'] == 30
+    assert 'imap_host' not in settings
+
+
+def test_load_falls_back_to_defaults_on_a_corrupt_file(settings_file):
+    settings_file.write_text('{"polling": ')
+    assert SettingsManager.load_settings() == SettingsManager.defaults()
+
+
+def test_load_creates_a_missing_file(settings_file):
+    assert SettingsManager.load_settings() == SettingsManager.defaults()
+    assert json.loads(settings_file.read_text()) == SettingsManager.defaults()
+
+
+def test_save_refuses_invalid_settings(settings_file):
+    write(settings_file, SettingsManager.defaults())
+    before = settings_file.read_text()
+    settings = SettingsManager.defaults()
+    settings['metrics']['port'] = 70000
+
+    assert SettingsManager.save_settings(settings) is False
+    assert settings_file.read_text() == before
+
+
+def test_save_replaces_the_file_in_one_step(settings_file, monkeypatch):
+    write(settings_file, SettingsManager.defaults())
+    renames = []
+    replace = os.replace
+    monkeypatch.setattr(os, 'replace', lambda src, dst: (renames.append((src, dst)),
+                                                         replace(src, dst)))
+    settings = SettingsManager.defaults()
+    settings['api']['port'] = 9000
+
+    assert SettingsManager.save_settings(settings) is True
+
+    assert json.loads(settings_file.read_text())['api']['port'] == 9000
+    [(src, dst)] = renames
+    assert dst == str(settings_file)
+    assert os.path.dirname(src) == str(settings_file.parent)
+    assert sorted(os.listdir(settings_file.parent)) == ["settings.json"]
+
+
+def test_failed_save_keeps_the_old_file(settings_file, monkeypatch):
+    write(settings_file, SettingsManager.defaults())
+    before = settings_file.read_text()
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+    monkeypatch.setattr(json, 'dump', fail)
+
+    assert SettingsManager.save_settings(SettingsManager.defaults()) is False
+    assert settings_file.read_text() == before
+    assert sorted(os.listdir(settings_file.parent)) == ["settings.json"]
+
+
+def test_service_rejects_invalid_settings(settings_file):
+    service = SettingsService()
+    settings = SettingsManager.defaults()
+    settings['summary']['workers'] = 0
+    with pytest.raises(SettingsError, match="summary.workers"):
+        service.save(settings)
+    assert service.settings == SettingsManager.defaults()
+
+
+def test_service_writes_a_burst_of_changes_once(settings_file, monkeypatch):
+    monkeypatch.setattr(SettingsService, 'SAVE_DELAY', 60)
+    service = SettingsService()
+    changes = []
+    service.subscribe(lambda new, old: changes.append((old['api']['port'], new['api']['port'])))
+    writes = []
+    save_settings = SettingsManager.save_settings
+    monkeypatch.setattr(SettingsManager, 'save_settings',
+                        lambda settings: writes.append(1) or save_settings(settings))
+
+    for port in (9001, 9002, 9003):
+        settings = SettingsManager.defaults()
+        settings['api']['port'] = port
+        service.save(settings)
+    service.close()
+
+    assert changes == [(8765, 9001), (9001, 9002), (9002, 9003)]
+    assert len(writes) == 1
+    assert json.loads(settings_file.read_text())['api']['port'] == 9003
@@ -0,0 +1,77 @@
+import json
+import os
+
+import pytest
+
+from edupulse import settings as settings_module
+from edupulse.settings import SettingsManager
+from edupulse.vault import MASTER_KEY_ENV, CredentialVault, VaultError
+
+
+@pytest.fixture
+def settings_dir(tmp_path, monkeypatch):
+    """settings.json in one directory, started from another"""
+    directory = tmp_path / "etc"
+    directory.mkdir()
+    elsewhere = tmp_path / "cwd"
+    elsewhere.mkdir()
+    monkeypatch.chdir(elsewhere)
+    monkeypatch.setattr(SettingsManager, 'SETTINGS_FILE', str(directory / "settings.json"))
+    monkeypatch.setattr(settings_module, 'vault', CredentialVault())
+    monkeypatch.setenv(MASTER_KEY_ENV, "correct horse")
+    return directory
+
+
+def with_password(password):
+    settings = SettingsManager.defaults()
+    settings['email']['password'] = password
+    return settings
+
+
+def test_vault_lives_next_to_settings(settings_dir):
+    assert SettingsManager.save_settings(with_password("hunter2"))
+
+    assert sorted(os.listdir(settings_dir)) == ["settings.json", "vault.bin"]
+    assert os.listdir(".") == []
+    on_disk = json.loads((settings_dir / "settings.json").read_text())
+    assert on_disk['email']['password'] == ""
+
+    # A fresh process started from yet another directory finds it again
+    os.chdir(settings_dir.parent)
+    settings_module.vault = CredentialVault()
+    assert SettingsManager.load_settings()['email']['password'] == "hunter2"
+
+
+def test_key_file_lives_next_to_settings(settings_dir, monkeypatch):
+    monkeypatch.delenv(MASTER_KEY_ENV)
+    monkeypatch.setattr('edupulse.vault.HAVE_KEYRING', False)
+
+    assert SettingsManager.save_settings(with_password("hunter2"))
+
+    assert sorted(os.listdir(settings_dir)) == ["settings.json", "vault.bin", "vault.key"]
+    assert os.listdir(".") == []
+
+
+def test_locked_vault_is_kept_and_can_be_unlocked_later(settings_dir, monkeypatch):
+    assert SettingsManager.save_settings(with_password("hunter2"))
+    blob = (settings_dir / "vault.bin").read_bytes()
+
+    monkeypatch.setenv(MASTER_KEY_ENV, "wrong")
+    vault = settings_module.vault = CredentialVault()
+    settings = SettingsManager.load_settings()
+    assert vault.locked
+    assert settings['email']['password'] == ""
+    with pytest.raises(VaultError):
+        vault.unlock()
+
+    # Other changes still save; a new secret is refused rather than lost
+    settings['api']['port'] = 9000
+    assert SettingsManager.save_settings(settings)
+    assert not SettingsManager.save_settings(with_password("new"))
+    assert (settings_dir / "vault.bin").read_bytes() == blob
+
+    monkeypatch.setenv(MASTER_KEY_ENV, "correct horse")
+    settings = SettingsManager.load_settings()
+    assert not vault.locked
+    assert settings['email']['password'] == "hunter2"
+    assert settings['api']['port'] == 9000